@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from src.data_fetcher import DataFetcher
+from tests.servers import CandleServer
+
+# Cold-start history download, serial against concurrent chunk fetching. The
+# candleSnapshot endpoint is a local stand-in that answers each daily chunk
+# after --latency seconds, so the numbers show how much of the round-trip
+# time the concurrent path hides.
+#
+#   python -m benchmarks.fetch_history --days 365 --latency 0.05 --concurrency 1 8 32
+
+async def _fetch(days, latency, concurrency, concurrent, requests_per_second):
+    end = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with CandleServer(latency=latency) as server:
+        fetcher = DataFetcher('ETH', '1h', days, base_url=server.url, max_concurrency=concurrency,
+                              requests_per_second=requests_per_second)
+        started = time.perf_counter()
+        df = await fetcher._fetch_range(end - timedelta(days=days), end, concurrent)
+        return time.perf_counter() - started, len(df), server.max_in_flight
+
+def benchmark(days=365, latency=0.05, concurrency=(1, 8, 32), requests_per_second=1000):
+    rows = []
+    seconds, bars, _ = asyncio.run(_fetch(days, latency, 1, False, requests_per_second))
+    rows.append({'mode': 'serial', 'in flight': 1, 'seconds': seconds, 'bars': bars})
+    for limit in concurrency:
+        seconds, bars, in_flight = asyncio.run(_fetch(days, latency, limit, True, requests_per_second))
+        rows.append({'mode': f'concurrent {limit}', 'in flight': in_flight, 'seconds': seconds, 'bars': bars})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs concurrent history download')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the stand-in takes per chunk')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests-per-second', type=float, default=1000)
+    args = parser.parse_args()
+    rows = benchmark(args.days, args.latency, args.concurrency, args.requests_per_second)
+    serial = rows[0]['seconds']
+    print(f"{'mode':<16}{'in flight':>10}{'seconds':>10}{'speed-up':>10}{'bars':>8}")
+    for row in rows:
+        print(f"{row['mode']:<16}{row['in flight']:>10}{row['seconds']:>10.2f}{serial / row['seconds']:>10.1f}"
+              f"{row['bars']:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import time
+import warnings
+from src.backtester import AdvancedBacktester
+from src.genetic_optimizer import GeneticOptimizer
+from tests.strategies import SmaCross, make_ohlcv
+
+# GA wall time against the number of worker processes. Every run evaluates the
+# same individuals (same seed, no fitness cache on disk), so the speed-up over
+# one worker is what the process pool buys; near-linear means the shared-memory
+# data and small parameter tasks keep the overhead out of the way. The
+# event-driven engine is the default, one backtest per task.
+#
+#   python -m benchmarks.ga_speedup --bars 20000 --workers 1 2 4 8
+
+PARAM_RANGES = {'n_fast': list(range(3, 30)), 'n_slow': list(range(20, 120, 2)), 'stop_multiplier': [1.5, 2, 3, 4]}
+
+def run(data, workers, engine, population_size, generations, seed):
+    backtester = AdvancedBacktester(data, SmaCross, engine=engine)
+    optimizer = GeneticOptimizer(SmaCross, backtester, workers=workers)
+    started = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        best = optimizer.optimize(data, PARAM_RANGES, population_size=population_size, generations=generations,
+                                  seed=seed, verbose=False)
+    return time.perf_counter() - started, sum(optimizer.logbook.select('nevals')), best
+
+def benchmark(bars=20000, workers=(1, 2, 4), engine='backtesting', population_size=32, generations=3, seed=0):
+    # Speed-ups are measured against a real single-worker run, which is always included
+    data = make_ohlcv(bars)
+    rows = []
+    for count in sorted({1, *workers}):
+        seconds, evaluations, best = run(data, count, engine, population_size, generations, seed)
+        rows.append({'workers': count, 'seconds': seconds, 'evaluations': evaluations, 'best': best})
+    if len({str(row['best']) for row in rows}) > 1:
+        raise RuntimeError(f"Worker counts disagree on the best parameters: {[row['best'] for row in rows]}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='GA speed-up from 1 to N worker processes')
+    parser.add_argument('--bars', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument('--engine', default='backtesting', choices=['backtesting', 'vectorized'])
+    parser.add_argument('--population', type=int, default=32)
+    parser.add_argument('--generations', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rows = benchmark(args.bars, args.workers, args.engine, args.population, args.generations, args.seed)
+    base = rows[0]['seconds']
+    print(f"{os.cpu_count()} cores, {rows[0]['evaluations']} evaluations per run, best {rows[0]['best']}")
+    print(f"{'workers':>8}{'seconds':>10}{'speed-up':>10}{'efficiency':>12}")
+    for row in rows:
+        speedup = base / row['seconds']
+        print(f"{row['workers']:>8}{row['seconds']:>10.2f}{speedup:>10.2f}{speedup / row['workers']:>12.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Cold-start cost of the entry points. Each one is imported in a fresh
+# interpreter under -X importtime, together with the modules its live stage
+# imports lazily (the exchange client) and optionally the strategy module, so
+# the total is what a restarted process pays before it can compute its first
+# signal. Reports the median over --repeat runs and which heavy packages got
+# loaded.
+#
+#   python -m benchmarks.import_time --strategy my_strategies.breakout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ['numpy', 'pandas', 'aiohttp', 'ccxt', 'talib', 'matplotlib', 'deap', 'backtesting']
+ENTRY_POINTS = {
+    'main': ['main'],
+    'live': ['live', 'ccxt.async_support'],
+}
+
+def parse_importtime(stderr):
+    # Total import time in microseconds, and name -> cumulative microseconds of
+    # the import that first loaded it
+    total, loaded = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        total += int(own)
+        loaded.setdefault(name.strip(), int(cumulative))
+    return total, loaded
+
+def _available(module):
+    # Optional dependencies that are not installed are left out of the measurement
+    top = module.split('.')[0]
+    return os.path.exists(os.path.join(ROOT, top + '.py')) or importlib.util.find_spec(top) is not None
+
+def measure(modules):
+    modules = [module for module in modules if _available(module)]
+    code = '; '.join(f'import {module}' for module in modules)
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True,
+                             text=True)
+    wall = time.perf_counter() - started
+    if process.returncode:
+        raise RuntimeError(f"Importing {modules} failed:\n{process.stderr.splitlines()[-1]}")
+    total, loaded = parse_importtime(process.stderr)
+    return {
+        'modules': modules,
+        'wall': wall,
+        'imports': total / 1e6,
+        'heavy': {package: loaded[package] / 1e6 for package in HEAVY if package in loaded},
+    }
+
+def benchmark(entry_points=ENTRY_POINTS, repeat=5, strategy=None):
+    rows = []
+    for name, modules in entry_points.items():
+        modules = modules + ([strategy] if strategy else [])
+        runs = [measure(modules) for _ in range(repeat)]
+        rows.append({
+            'entry': name,
+            'modules': runs[0]['modules'],
+            'imports s': statistics.median(run['imports'] for run in runs),
+            'process s': statistics.median(run['wall'] for run in runs),
+            'heavy': {package: statistics.median(run['heavy'].get(package, 0.0) for run in runs)
+                      for package in runs[0]['heavy']},
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the entry points')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--strategy', help='strategy module to import along with each entry point')
+    args = parser.parse_args()
+    for row in benchmark(repeat=args.repeat, strategy=args.strategy):
+        print(f"{row['entry']}: imports {row['imports s']:.3f}s, process {row['process s']:.3f}s "
+              f"({', '.join(row['modules'])})")
+        for package, seconds in row['heavy'].items():
+            print(f"  {package:<12}{seconds:.3f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from src.utils.logger import BoundedQueueHandler, setup_logger
+from src.utils.metrics import LatencyHistogram
+
+# Event-loop lag under log load. A ticker coroutine sleeps 1ms at a time and
+# records how late it wakes up, while another coroutine logs order-sized
+# records at a fixed rate through the bot's logger. A filter on the file
+# handler stalls every `stall_every`-th record to mimic a slow disk; with
+# synchronous handlers that stall lands on the event loop, with the queue it
+# lands on the listener thread.
+#
+#   python -m benchmarks.log_latency --rates 0 1000 10000 --seconds 2
+
+ORDER = {'id': '123456789', 'symbol': 'BTC/USDC:USDC', 'side': 'buy', 'type': 'market', 'amount': 0.01,
+         'filled': 0.01, 'price': 65000.0, 'average': 65000.0, 'status': 'closed', 'timestamp': 1700000000000,
+         'info': {'status': 'ok', 'response': {'type': 'order', 'data': {'statuses': [{'filled': {'oid': 1}}]}}}}
+
+class StallFilter(logging.Filter):
+    def __init__(self, stall, every):
+        super().__init__()
+        self.stall = stall
+        self.every = every
+        self.seen = 0
+
+    def filter(self, record):
+        self.seen += 1
+        if self.every and self.seen % self.every == 0:
+            time.sleep(self.stall)
+        return True
+
+async def _ticker(lag, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lag.record(max(0.0, time.perf_counter() - started - 0.001))
+
+async def _producer(logger, rate, stop):
+    # Logs in 1ms slices so the load is spread like a busy trading loop's
+    per_tick, carry = rate / 1000, 0.0
+    while not stop.is_set():
+        carry += per_tick
+        for _ in range(int(carry)):
+            logger.info("Opened long position: %s", ORDER)
+        carry -= int(carry)
+        await asyncio.sleep(0.001)
+
+async def _run(logger, rate, seconds):
+    lag, stop = LatencyHistogram(), asyncio.Event()
+    tasks = [asyncio.create_task(_ticker(lag, stop))]
+    if rate:
+        tasks.append(asyncio.create_task(_producer(logger, rate, stop)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return lag
+
+def benchmark(rates=(0, 1000, 10000), seconds=2.0, stall=0.005, stall_every=200, queue_size=10000):
+    rows = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        for queued in (False, True):
+            for rate in rates:
+                logger = setup_logger(log_dir=log_dir, console_level=logging.CRITICAL + 1, queued=queued,
+                                      queue_size=queue_size)
+                handler = logger.handlers[0]
+                handlers = handler.listener.handlers if isinstance(handler, BoundedQueueHandler) else logger.handlers
+                handlers[0].addFilter(StallFilter(stall, stall_every))
+                lag = asyncio.run(_run(logger, rate, seconds))
+                dropped = handler.dropped if isinstance(handler, BoundedQueueHandler) else 0
+                rows.append({'mode': 'queued' if queued else 'sync', 'records/s': rate,
+                             'p50 lag ms': lag.quantile(0.5) * 1000, 'p99 lag ms': lag.quantile(0.99) * 1000,
+                             'max lag ms': lag.quantile(1.0) * 1000, 'dropped': dropped})
+        # Close the handlers while the temporary directory still exists
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Event-loop lag under log load')
+    parser.add_argument('--rates', type=int, nargs='+', default=[0, 1000, 10000])
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--stall', type=float, default=0.005, help='seconds a stalled write takes')
+    parser.add_argument('--stall-every', type=int, default=200, help='stall one write in this many, 0 for none')
+    args = parser.parse_args()
+    rows = benchmark(args.rates, args.seconds, args.stall, args.stall_every)
+    print(f"{'mode':<8}{'records/s':>10}{'p50 lag ms':>12}{'p99 lag ms':>12}{'max lag ms':>12}{'dropped':>9}")
+    for row in rows:
+        print(f"{row['mode']:<8}{row['records/s']:>10}{row['p50 lag ms']:>12.3f}{row['p99 lag ms']:>12.3f}"
+              f"{row['max lag ms']:>12.3f}{row['dropped']:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import time
+from src.indicators.custom_indicators import calculate_zigzag, identify_support_resistance
+from tests import reference_indicators as reference
+from tests.strategies import make_ohlcv
+
+# Throughput of the vectorized zigzag and support/resistance against the
+# per-bar versions they replaced (tests/reference_indicators.py). The
+# indicator cache is bypassed, so every call computes.
+#
+#   python -m benchmarks.pivot_indicators --bars 500000
+
+def _best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def benchmark(bars=500000, deviation=1, window=14, repeat=3):
+    data = make_ohlcv(bars, freq='min')
+    high, low, close = data['high'], data['low'], data['close']
+    cases = {
+        'zigzag': (lambda: reference.zigzag(high, low, deviation),
+                   lambda: calculate_zigzag.__wrapped__(high, low, deviation)),
+        'support/resistance': (lambda: reference.support_resistance(high, low, close, window),
+                               lambda: identify_support_resistance.__wrapped__(high, low, close, window)),
+    }
+    rows = []
+    for name, (before, after) in cases.items():
+        rows.append({'indicator': name, 'before': _best(before, repeat), 'after': _best(after, repeat)})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorized pivot indicators against the per-bar versions')
+    parser.add_argument('--bars', type=int, default=500000)
+    parser.add_argument('--deviation', type=float, default=1)
+    parser.add_argument('--window', type=int, default=14)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'indicator':<20}{'before s':>10}{'after s':>10}{'speed-up':>10}{'Mbars/s':>10}")
+    for row in benchmark(args.bars, args.deviation, args.window, args.repeat):
+        print(f"{row['indicator']:<20}{row['before']:>10.3f}{row['after']:>10.4f}{row['before'] / row['after']:>10.1f}"
+              f"{args.bars / row['after'] / 1e6:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import asyncio
+import importlib
+from dotenv import load_dotenv
+from src.live_trader import LiveTrader
+from src.utils.logger import setup_logger
+from src.utils.config import load_config
+
+# Live-only entry point. Unlike main.py it never imports the backtesting,
+# optimization, feature or charting modules, so a restarted trading process
+# gets to its first signal without paying for them; benchmarks/import_time.py
+# tracks the difference. The strategy comes from the config:
+#
+#   live_strategy: package.module:ClassName  # called as ClassName(symbol=..., timeframe=..., **params)
+#   live_slots:                              # optional, one slot on symbol/timeframe by default
+#     - {symbol: ETH, timeframe: 1m, params: {...}}
+#   live_workers: 1                          # > 1 spreads the slots over processes
+#
+# The strategy objects provide what LiveTrader uses: symbol, timeframe,
+# update_data(ohlcv), generate_signal() and calculate_position_size().
+
+def load_object(path):
+    module, _, name = path.partition(':')
+    if not name:
+        raise ValueError(f"Expected 'package.module:Name', got {path!r}")
+    return getattr(importlib.import_module(module), name)
+
+def build_strategies(config):
+    factory = load_object(config['live_strategy'])
+    slots = config.get('live_slots') or [{'symbol': config['symbol'], 'timeframe': config['timeframe']}]
+    return [factory(symbol=slot['symbol'], timeframe=slot['timeframe'], **slot.get('params', {})) for slot in slots]
+
+async def main():
+    load_dotenv()
+    config = load_config()
+    logger = setup_logger(**config.get('logging', {}))
+
+    strategies = build_strategies(config)
+    live_trader = LiveTrader(config['api_key'], config['api_secret'], metrics_port=config.get('metrics_port'),
+                             metrics_path=config.get('metrics_path'))
+    logger.info("Starting live trading with %d slot(s)...", len(strategies))
+    workers = config.get('live_workers', 1)
+    if workers > 1:
+        await live_trader.start_sharded(strategies, workers)
+    else:
+        await live_trader.start_trading(strategies)
+
+if __name__ == "__main__":
+    asyncio.run(main())
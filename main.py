@@ -2,34 +2,44 @@ import asyncio
 import pandas as pd
 from dotenv import load_dotenv
 from src.data_fetcher import DataFetcher
+from src.candle_store import CandleStore
 from src.feature_engineering import FeatureEngineer
+from src.resampler import Resampler
 from src.strategies.advanced_breakout_strategy import AdvancedBreakoutStrategy
 from src.backtester import AdvancedBacktester
-from src.genetic_optimizer import GeneticOptimizer
-from src.live_trader import LiveTrader
 from src.utils.logger import setup_logger
 from src.utils.config import load_config
+from src.utils.metrics import get_metrics
+
+# The optimizer, walk-forward and live-trading modules are imported by the
+# stage that uses them; live.py starts live trading without the research stack.
 
 async def main():
     # Load environment variables and configuration
     load_dotenv()
     config = load_config()
-    logger = setup_logger()
+    logger = setup_logger(**config.get('logging', {}))
 
     # Initialize components
-    data_fetcher = DataFetcher(config['symbol'], config['timeframe'], config['total_limit'])
-    feature_engineer = FeatureEngineer()
+    candle_store = CandleStore(config.get('candle_store_dir', 'data/candles'))
+    # Candles are fetched and stored once at the base timeframe, the trading and
+    # any higher feature timeframes are resampled from them
+    base_timeframe = config.get('base_timeframe', config['timeframe'])
+    data_fetcher = DataFetcher(config['symbol'], base_timeframe, config['total_limit'], store=candle_store)
+    feature_engineer = FeatureEngineer(workers=config.get('feature_workers', 4))
     strategy = AdvancedBreakoutStrategy
-    backtester = AdvancedBacktester(pd.DataFrame(), strategy)  # Initialize with empty DataFrame
-    genetic_optimizer = GeneticOptimizer(strategy, backtester)
-    live_trader = LiveTrader(config['api_key'], config['api_secret'])
+    backtester = AdvancedBacktester(pd.DataFrame(), strategy, report_dir=config.get('report_dir'),
+                                    timeframe=config['timeframe'])  # Initialize with empty DataFrame
 
     # Fetch and process historical data
     logger.info("Fetching historical data...")
     historical_data = await data_fetcher.fetch_data()
-    
+    resampler = Resampler.from_frame(historical_data, base_timeframe)
+    historical_data = resampler.get(config['timeframe'])
+
     logger.info("Engineering features...")
-    engineered_data = feature_engineer.calculate_features(historical_data)
+    engineered_data = feature_engineer.calculate_features(historical_data, features=strategy.FEATURES,
+                                                          resampler=resampler)
 
     # Update backtester with engineered data
     backtester.data = engineered_data
@@ -37,42 +47,65 @@ async def main():
     # Run initial backtest
     logger.info("Running initial backtest...")
     initial_results = backtester.run()
-    logger.info(f"Initial backtest results:\n{backtester.analyze_results(initial_results)}")
+    logger.info(f"Initial backtest results:\n{backtester.analyze_results(initial_results, 'initial')}")
 
     # Optimize strategy using genetic algorithm
     logger.info("Optimizing strategy...")
+    from src.genetic_optimizer import GeneticOptimizer
+    genetic_optimizer = GeneticOptimizer(strategy, backtester, workers=config.get('optimizer_workers', 1),
+                                         checkpoint_path=config.get('optimizer_checkpoint'))
     optimization_params = {
         'n_atr': range(10, 30),
         'n_supertrend': range(5, 20),
         'atr_multiplier': range(1, 5),
-        'volume_threshold': range(10, 30, 5),  # 1.0 to 3.0 step 0.5
+        'volume_threshold': [x / 10 for x in range(10, 30, 5)],  # 1.0 to 3.0 step 0.5
         'rsi_period': range(10, 30),
         'rsi_overbought': range(65, 85, 5),
         'rsi_oversold': range(15, 35, 5),
         'macd_fast': range(8, 20),
         'macd_slow': range(20, 40),
         'macd_signal': range(5, 15),
-        'breakout_threshold': range(10, 30, 5)  # 1.0 to 3.0 step 0.5
+        'breakout_threshold': [x / 10 for x in range(10, 30, 5)]  # 1.0 to 3.0 step 0.5
     }
-    optimized_params = genetic_optimizer.optimize(engineered_data, optimization_params)
-    strategy.update_params(optimized_params)
+    optimized_params = genetic_optimizer.optimize(engineered_data, optimization_params, seed=config.get('seed'),
+                                                  search=config.get('optimizer_search', 'ga'),
+                                                  halving_options=config.get('halving_options'),
+                                                  resume=config.get('optimizer_resume', False))
 
     # Run backtest with optimized strategy
     logger.info("Running backtest with optimized strategy...")
-    optimized_results = backtester.run()
-    logger.info(f"Optimized backtest results:\n{backtester.analyze_results(optimized_results)}")
+    optimized_results = backtester.run(**optimized_params)
+    logger.info(f"Optimized backtest results:\n{backtester.analyze_results(optimized_results, 'optimized')}")
+
+    # Out-of-sample check: optimize on rolling train windows, score on the bars that follow
+    if config.get('walk_forward'):
+        logger.info("Running walk-forward optimization...")
+        from src.walk_forward import WalkForward
+        walk_forward = WalkForward(strategy, AdvancedBacktester, cash=backtester.cash, commission=backtester.commission,
+                                   engine=backtester.engine, workers=config.get('optimizer_workers', 1),
+                                   **config['walk_forward'])
+        walk_forward_results = walk_forward.run(engineered_data, optimization_params, seed=config.get('seed'))
+        logger.info(f"Walk-forward folds:\n{walk_forward_results['folds']}")
+        logger.info(f"Walk-forward out-of-sample metrics:\n{walk_forward_results['metrics']}")
 
     # Run Monte Carlo simulation
     logger.info("Running Monte Carlo simulation...")
-    monte_carlo_results = backtester.run_monte_carlo()
+    monte_carlo_results = backtester.run_monte_carlo(results=optimized_results, seed=config.get('seed'), summary=True)
 
     # Generate and print full report
     report = backtester.generate_report(optimized_results, optimized_params, monte_carlo_results)
     logger.info(f"Full Backtesting Report:\n{report}")
+    for path in backtester.close():
+        logger.info(f"Saved chart {path}")
+    if config.get('metrics_path'):
+        get_metrics().write(config['metrics_path'])
 
     # Start live trading if enabled
     if config['live_trading_enabled']:
         logger.info("Starting live trading...")
+        from src.live_trader import LiveTrader
+        live_trader = LiveTrader(config['api_key'], config['api_secret'], metrics_port=config.get('metrics_port'),
+                                 metrics_path=config.get('metrics_path'))
         await live_trader.start_trading(strategy)
     else:
         logger.info("Live trading is disabled. Exiting...")
@@ -0,0 +1,100 @@
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from src.utils.logger import get_logger
+
+class AccountState:
+    # In-memory view of positions and balance. Our own fills update it as they
+    # happen; reconcile() replaces it with the exchange's numbers and records any
+    # difference as drift. Reads never touch the network. A symbol with one of
+    # our orders in flight at any point while the exchange was being queried is
+    # left out of that reconciliation: the exchange's answer may predate the
+    # fill, which the order path applies itself.
+    def __init__(self, max_staleness=60.0, tolerance=1e-9, max_drift_events=100):
+        self.max_staleness = max_staleness
+        self.tolerance = tolerance
+        self.positions = {}  # symbol -> signed amount, short positions are negative
+        self.balance = None  # the exchange's 'total' balances by currency
+        self.reconciled_at = None
+        self.drift_events = deque(maxlen=max_drift_events)
+        self.pending = Counter()  # symbol -> our orders in flight
+        self.versions = Counter()  # symbol -> bumped when one of our orders starts or ends
+        self.logger = get_logger()
+
+    def staleness(self):
+        # Seconds since the last reconciliation, infinite before the first one
+        return time.monotonic() - self.reconciled_at if self.reconciled_at is not None else float('inf')
+
+    def is_stale(self):
+        return self.staleness() > self.max_staleness
+
+    def position(self, symbol):
+        return self.positions.get(symbol, 0.0)
+
+    def equity(self, currency='USDC'):
+        return self.balance.get(currency) if self.balance else None
+
+    @contextmanager
+    def placing(self, symbol):
+        # Wraps placing an order on `symbol` and applying its fill
+        self.pending[symbol] += 1
+        self.versions[symbol] += 1
+        try:
+            yield
+        finally:
+            self.versions[symbol] += 1
+            self.pending[symbol] -= 1
+            if not self.pending[symbol]:
+                del self.pending[symbol]
+
+    def order_versions(self):
+        # Taken before querying the exchange and handed back to reconcile()
+        return dict(self.versions)
+
+    def apply_fill(self, order):
+        # ccxt market orders report the filled amount, fall back to the requested one
+        amount = order.get('filled') or order.get('amount') or 0.0
+        signed = amount if order['side'] == 'buy' else -amount
+        position = self.positions.get(order['symbol'], 0.0) + signed
+        if abs(position) <= self.tolerance:
+            self.positions.pop(order['symbol'], None)
+        else:
+            self.positions[order['symbol']] = position
+        # Trading fees are what a fill takes out of the account's total value
+        if self.balance is not None:
+            for fee in order.get('fees') or ([order['fee']] if order.get('fee') else []):
+                if fee.get('cost') and fee.get('currency') in self.balance:
+                    self.balance[fee['currency']] -= fee['cost']
+
+    def reconcile(self, positions, balance=None, symbols=None, since=None):
+        # `positions` as returned by fetch_positions for `symbols` (all symbols if
+        # None), `since` the order_versions() from before the exchange was queried
+        exchange = {}
+        for position in positions:
+            amount = position.get('contracts') or position.get('amount') or 0.0
+            exchange[position['symbol']] = exchange.get(position['symbol'], 0.0) + (
+                amount if position['side'] == 'long' else -amount)
+
+        busy = set(self.pending)
+        if since is not None:
+            busy |= {symbol for symbol, version in self.versions.items() if version != since.get(symbol, 0)}
+        checked = (set(symbols) if symbols is not None else set(self.positions) | set(exchange)) - busy
+        drift = {}
+        for symbol in checked:
+            local, remote = self.positions.get(symbol, 0.0), exchange.get(symbol, 0.0)
+            if abs(local - remote) > self.tolerance:
+                drift[symbol] = (local, remote)
+            if abs(remote) > self.tolerance:
+                self.positions[symbol] = remote
+            else:
+                self.positions.pop(symbol, None)
+
+        if drift:
+            self.drift_events.append({'time': time.time(), 'drift': drift})
+            self.logger.warning(f"Account state drift, local vs exchange positions: {drift}")
+        # The balance is only taken while no order overlapped the query, fills
+        # keep it current otherwise
+        if balance is not None and not busy:
+            self.balance = dict(balance)
+        self.reconciled_at = time.monotonic()
+        return drift
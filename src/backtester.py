@@ -1,55 +1,179 @@
-from backtesting import Backtest
+import itertools
+import random
 import pandas as pd
-import matplotlib.pyplot as plt
-from src.utils.performance_metrics import calculate_performance_metrics
+from src.utils.metrics import get_metrics
+from src.utils.performance_metrics import calculate_performance_metrics, infer_periods_per_year, periods_per_year
+from src.monte_carlo import PERCENTILES, block_bootstrap, path_simulation, trade_equity_returns, trade_permutation
+from src.successive_halving import successive_halving
+from src.reporting import ReportRenderer, drawdown_figure, equity_figure, save_figure
+from src.vectorized_engine import run_vectorized, run_vectorized_batch
+
+OHLCV_ALIASES = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+# Rough bytes per bar and parameter set held by one batch chunk (indicator stacks, masks, equity)
+BATCH_BYTES_PER_CELL = 128
+
+def expand_grid(param_ranges, max_combinations=None, seed=None):
+    # Cartesian product of parameter ranges, randomly subsampled when it exceeds max_combinations
+    names = list(param_ranges)
+    values = [list(param_ranges[name]) for name in names]
+    total = 1
+    for options in values:
+        total *= len(options)
+    if max_combinations is None or total <= max_combinations:
+        return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+    param_sets = []
+    for flat in random.Random(seed).sample(range(total), max_combinations):
+        combination = []
+        for options in reversed(values):
+            flat, position = divmod(flat, len(options))
+            combination.append(options[position])
+        param_sets.append(dict(zip(names, reversed(combination))))
+    return param_sets
 
 class AdvancedBacktester:
-    def __init__(self, data, strategy, cash=10000, commission=0.002):
+    def __init__(self, data, strategy, cash=10000, commission=0.002, engine='backtesting', report_dir=None,
+                 timeframe=None):
         self.data = data
         self.strategy = strategy
         self.cash = cash
         self.commission = commission
+        self.engine = engine
+        self.timeframe = timeframe
+        # Charts are only rendered when a report directory is set, never to a display
+        self.report_dir = report_dir
+        self.renderer = None
+
+    def _backtest_data(self):
+        # backtesting.py requires capitalized OHLCV columns, the strategies read the lowercase ones
+        missing = {alias: self.data[column] for column, alias in OHLCV_ALIASES.items()
+                   if column in self.data and alias not in self.data}
+        return self.data.assign(**missing) if missing else self.data
+
+    def periods_per_year(self):
+        # Annualization factor for bar returns, from the timeframe when it is known
+        if self.timeframe:
+            return periods_per_year(self.timeframe)
+        return infer_periods_per_year(self.data.index)
+
+    def _backtest(self):
+        # backtesting.py is only imported for runs on that engine
+        from backtesting import Backtest
+        return Backtest(self._backtest_data(), self.strategy, cash=self.cash, commission=self.commission, exclusive_orders=True)
+
+    def run(self, engine=None, **kwargs):
+        engine = engine or self.engine
+        with get_metrics().timer('backtest', engine=engine):
+            if engine == 'vectorized':
+                return run_vectorized(self.data, self.strategy, kwargs, cash=self.cash, commission=self.commission)
+            if engine != 'backtesting':
+                raise ValueError(f"Unknown backtest engine: {engine}")
+            bt = self._backtest()
+            results = bt.run(**kwargs)
+            return results
+
+    def run_batch(self, param_sets, memory_budget=256 * 1024 * 1024):
+        # Vectorized evaluation of many parameter sets, chunked to stay within memory_budget
+        if isinstance(param_sets, pd.DataFrame):
+            param_sets = param_sets.to_dict('records')
+        elif isinstance(param_sets, dict):
+            param_sets = expand_grid(param_sets)
+        chunk = max(1, memory_budget // (BATCH_BYTES_PER_CELL * max(len(self.data), 1)))
 
-    def run(self, **kwargs):
-        bt = Backtest(self.data, self.strategy, cash=self.cash, commission=self.commission, exclusive_orders=True)
-        results = bt.run(**kwargs)
-        return results
+        tables = []
+        for start in range(0, len(param_sets), chunk):
+            batch = param_sets[start:start + chunk]
+            with get_metrics().timer('backtest_batch'):
+                table = run_vectorized_batch(self.data, self.strategy, batch, cash=self.cash, commission=self.commission)
+            get_metrics().inc('backtest_batch_params', len(batch))
+            tables.append(pd.concat([pd.DataFrame(batch), table], axis=1))
+        return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
 
-    def optimize(self, optimization_params, maximize='Sharpe Ratio'):
-        bt = Backtest(self.data, self.strategy, cash=self.cash, commission=self.commission, exclusive_orders=True)
+    def optimize(self, optimization_params, maximize='Sharpe Ratio', engine=None, max_tries=None,
+                 method='grid', seed=None, **halving_options):
+        if method == 'halving':
+            # Scores the grid on growing prefixes of the history; shuffled so that a
+            # bar-evaluation budget starts from a random part of the grid
+            param_sets = expand_grid(optimization_params, max_combinations=max_tries, seed=seed)
+            random.Random(seed).shuffle(param_sets)
+            search = successive_halving(self, param_sets, maximize=maximize, **halving_options)
+            results = self.run(engine=engine, **search['best'])
+            results.attrs['search'] = search
+            return results
+        if method != 'grid':
+            raise ValueError(f"Unknown optimization method: {method}")
+        if (engine or self.engine) == 'vectorized':
+            param_sets = expand_grid(optimization_params, max_combinations=max_tries)
+            table = self.run_batch(param_sets)
+            return self.run(engine='vectorized', **param_sets[int(table[maximize].idxmax())])
+
+        bt = self._backtest()
         optimized_results = bt.optimize(**optimization_params, maximize=maximize)
         return optimized_results
 
-    def run_monte_carlo(self, num_simulations=1000):
-        results = []
-        for _ in range(num_simulations):
-            shuffled_data = self.data.sample(frac=1).reset_index(drop=True)
-            bt = Backtest(shuffled_data, self.strategy, cash=self.cash, commission=self.commission, exclusive_orders=True)
-            result = bt.run()
-            results.append(result['Return [%]'])
-        return pd.Series(results)
-
-    def analyze_results(self, results):
-        performance_metrics = calculate_performance_metrics(results)
-        self.plot_equity_curve(results)
-        self.plot_drawdown(results)
+    def run_monte_carlo(self, num_simulations=1000, method='block', results=None, block_size=None,
+                        seed=None, workers=1, memory_budget=256 * 1024 * 1024, params=None, summary=False):
+        # Returns one row per simulation with 'Return [%]' and 'Max. Drawdown [%]',
+        # or with summary=True their describe() table built without keeping the
+        # rows. 'block' and 'trades'/'trade_bootstrap' resample a finished
+        # backtest in vectorized batches sized to memory_budget, 'path' re-runs
+        # the strategy on resampled prices.
+        with get_metrics().timer('monte_carlo', method=method):
+            return self._run_monte_carlo(num_simulations, method, results, block_size, seed, workers, memory_budget,
+                                         params or {}, summary)
+
+    def _run_monte_carlo(self, num_simulations, method, results, block_size, seed, workers, memory_budget, params,
+                         summary):
+        if method == 'path':
+            return path_simulation(self, num_simulations, block_size=block_size, seed=seed, workers=workers,
+                                   params=params, summary=summary)
+
+        if results is None:
+            results = self.run(**params)
+        if method in ('trades', 'trade_bootstrap'):
+            trade_returns = trade_equity_returns(results['_trades'], results['_equity_curve']['Equity'])
+            return trade_permutation(trade_returns, num_simulations, seed=seed,
+                                     memory_budget=memory_budget, replace=method == 'trade_bootstrap', summary=summary)
+        if method == 'block':
+            bar_returns = results['_equity_curve']['Equity'].pct_change().to_numpy()[1:]
+            return block_bootstrap(bar_returns, num_simulations, block_size=block_size, seed=seed,
+                                   memory_budget=memory_budget, periods_per_year=self.periods_per_year(),
+                                   summary=summary)
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+
+    def analyze_results(self, results, name='backtest'):
+        # Metrics are computed once per results object and kept in its attrs, so
+        # generate_report and repeated calls reuse them
+        performance_metrics = results.attrs.get('performance_metrics')
+        if performance_metrics is None:
+            performance_metrics = calculate_performance_metrics(results, self.periods_per_year())
+            results.attrs['performance_metrics'] = performance_metrics
+        if self.report_dir and not results.attrs.get('report_rendered'):
+            if self.renderer is None:
+                self.renderer = ReportRenderer(self.report_dir)
+            self.renderer.submit(name, results)
+            results.attrs['report_rendered'] = True
         return performance_metrics
 
-    def plot_equity_curve(self, results):
-        plt.figure(figsize=(12, 6))
-        plt.plot(results['_equity_curve'])
-        plt.title('Equity Curve')
-        plt.xlabel('Date')
-        plt.ylabel('Equity')
-        plt.show()
-
-    def plot_drawdown(self, results):
-        plt.figure(figsize=(12, 6))
-        plt.plot(results['_drawdown'])
-        plt.title('Drawdown')
-        plt.xlabel('Date')
-        plt.ylabel('Drawdown %')
-        plt.show()
+    def plot_equity_curve(self, results, path=None):
+        fig = equity_figure(results)
+        return save_figure(fig, path) if path else fig
+
+    def plot_drawdown(self, results, path=None):
+        fig = drawdown_figure(results)
+        return save_figure(fig, path) if path else fig
+
+    def wait_for_reports(self):
+        # Blocks until all queued charts are written and returns their paths
+        return self.renderer.wait() if self.renderer is not None else []
+
+    def close(self):
+        if self.renderer is not None:
+            paths = self.renderer.close()
+            self.renderer = None
+            return paths
+        return []
 
     def generate_report(self, results, optimized_results=None, monte_carlo_results=None):
         report = f"""
@@ -78,12 +202,23 @@ class AdvancedBacktester:
             """
 
         if monte_carlo_results is not None:
+            # Per-simulation rows or the summary table run_monte_carlo(summary=True) returns
+            mc = monte_carlo_results
+            if not mc.attrs.get('summary'):
+                mc = mc.describe(percentiles=PERCENTILES)
             report += f"""
             Monte Carlo Simulation Results:
-            Mean Return: {monte_carlo_results.mean():.2f}%
-            Median Return: {monte_carlo_results.median():.2f}%
-            5th Percentile: {monte_carlo_results.quantile(0.05):.2f}%
-            95th Percentile: {monte_carlo_results.quantile(0.95):.2f}%
+            Mean Return: {mc.at['mean', 'Return [%]']:.2f}%
+            Median Return: {mc.at['50%', 'Return [%]']:.2f}%
+            5th Percentile: {mc.at['5%', 'Return [%]']:.2f}%
+            95th Percentile: {mc.at['95%', 'Return [%]']:.2f}%
+            Median Max Drawdown: {mc.at['50%', 'Max. Drawdown [%]']:.2f}%
+            5th Percentile Max Drawdown: {mc.at['5%', 'Max. Drawdown [%]']:.2f}%
+            """
+            if 'Sharpe Ratio' in mc:
+                report += f"""
+            Median Sharpe Ratio: {mc.at['50%', 'Sharpe Ratio']:.2f}
+            5th Percentile Sharpe Ratio: {mc.at['5%', 'Sharpe Ratio']:.2f}
             """
 
         return report
\ No newline at end of file
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+def decode_candles(data, dtype=np.float64):
+    # Decodes a candleSnapshot response into an int64 epoch-ms vector and an
+    # (n, 5) OHLCV block. Prices arrive as strings and are parsed by NumPy
+    # straight into `dtype`, one pass per column without intermediate lists.
+    n = len(data)
+    timestamps = np.fromiter((candle['t'] for candle in data), dtype=np.int64, count=n)
+    values = np.empty((n, len(OHLCV_COLUMNS)), dtype=dtype)
+    for j, key in enumerate('ohlcv'):
+        values[:, j] = np.fromiter((candle[key] for candle in data), dtype=dtype, count=n)
+    return timestamps, values
+
+class CandleBuffer:
+    def __init__(self, capacity=1024, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((capacity, len(OHLCV_COLUMNS)), dtype=self.dtype)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, capacity):
+        if capacity <= len(self.timestamps):
+            return
+        capacity = max(capacity, 2 * len(self.timestamps))
+        timestamps = np.empty(capacity, dtype=np.int64)
+        values = np.empty((capacity, len(OHLCV_COLUMNS)), dtype=self.dtype)
+        timestamps[:self.size] = self.timestamps[:self.size]
+        values[:self.size] = self.values[:self.size]
+        self.timestamps, self.values = timestamps, values
+
+    def append(self, timestamps, values):
+        n = len(timestamps)
+        self._reserve(self.size + n)
+        self.timestamps[self.size:self.size + n] = timestamps
+        self.values[self.size:self.size + n] = values
+        self.size += n
+
+    def truncate(self, size):
+        # Drops the rows from `size` on, the storage is kept for later appends
+        self.size = min(self.size, size)
+
+    def normalize(self, keep='last'):
+        # Sorts by timestamp and drops duplicated timestamps, returns the number
+        # of rows dropped
+        timestamps = self.timestamps[:self.size]
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            self.timestamps[:self.size] = timestamps[order]
+            self.values[:self.size] = self.values[:self.size][order]
+            timestamps = self.timestamps[:self.size]
+
+        duplicated = np.zeros(self.size, dtype=bool)
+        if keep == 'last':
+            duplicated[:-1] = timestamps[1:] == timestamps[:-1]
+        else:
+            duplicated[1:] = timestamps[1:] == timestamps[:-1]
+        dropped = int(duplicated.sum())
+        if dropped:
+            kept = ~duplicated
+            n = self.size - dropped
+            self.timestamps[:n] = timestamps[kept]
+            self.values[:n] = self.values[:self.size][kept]
+            self.size = n
+        return dropped
+
+    def gaps(self, interval_ms):
+        # (previous, next) timestamp pairs that are further apart than one interval
+        timestamps = self.timestamps[:self.size]
+        rows = np.flatnonzero(np.diff(timestamps) > interval_ms)
+        return list(zip(timestamps[rows].tolist(), timestamps[rows + 1].tolist()))
+
+    def to_frame(self):
+        # The frame wraps the buffer's OHLCV block without copying it
+        index = pd.DatetimeIndex(self.timestamps[:self.size].astype('datetime64[ms]'), name='timestamp')
+        return pd.DataFrame(self.values[:self.size], index=index, columns=OHLCV_COLUMNS, copy=False)
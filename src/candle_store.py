@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pandas as pd
+from src.candle_buffer import OHLCV_COLUMNS
+
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),  # candle open time, epoch milliseconds
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+# Append-only candle files, one per (symbol, timeframe), read through np.memmap.
+# Records are fixed-size and sorted by timestamp, so loading is a page-cache
+# mapping and range queries are a binary search over the timestamp column.
+class CandleStore:
+    def __init__(self, root='data/candles'):
+        self.root = root
+
+    def _path(self, symbol, timeframe):
+        return os.path.join(self.root, f"{symbol}_{timeframe}.bin")
+
+    def load(self, symbol, timeframe):
+        path = self._path(symbol, timeframe)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r')
+
+    def first_timestamp(self, symbol, timeframe):
+        records = self.load(symbol, timeframe)
+        return int(records['timestamp'][0]) if len(records) else None
+
+    def last_timestamp(self, symbol, timeframe):
+        records = self.load(symbol, timeframe)
+        return int(records['timestamp'][-1]) if len(records) else None
+
+    def write(self, symbol, timeframe, records, replace=False):
+        records = np.asarray(records, dtype=CANDLE_DTYPE)
+        if not len(records) and not replace:
+            # An empty top-up (nothing new since the last run) leaves the file as it is
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(symbol, timeframe)
+
+        if replace:
+            keep = 0
+        else:
+            # Stored candles at or after the first new one are superseded, this
+            # also replaces the still-forming last candle of the previous run
+            stored = self.load(symbol, timeframe)
+            keep = int(np.searchsorted(stored['timestamp'], records['timestamp'][0], side='left'))
+            del stored
+
+        mode = 'wb' if replace else ('r+b' if os.path.exists(path) else 'wb')
+        with open(path, mode) as f:
+            f.truncate(keep * CANDLE_DTYPE.itemsize)
+            f.seek(keep * CANDLE_DTYPE.itemsize)
+            f.write(records.tobytes())
+
+    def query(self, symbol, timeframe, start=None, end=None, dtype=np.float64):
+        # start/end are epoch milliseconds, both inclusive; OHLCV columns come as `dtype`
+        records = self.load(symbol, timeframe)
+        timestamps = records['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(records) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return to_frame(records[lo:hi], dtype)
+
+def to_frame(records, dtype=np.float64):
+    # Records are stored as float64, the frame gets one `dtype` block
+    values = np.empty((len(records), len(OHLCV_COLUMNS)), dtype=dtype)
+    for j, column in enumerate(OHLCV_COLUMNS):
+        values[:, j] = records[column]
+    index = pd.DatetimeIndex(np.asarray(records['timestamp']).astype('datetime64[ms]'), name='timestamp')
+    return pd.DataFrame(values, index=index, columns=OHLCV_COLUMNS, copy=False)
+
+def from_frame(df):
+    records = np.empty(len(df), dtype=CANDLE_DTYPE)
+    records['timestamp'] = df.index.values.astype('datetime64[ms]').astype('int64')
+    for column in OHLCV_COLUMNS:
+        records[column] = df[column].to_numpy(dtype='float64')
+    return records
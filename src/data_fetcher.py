@@ -1,28 +1,98 @@
 import asyncio
+import random
 import aiohttp
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+from src.candle_buffer import CandleBuffer, decode_candles
+from src.candle_store import from_frame
+from src.live_feed import CandleFeed
+from src.utils.logger import get_logger
+from src.utils.metrics import get_metrics
+from src.utils.rate_limiter import TokenBucket
+from src.utils.timeframe import timeframe_to_ms
+
+class DataFetchError(Exception):
+    pass
 
 class DataFetcher:
-    def __init__(self, symbol, timeframe, total_limit):
+    def __init__(self, symbol, timeframe, total_limit, max_concurrency=8, requests_per_second=10,
+                 max_retries=3, retry_backoff=0.5, base_url='https://api.hyperliquid.xyz/info', store=None,
+                 dtype=np.float64, rate_limiter=None):
         self.symbol = symbol
         self.timeframe = timeframe
         self.total_limit = total_limit
-        self.base_url = 'https://api.hyperliquid.xyz/info'
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Pass a shared TokenBucket to keep several fetchers within one request budget
+        self.rate_limiter = rate_limiter or TokenBucket(requests_per_second, capacity=max_concurrency)
+        self.store = store
+        self.dtype = dtype
+        self.logger = get_logger()
+        self.metrics = get_metrics()
+        # Filled by every fetch_data call so callers can inspect data quality
+        self.gaps = []
+        self.duplicates = 0
+
+    async def fetch_data(self, concurrent=True):
+        end_time = datetime.now()
+        start_time = end_time - timedelta(days=self.total_limit)
+
+        if self.store is None:
+            return await self._fetch_range(start_time, end_time, concurrent)
+
+        # Only the tail after the last stored candle has to come from the API
+        first = self.store.first_timestamp(self.symbol, self.timeframe)
+        last = self.store.last_timestamp(self.symbol, self.timeframe)
+        start_ms = start_time.timestamp() * 1000
+        # The first stored candle opens up to one interval after the window start
+        if first is not None and first <= start_ms + timeframe_to_ms(self.timeframe) and start_ms <= last:
+            fetch_start, replace = datetime.fromtimestamp(last / 1000), False
+        else:
+            fetch_start, replace = start_time, True
+
+        df = await self._fetch_range(fetch_start, end_time, concurrent)
+        if len(df):
+            self.store.write(self.symbol, self.timeframe, from_frame(df), replace=replace)
+        return self.load_range(start_time, end_time)
+
+    def load_range(self, start_time=None, end_time=None):
+        # Reads a sub-window from the candle store without loading the full history
+        to_ms = lambda t: None if t is None else int(t.timestamp() * 1000)
+        return self.store.query(self.symbol, self.timeframe, to_ms(start_time), to_ms(end_time), dtype=self.dtype)
+
+    async def _fetch_range(self, start_time, end_time, concurrent):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            windows = self._chunk_windows(start_time, end_time)
+
+            if concurrent:
+                chunks = await self._fetch_concurrent(session, windows)
+            else:
+                chunks = [await self._fetch_chunk(session, chunk_start, chunk_end)
+                          for chunk_start, chunk_end in windows]
 
-    async def fetch_data(self):
-        async with aiohttp.ClientSession() as session:
-            all_data = []
-            end_time = datetime.now()
-            start_time = end_time - timedelta(days=self.total_limit)
+            return self._assemble(chunks)
 
-            while start_time < end_time:
-                chunk_end = min(start_time + timedelta(days=1), end_time)
-                data = await self._fetch_chunk(session, start_time, chunk_end)
-                all_data.extend(data)
-                start_time = chunk_end
+    def _chunk_windows(self, start_time, end_time):
+        windows = []
+        while start_time < end_time:
+            chunk_end = min(start_time + timedelta(days=1), end_time)
+            windows.append((start_time, chunk_end))
+            start_time = chunk_end
+        return windows
 
-            return pd.DataFrame(all_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    async def _fetch_concurrent(self, session, windows):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(chunk_start, chunk_end):
+            async with semaphore:
+                return await self._fetch_chunk(session, chunk_start, chunk_end)
+
+        # gather keeps the results in window order regardless of completion order
+        return await asyncio.gather(*(fetch(chunk_start, chunk_end) for chunk_start, chunk_end in windows))
 
     async def _fetch_chunk(self, session, start_time, end_time):
         payload = {
@@ -35,24 +105,52 @@ class DataFetcher:
             }
         }
 
-        async with session.post(self.base_url, json=payload) as response:
-            if response.status == 200:
-                data = await response.json()
-                return [
-                    [
-                        datetime.fromtimestamp(candle['t'] / 1000),
-                        float(candle['o']),
-                        float(candle['h']),
-                        float(candle['l']),
-                        float(candle['c']),
-                        float(candle['v'])
-                    ]
-                    for candle in data
-                ]
-            else:
-                print(f"Error fetching data: {response.status}")
-                return []
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                with self.metrics.timer('data_fetch_request'):
+                    async with session.post(self.base_url, json=payload) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            return decode_candles(data, self.dtype)
+                        error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+
+            if attempt < self.max_retries:
+                self.metrics.inc('data_fetch_retries')
+                delay = self.retry_backoff * 2 ** attempt * (1 + random.random())
+                self.logger.warning(f"Error fetching {self.symbol} {start_time} - {end_time}: {error}, "
+                                    f"retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+        self.metrics.inc('data_fetch_failures')
+        raise DataFetchError(f"Failed to fetch {self.symbol} {start_time} - {end_time} "
+                             f"after {self.max_retries + 1} attempts: {error}")
+
+    def _assemble(self, chunks):
+        buffer = CandleBuffer(capacity=sum(len(timestamps) for timestamps, _ in chunks) or 1, dtype=self.dtype)
+        for timestamps, values in chunks:
+            buffer.append(timestamps, values)
+
+        # Adjacent windows share their boundary candle, keep the most recent copy
+        self.duplicates = buffer.normalize(keep='last')
+
+        self.gaps = [(pd.Timestamp(prev, unit='ms'), pd.Timestamp(nxt, unit='ms'))
+                     for prev, nxt in buffer.gaps(timeframe_to_ms(self.timeframe))]
+        if self.gaps:
+            self.logger.warning(f"Detected {len(self.gaps)} gaps in {self.symbol} {self.timeframe} candles")
+
+        # Candle times are UTC epoch milliseconds, the same convention as the candle store
+        return buffer.to_frame()
 
-    async def fetch_live_data(self):
-        # Implement WebSocket connection for live data
-        pass
\ No newline at end of file
+    async def fetch_live_data(self, ws_url='wss://api.hyperliquid.xyz/ws', capacity=1000):
+        # Yields each closed bar as soon as the socket reports the next candle
+        feed = CandleFeed(self, ws_url=ws_url, capacity=capacity)
+        queue = feed.subscribe()
+        task = asyncio.create_task(feed.run())
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            task.cancel()
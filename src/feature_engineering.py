@@ -1,54 +1,283 @@
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 import talib
+from src.indicators.custom_indicators import calculate_supertrend, rolling_max, rolling_min
+from src.resampler import Resampler
+from src.utils.timeframe import ms_to_timeframe
+
+# Features are nodes in a small DAG: each one names its output columns and the
+# features it is derived from. Only what a caller asks for (plus its
+# dependencies) is computed, level by level, with the independent TA-Lib calls
+# of a level running on a thread pool since TA-Lib releases the GIL. Results
+# are stored as float32 columns of one Fortran-ordered block.
+
+class _Feature:
+    def __init__(self, func, outputs, deps, default):
+        self.func = func
+        self.outputs = outputs
+        self.deps = deps
+        self.default = default
+
+_FEATURES = {}  # output column -> node producing it, in registration order
+
+def feature(*outputs, deps=(), default=True):
+    # Registers func(inputs) -> array (or tuple of arrays, one per output).
+    # `inputs` holds float64 open/high/low/close/volume, the DatetimeIndex as
+    # 'index' and the float64 values of every feature in `deps`. Features with
+    # default=False are only computed when asked for by name.
+    def decorator(func):
+        node = _Feature(func, outputs, tuple(deps), default)
+        for output in outputs:
+            _FEATURES[output] = node
+        return func
+    return decorator
+
+def available_features():
+    return list(_FEATURES)
+
+def default_features():
+    return [name for name, node in _FEATURES.items() if node.default]
+
+def resolve_features(features):
+    # Nodes needed for `features`, grouped into levels whose members only depend
+    # on earlier levels
+    depth = {}
+
+    def visit(name, path=()):
+        if name not in _FEATURES:
+            raise KeyError(f"Unknown feature {name!r}")
+        node = _FEATURES[name]
+        if node not in depth:
+            if name in path:
+                raise ValueError(f"Feature dependency cycle: {' -> '.join(path + (name,))}")
+            depth[node] = 1 + max((visit(dep, path + (name,)) for dep in node.deps), default=-1)
+        return depth[node]
+
+    for name in features:
+        visit(name)
+    levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for node, level in depth.items():
+        levels[level].append(node)
+    return levels
+
+class FeatureMatrix:
+    # Feature values as one (bars x features) float32 block. Columns are
+    # contiguous, so both writing a feature and reading one back are cheap.
+    def __init__(self, values, columns, index):
+        self.values = values
+        self.columns = list(columns)
+        self.column_index = {column: i for i, column in enumerate(self.columns)}
+        self.index = index
+
+    def __getitem__(self, column):
+        return self.values[:, self.column_index[column]]
+
+    def __contains__(self, column):
+        return column in self.column_index
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def to_frame(self):
+        # Single float32 block, no copy of the values
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+def _pct_change(x):
+    out = np.full(len(x), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = x[1:] / x[:-1] - 1
+    return out
+
+# Technical indicators
+@feature('sma_fast')
+def _sma_fast(inputs):
+    return talib.SMA(inputs['close'], timeperiod=20)
+
+@feature('sma_slow')
+def _sma_slow(inputs):
+    return talib.SMA(inputs['close'], timeperiod=50)
+
+@feature('rsi')
+def _rsi(inputs):
+    return talib.RSI(inputs['close'], timeperiod=14)
+
+@feature('macd', 'macd_signal')
+def _macd(inputs):
+    macd, macd_signal, _ = talib.MACD(inputs['close'])
+    return macd, macd_signal
+
+@feature('atr')
+def _atr(inputs):
+    return talib.ATR(inputs['high'], inputs['low'], inputs['close'], timeperiod=14)
+
+@feature('supertrend', default=False)
+def _supertrend(inputs):
+    # Trend filter, typically on a higher timeframe ('supertrend@1h')
+    return calculate_supertrend(inputs['high'], inputs['low'], inputs['close'], 10, 3)
+
+@feature('bollinger_upper', 'bollinger_middle', 'bollinger_lower')
+def _bollinger(inputs):
+    # Explicit period: TA-Lib 0.4.x defaults to 5, newer releases to 20
+    return talib.BBANDS(inputs['close'], timeperiod=5, nbdevup=2, nbdevdn=2)
+
+# Volume indicators
+@feature('obv')
+def _obv(inputs):
+    return talib.OBV(inputs['close'], inputs['volume'])
+
+@feature('adosc')
+def _adosc(inputs):
+    return talib.ADOSC(inputs['high'], inputs['low'], inputs['close'], inputs['volume'])
+
+# Momentum indicators
+@feature('mom')
+def _mom(inputs):
+    return talib.MOM(inputs['close'], timeperiod=10)
+
+@feature('roc')
+def _roc(inputs):
+    return talib.ROC(inputs['close'], timeperiod=10)
+
+# Volatility
+@feature('volatility')
+def _volatility(inputs):
+    return pd.Series(inputs['close']).rolling(window=20).std().to_numpy()
+
+# Custom features
+@feature('price_change')
+def _price_change(inputs):
+    return _pct_change(inputs['close'])
+
+@feature('volume_change')
+def _volume_change(inputs):
+    return _pct_change(inputs['volume'])
+
+@feature('high_low_range')
+def _high_low_range(inputs):
+    return (inputs['high'] - inputs['low']) / inputs['low']
+
+# Market regime
+@feature('market_regime', deps=('sma_fast', 'sma_slow'))
+def _market_regime(inputs):
+    return np.where(inputs['sma_fast'] > inputs['sma_slow'], 1, -1)
+
+# Support and resistance levels
+@feature('support')
+def _support(inputs):
+    return rolling_min(inputs['low'], 20)
+
+@feature('resistance')
+def _resistance(inputs):
+    return rolling_max(inputs['high'], 20)
+
+# Candlestick patterns
+@feature('doji')
+def _doji(inputs):
+    return talib.CDLDOJI(inputs['open'], inputs['high'], inputs['low'], inputs['close'])
+
+@feature('engulfing')
+def _engulfing(inputs):
+    return talib.CDLENGULFING(inputs['open'], inputs['high'], inputs['low'], inputs['close'])
+
+@feature('hammer')
+def _hammer(inputs):
+    return talib.CDLHAMMER(inputs['open'], inputs['high'], inputs['low'], inputs['close'])
+
+# Time-based features
+@feature('hour')
+def _hour(inputs):
+    return inputs['index'].hour.to_numpy()
+
+@feature('day_of_week')
+def _day_of_week(inputs):
+    return inputs['index'].dayofweek.to_numpy()
+
+@feature('is_weekend', deps=('day_of_week',))
+def _is_weekend(inputs):
+    return inputs['day_of_week'] >= 5
+
+def _bar_ms(index, resampler=None):
+    # Bar interval of a frame, the resampler's base interval when it cannot be told
+    if len(index) > 1:
+        return int(np.median(np.diff(index.values).astype('timedelta64[ms]').astype(np.int64)))
+    if resampler is None:
+        raise ValueError("Cannot infer the bar interval of fewer than two candles")
+    return resampler.base_ms
 
 class FeatureEngineer:
-    def calculate_features(self, df):
-        # Technical indicators
-        df['sma_fast'] = talib.SMA(df['close'], timeperiod=20)
-        df['sma_slow'] = talib.SMA(df['close'], timeperiod=50)
-        df['rsi'] = talib.RSI(df['close'], timeperiod=14)
-        df['macd'], df['macd_signal'], _ = talib.MACD(df['close'])
-        df['atr'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
-        df['bollinger_upper'], df['bollinger_middle'], df['bollinger_lower'] = talib.BBANDS(df['close'])
-
-        # Volume indicators
-        df['obv'] = talib.OBV(df['close'], df['volume'])
-        df['adosc'] = talib.ADOSC(df['high'], df['low'], df['close'], df['volume'])
-
-        # Momentum indicators
-        df['mom'] = talib.MOM(df['close'], timeperiod=10)
-        df['roc'] = talib.ROC(df['close'], timeperiod=10)
-
-        # Volatility
-        df['volatility'] = df['close'].rolling(window=20).std()
-
-        # Custom features
-        df['price_change'] = df['close'].pct_change()
-        df['volume_change'] = df['volume'].pct_change()
-        df['high_low_range'] = (df['high'] - df['low']) / df['low']
-
-        # Market regime
-        df['market_regime'] = np.where(df['sma_fast'] > df['sma_slow'], 1, -1)
-
-        # Support and resistance levels
-        df['support'] = df['low'].rolling(window=20).min()
-        df['resistance'] = df['high'].rolling(window=20).max()
-
-        # Candlestick patterns
-        df['doji'] = talib.CDLDOJI(df['open'], df['high'], df['low'], df['close'])
-        df['engulfing'] = talib.CDLENGULFING(df['open'], df['high'], df['low'], df['close'])
-        df['hammer'] = talib.CDLHAMMER(df['open'], df['high'], df['low'], df['close'])
-
-        # Time-based features
-        df['hour'] = df.index.hour
-        df['day_of_week'] = df.index.dayofweek
-        df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    def __init__(self, workers=4):
+        self.workers = workers
 
-        return df
+    def calculate_feature_matrix(self, df, features=None, resampler=None):
+        # `features` defaults to default_features(); dependencies that were
+        # not asked for are computed but left out of the matrix. A name like
+        # 'supertrend@1h' is computed on 1h candles from `resampler` (built from
+        # df when not given) and each bar of df sees the last 1h bar closed by
+        # its own close.
+        features = list(dict.fromkeys(default_features() if features is None else features))
+        values = np.empty((len(df), len(features)), dtype=np.float32, order='F')
+        by_timeframe = {}
+        for i, name in enumerate(features):
+            base, _, timeframe = name.partition('@')
+            by_timeframe.setdefault(timeframe or None, []).append((i, base))
+
+        for timeframe, group in by_timeframe.items():
+            positions, names = [i for i, _ in group], [name for _, name in group]
+            if timeframe is None:
+                self._compute(df, names, values, positions)
+                continue
+            bar_ms = _bar_ms(df.index, resampler)
+            if resampler is None:
+                resampler = Resampler.from_frame(df, ms_to_timeframe(bar_ms))
+            bars = resampler.get(timeframe)
+            block = np.empty((len(bars), len(names)), dtype=np.float32, order='F')
+            self._compute(bars, names, block, range(len(names)))
+            values[:, positions] = resampler.align(block, timeframe, df.index, bar_ms)
+        return FeatureMatrix(values, features, df.index)
+
+    def _compute(self, df, features, values, positions):
+        # Writes `features` of df into the given columns of `values`
+        levels = resolve_features(features)
+        needed = {dep for level in levels for node in level for dep in node.deps}
+        position = dict(zip(features, positions))
+
+        inputs = {column: df[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close', 'volume')}
+        inputs['index'] = df.index
+
+        def store(node, result):
+            if len(node.outputs) == 1:
+                result = (result,)
+            for output, column in zip(node.outputs, result):
+                column = np.asarray(column, dtype=np.float64)
+                if output in position:
+                    values[:, position[output]] = column
+                if output in needed:
+                    inputs[output] = column
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            for level in levels:
+                if self.workers > 1 and len(level) > 1:
+                    results = list(executor.map(lambda node: node.func(inputs), level))
+                else:
+                    results = [node.func(inputs) for node in level]
+                for node, result in zip(level, results):
+                    store(node, result)
+
+    def calculate_features(self, df, features=None, resampler=None):
+        # Returns a new frame with the OHLCV columns of `df` followed by the features
+        matrix = self.calculate_feature_matrix(df, features, resampler)
+        if not matrix.columns:
+            return df.copy()
+        return pd.concat([df.drop(columns=matrix.columns, errors='ignore'), matrix.to_frame()], axis=1)
 
     def normalize_features(self, df):
         # Normalize numerical features
         numerical_features = ['sma_fast', 'sma_slow', 'rsi', 'macd', 'atr', 'obv', 'adosc', 'mom', 'roc', 'volatility']
+        numerical_features = [column for column in numerical_features if column in df.columns]
         df[numerical_features] = (df[numerical_features] - df[numerical_features].mean()) / df[numerical_features].std()
-        return df
\ No newline at end of file
+        return df
@@ -1,52 +1,330 @@
+import json
+import math
+import os
+import pickle
 import random
-from deap import base, creator, tools, algorithms
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.indicators.cache import fingerprint
+from src.successive_halving import successive_halving
+from src.utils.fitness_cache import FitnessCache
+from src.utils.metrics import get_metrics
+from src.utils.shared_frame import SharedFrame, attach_frame
+
+LEGACY_PARAMS = ['n_sma_fast', 'n_sma_slow', 'rsi_period', 'atr_multiplier', 'volume_ratio_threshold']
+
+def decode_individual(individual, param_ranges=None):
+    if param_ranges is None:
+        params = dict(zip(LEGACY_PARAMS, individual))
+        params['volume_ratio_threshold'] = individual[4] / 10  # Scale down to get values between 1 and 10
+        return params
+    # Each gene is an index into the candidate values of its parameter
+    return {name: values[gene] for gene, (name, values) in zip(individual, param_ranges.items())}
+
+def _create_types():
+    # deap is imported and its creator classes are made on first use, not at
+    # import or construction; checkpoints need them before unpickling. The
+    # classes are global, creating them twice only triggers warnings.
+    from deap import base, creator
+    if not hasattr(creator, "FitnessMax"):
+        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", list, fitness=creator.FitnessMax)
+    return creator
+
+def _fitness(stats):
+    value = stats['Return [%]']
+    return (-math.inf if value is None or np.isnan(value) else float(value)),
+
+# Worker process state, set once per worker by _init_worker
+_worker = {}
+
+def _init_worker(frame_spec, strategy, backtester_cls, cash, commission, engine):
+    shm, data = attach_frame(frame_spec)
+    _worker['shm'] = shm
+    _worker['backtester'] = backtester_cls(data, strategy, cash=cash, commission=commission, engine=engine)
+
+def _evaluate_params(params):
+    return _fitness(_worker['backtester'].run(**params))
+
+def _evaluate_batch(params_list):
+    return _batch_fitness(_worker['backtester'], params_list)
+
+def _batch_fitness(backtester, params_list):
+    table = backtester.run_batch(params_list)
+    return [(-math.inf if np.isnan(value) else float(value),) for value in table['Return [%]']]
 
 class GeneticOptimizer:
-    def __init__(self, strategy, backtester):
+    def __init__(self, strategy, backtester, workers=1, cache_path=None, cache_size=100000,
+                 checkpoint_path=None, checkpoint_every=1):
         self.strategy = strategy
         self.backtester = backtester
-        self.setup_genetic_algorithm()
+        self.workers = workers
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        # GA state is pickled to checkpoint_path every checkpoint_every generations,
+        # per-generation timings are appended to <checkpoint_path>.metrics.jsonl
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.fitness_cache = None
+        self.param_ranges = None
+        self.pool = None
+        self.search_report = None
+        self._toolbox = None
+
+    @property
+    def toolbox(self):
+        if self._toolbox is None:
+            self.setup_genetic_algorithm()
+        return self._toolbox
 
     def setup_genetic_algorithm(self):
-        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMax)
+        from deap import base, tools
+        creator = _create_types()
+        self._toolbox = base.Toolbox()
+        self._toolbox.register("attr_int", random.randint, 10, 100)
+        self._toolbox.register("individual", tools.initRepeat, creator.Individual, self._toolbox.attr_int, n=5)
+        self._toolbox.register("population", tools.initRepeat, list, self._toolbox.individual)
+        self._toolbox.register("evaluate", self.evaluate)
+        self._toolbox.register("mate", tools.cxTwoPoint)
+        self._toolbox.register("mutate", tools.mutUniformInt, low=10, up=100, indpb=0.05)
+        self._toolbox.register("select", tools.selTournament, tournsize=3)
 
-        self.toolbox = base.Toolbox()
-        self.toolbox.register("attr_int", random.randint, 10, 100)
-        self.toolbox.register("individual", tools.initRepeat, creator.Individual, self.toolbox.attr_int, n=5)
+    def _register_param_ranges(self, param_ranges):
+        from deap import tools
+        creator = _create_types()
+        self.param_ranges = {name: list(values) for name, values in param_ranges.items()}
+        upper = [len(values) - 1 for values in self.param_ranges.values()]
+        self.toolbox.register("individual", lambda: creator.Individual(random.randint(0, up) for up in upper))
         self.toolbox.register("population", tools.initRepeat, list, self.toolbox.individual)
-        self.toolbox.register("evaluate", self.evaluate)
-        self.toolbox.register("mate", tools.cxTwoPoint)
-        self.toolbox.register("mutate", tools.mutFlipBit, indpb=0.05)
-        self.toolbox.register("select", tools.selTournament, tournsize=3)
+        self.toolbox.register("mutate", tools.mutUniformInt, low=[0] * len(upper), up=upper, indpb=0.05)
+
+    def decode(self, individual):
+        return decode_individual(individual, self.param_ranges)
 
     def evaluate(self, individual):
-        # Update strategy parameters
-        params = {
-            'n_sma_fast': individual[0],
-            'n_sma_slow': individual[1],
-            'rsi_period': individual[2],
-            'atr_multiplier': individual[3],
-            'volume_ratio_threshold': individual[4] / 10  # Scale down to get values between 1 and 10
+        # Run backtest with the decoded parameters
+        stats = self.backtester.run(**self.decode(individual))
+        return _fitness(stats)
+
+    def _batchable(self):
+        return self.backtester.engine == 'vectorized' and hasattr(self.strategy, 'vectorized_signals_batch')
+
+    def _evaluate_params(self, params_list):
+        if not params_list:
+            return []
+        if self._batchable():
+            # A whole generation is one vectorized batch, or one batch per worker
+            if self.pool is None:
+                return _batch_fitness(self.backtester, params_list)
+            size = -(-len(params_list) // self.workers)
+            chunks = [params_list[i:i + size] for i in range(0, len(params_list), size)]
+            return [fitness for chunk in self.pool.map(_evaluate_batch, chunks) for fitness in chunk]
+        if self.pool is None:
+            return [_fitness(self.backtester.run(**params)) for params in params_list]
+        # Workers only receive small parameter dicts, the data is already mapped
+        chunksize = max(1, len(params_list) // (self.workers * 4))
+        return list(self.pool.map(_evaluate_params, params_list, chunksize=chunksize))
+
+    def _evaluate_population(self, individuals):
+        # Identical individuals are backtested once, known ones are looked up in the cache
+        invalid = [individual for individual in individuals if not individual.fitness.valid]
+        pending = {}
+        hits = 0
+        for individual in invalid:
+            params = self.decode(individual)
+            key = self.fitness_cache.key(params)
+            if key in pending:
+                pending[key][1].append(individual)
+                hits += 1
+                continue
+            fitness = self.fitness_cache.get(params)
+            if fitness is not None:
+                individual.fitness.values = fitness
+                hits += 1
+            else:
+                pending[key] = (params, [individual])
+
+        fitnesses = self._evaluate_params([params for params, _ in pending.values()])
+        for (params, group), fitness in zip(pending.values(), fitnesses):
+            self.fitness_cache.put(params, fitness)
+            for individual in group:
+                individual.fitness.values = fitness
+
+        return len(pending), hits, len(invalid)
+
+    def _record(self, logbook, population, gen, evaluated, seconds, verbose):
+        nevals, hits, requested = evaluated
+        record = self.stats.compile(population)
+        logbook.record(gen=gen, nevals=nevals, hits=hits, hit_rate=hits / requested if requested else 0.0,
+                       seconds=seconds, evals_per_s=nevals / seconds if seconds > 0 else 0.0, **record)
+        metrics = get_metrics()
+        metrics.histogram('optimizer_generation').record(seconds)
+        metrics.inc('optimizer_evaluations', nevals)
+        metrics.inc('optimizer_cache_hits', hits)
+        if self.checkpoint_path:
+            with open(self.checkpoint_path + '.metrics.jsonl', 'a') as f:
+                f.write(json.dumps({'time': time.time(), **logbook[-1]}) + '\n')
+        if verbose:
+            print(logbook.stream)
+
+    def _save_checkpoint(self, population, halloffame, logbook, gen, options):
+        # Written to a temporary file and renamed, so a crash mid-write keeps the previous checkpoint
+        state = {
+            'generation': gen,
+            'population': population,
+            'halloffame': halloffame,
+            'logbook': logbook,
+            'random_state': random.getstate(),
+            'numpy_state': np.random.get_state(),
+            'fitness_cache': list(self.fitness_cache.entries.items()),
+            'namespace': self.fitness_cache.namespace,
+            'options': options,
         }
-        self.strategy.update_params(params)
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.checkpoint_path)
+        self.fitness_cache.save()
+
+    def load_checkpoint(self):
+        _create_types()
+        with open(self.checkpoint_path, 'rb') as f:
+            return pickle.load(f)
+
+    def _run_generations(self, population, generations, cxpb, mutpb, halloffame, verbose, options,
+                         logbook=None, start_gen=0):
+        # Same flow as algorithms.eaSimple, with deduplicated and cached evaluation
+        # and checkpoints; a resumed run passes its logbook and last generation
+        from deap import algorithms, tools
+
+        def checkpoint(gen):
+            if self.checkpoint_path and (gen % self.checkpoint_every == 0 or gen == generations):
+                self._save_checkpoint(population, halloffame, logbook, gen, options)
+
+        if logbook is None:
+            logbook = tools.Logbook()
+            logbook.header = ['gen', 'nevals', 'hits', 'hit_rate', 'seconds', 'evals_per_s'] + self.stats.fields
+            started = time.perf_counter()
+            evaluated = self._evaluate_population(population)
+            halloffame.update(population)
+            self._record(logbook, population, 0, evaluated, time.perf_counter() - started, verbose)
+            checkpoint(0)
+
+        for gen in range(start_gen + 1, generations + 1):
+            started = time.perf_counter()
+            offspring = self.toolbox.select(population, len(population))
+            offspring = algorithms.varAnd(offspring, self.toolbox, cxpb, mutpb)
+            evaluated = self._evaluate_population(offspring)
+            halloffame.update(offspring)
+            population[:] = offspring
+            self._record(logbook, population, gen, evaluated, time.perf_counter() - started, verbose)
+            checkpoint(gen)
 
-        # Run backtest
-        stats = self.backtester.run(self.data, self.strategy)
-        return stats['Return [%]'],
+        return population, logbook
 
-    def optimize(self, data, population_size=50, generations=10):
+    def _successive_halving(self, n_candidates, verbose, **options):
+        # Scores as many random individuals as the GA would evaluate, on growing
+        # prefixes of the data, instead of evolving a population on the full data
+        candidates = {}
+        for individual in self.toolbox.population(n=n_candidates):
+            params = self.decode(individual)
+            candidates.setdefault(self.fitness_cache.key(params), params)
+        param_sets = list(candidates.values())
+
+        search = successive_halving(self.backtester, param_sets, **options)
+        if options.get('maximize', 'Return [%]') == 'Return [%]':
+            # Survivors of the last rung were scored on the full data
+            for candidate, score in search['final_scores'].items():
+                self.fitness_cache.put(param_sets[candidate], (float(score),))
+        if verbose:
+            print(f"successive halving: {len(param_sets)} candidates, {search['bar_evaluations']} of "
+                  f"{search['full_bar_evaluations']} bar-evaluations, {search['elapsed']:.1f}s "
+                  f"(full fidelity estimated at ~{search['estimated_full_elapsed']:.1f}s)")
+        self.search_report = search
+        return search['best']
+
+    def resume(self, data, generations=None, verbose=True):
+        # Continues the run saved at checkpoint_path, optionally for more generations
+        options = self.load_checkpoint()['options']
+        return self.optimize(data, options['param_ranges'], options['population_size'],
+                             generations or options['generations'], verbose=verbose, resume=True)
+
+    def optimize(self, data, param_ranges=None, population_size=50, generations=10, seed=None, verbose=True,
+                 search='ga', halving_options=None, resume=False):
+        # search='halving' replaces the GA with successive halving over the same
+        # number of random candidates, see src/successive_halving.py.
+        # resume=True continues from the checkpoint at checkpoint_path if there is one.
         self.data = data
-        population = self.toolbox.population(n=population_size)
-        result, logbook = algorithms.eaSimple(population, self.toolbox, cxpb=0.5, mutpb=0.2, ngen=generations, verbose=True)
-
-        best_individual = tools.selBest(result, k=1)[0]
-        best_params = {
-            'n_sma_fast': best_individual[0],
-            'n_sma_slow': best_individual[1],
-            'rsi_period': best_individual[2],
-            'atr_multiplier': best_individual[3],
-            'volume_ratio_threshold': best_individual[4] / 10
-        }
+        self.backtester.data = data
+        if param_ranges is not None:
+            self._register_param_ranges(param_ranges)
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        # Cached fitness is only valid for the same data and strategy
+        namespace = f"{getattr(self.strategy, '__name__', self.strategy)}:{fingerprint([data])}"
+        self.fitness_cache = FitnessCache(self.cache_path, max_entries=self.cache_size, namespace=namespace)
+        if search == 'halving':
+            try:
+                return self._successive_halving(population_size * (generations + 1), verbose, **(halving_options or {}))
+            finally:
+                self.fitness_cache.save()
+        if search != 'ga':
+            raise ValueError(f"Unknown search mode: {search}")
+
+        from deap import tools
+        self.stats = tools.Statistics(lambda individual: individual.fitness.values[0])
+        self.stats.register("avg", lambda values: float(np.nanmean(np.where(np.isfinite(values), values, np.nan))))
+        self.stats.register("max", np.max)
+        halloffame = tools.HallOfFame(1)
+        options = {'param_ranges': self.param_ranges, 'population_size': population_size,
+                   'generations': generations}
+
+        checkpoint = None
+        if self.checkpoint_path and os.path.dirname(self.checkpoint_path):
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        if resume and self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            checkpoint = self.load_checkpoint()
+            if checkpoint['namespace'] != namespace:
+                raise ValueError("Checkpoint was written for different data or a different strategy")
+            halloffame = checkpoint['halloffame']
+            random.setstate(checkpoint['random_state'])
+            np.random.set_state(checkpoint['numpy_state'])
+            for key, fitness in checkpoint['fitness_cache']:
+                self.fitness_cache.entries.setdefault(key, fitness)
+        elif self.checkpoint_path and os.path.exists(self.checkpoint_path + '.metrics.jsonl'):
+            os.remove(self.checkpoint_path + '.metrics.jsonl')
+
+        shared = None
+        if self.workers > 1:
+            # The data is copied into shared memory once and mapped by every worker
+            shared = SharedFrame(data)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(shared.spec, self.strategy, type(self.backtester), self.backtester.cash,
+                          self.backtester.commission, self.backtester.engine)
+            )
+
+        try:
+            if checkpoint is None:
+                population = self.toolbox.population(n=population_size)
+                population, logbook = self._run_generations(population, generations, 0.5, 0.2, halloffame,
+                                                            verbose, options)
+            else:
+                population, logbook = self._run_generations(checkpoint['population'], generations, 0.5, 0.2,
+                                                            halloffame, verbose, options, checkpoint['logbook'],
+                                                            checkpoint['generation'])
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+            if shared is not None:
+                shared.close()
+            self.fitness_cache.save()
 
-        return best_params
\ No newline at end of file
+        self.logbook = logbook
+        best_individual = halloffame[0]
+        return self.decode(best_individual)
@@ -0,0 +1,121 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def _update(digest, values):
+    values = np.ascontiguousarray(values)
+    digest.update(f"{values.dtype.str}{values.shape}".encode())
+    digest.update(repr(values.tolist()).encode() if values.dtype == object else values.reshape(-1).view(np.uint8))
+
+def fingerprint(arrays):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        _update(digest, np.asarray(array))
+        if isinstance(array, (pd.Series, pd.DataFrame)):
+            # Results carry the input index, so equal values under another index are a different entry
+            _update(digest, np.asarray(array.index))
+    return digest.hexdigest()
+
+def _nbytes(value):
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True)))
+    return getattr(value, 'nbytes', 0)
+
+def _copy(value):
+    if isinstance(value, tuple):
+        return tuple(_copy(item) for item in value)
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value.copy() if hasattr(value, 'copy') else value
+
+class IndicatorCache:
+    # Size-bounded LRU of indicator results keyed by (name, data fingerprint, params).
+    # Callers get copies, so one that modifies its result cannot change what
+    # later callers (other individuals, other folds) are handed.
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return _copy(self.entries[key][0])
+            self.misses += 1
+
+        value = compute()
+        size = _nbytes(value)
+        with self._lock:
+            if key not in self.entries and size <= self.max_bytes:
+                self.entries[key] = (value, size)
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, (_, evicted) = self.entries.popitem(last=False)
+                    self.nbytes -= evicted
+        return _copy(value)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self.entries),
+            'nbytes': self.nbytes,
+        }
+
+_indicator_cache = IndicatorCache()
+
+def get_indicator_cache():
+    return _indicator_cache
+
+# Full history that the frames handed to strategies may be windows of, see set_history
+_history = {}
+
+def set_history(data):
+    # Registers (or with None clears) the frame that walk-forward folds slice.
+    # Strategies that go through history_window() compute their indicators on
+    # it and slice them, so every fold shares one cache entry per indicator and
+    # parameter set instead of one per fold.
+    _history['data'] = data
+
+def history_window(frame):
+    # (source, slice): the registered history and frame's position in it when
+    # frame is a contiguous window of it with the same prices, else frame itself
+    history = _history.get('data')
+    if history is None or not len(frame) or len(frame) > len(history):
+        return frame, slice(None)
+    start = history.index.get_indexer(frame.index[:1])[0]
+    window = slice(start, start + len(frame))
+    if start < 0 or window.stop > len(history) or not frame.index.equals(history.index[window]):
+        return frame, slice(None)
+    if not np.array_equal(frame['close'].to_numpy(dtype=float), history['close'].to_numpy(dtype=float)[window]):
+        return frame, slice(None)
+    return history, window
+
+def cached_indicator(func):
+    # Array-like positional arguments are fingerprinted, everything else is a parameter
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        arrays = [arg for arg in args if hasattr(arg, '__len__') and not isinstance(arg, str)]
+        params = tuple(arg for arg in args if not (hasattr(arg, '__len__') and not isinstance(arg, str)))
+        key = (func.__name__, fingerprint(arrays), params, tuple(sorted(kwargs.items())))
+        return _indicator_cache.get_or_compute(key, lambda: func(*args, **kwargs))
+    return wrapper
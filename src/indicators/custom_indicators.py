@@ -1,65 +1,161 @@
 import numpy as np
 import pandas as pd
+from src.indicators.cache import cached_indicator
 
+@cached_indicator
 def calculate_atr(high, low, close, period):
     return pd.Series(close).ta.atr(high=high, low=low, length=period)
 
+@cached_indicator
 def calculate_supertrend(high, low, close, period, multiplier):
-    return pd.Series(close).ta.supertrend(high=high, low=low, length=period, multiplier=multiplier)[f'SUPERT_{period}_{multiplier}']
+    # The trend line is the first column; its name carries the multiplier as
+    # pandas-ta formats it ('SUPERT_10_3.0' for 3), so it is not looked up by name.
+    # pandas-ta leaves 0 on the first bar, which is warm-up like the next ones.
+    trend = pd.Series(close).ta.supertrend(high=high, low=low, length=period, multiplier=multiplier).iloc[:, 0].copy()
+    trend.iloc[:1] = np.nan
+    return trend
 
+@cached_indicator
+def calculate_rsi(close, period):
+    return pd.Series(close).ta.rsi(length=period)
+
+@cached_indicator
+def calculate_macd(close, fast, slow, signal):
+    macd_data = pd.Series(close).ta.macd(fast=fast, slow=slow, signal=signal)
+    return macd_data[f'MACD_{fast}_{slow}_{signal}'], macd_data[f'MACDs_{fast}_{slow}_{signal}']
+
+@cached_indicator
+def calculate_sma(series, period):
+    return pd.Series(series).rolling(period).mean()
+
+@cached_indicator
 def calculate_vwap(high, low, close, volume):
     typical_price = (high + low + close) / 3
     return (typical_price * volume).cumsum() / volume.cumsum()
 
+@cached_indicator
 def calculate_volume_profile(close, volume, bins=10):
     price_range = np.linspace(close.min(), close.max(), bins)
     volume_profile = np.histogram(close, bins=price_range, weights=volume)[0]
     return pd.Series(volume_profile, index=price_range[:-1])
 
-def identify_support_resistance(high, low, close, window=14):
-    pivot_high = high.rolling(window=window, center=True).max()
-    pivot_low = low.rolling(window=window, center=True).min()
-    
-    support = pivot_low.where((pivot_low.shift(1) > pivot_low) & (pivot_low.shift(-1) > pivot_low))
-    resistance = pivot_high.where((pivot_high.shift(1) < pivot_high) & (pivot_high.shift(-1) < pivot_high))
-    
-    return support, resistance
+def _rolling_extreme(x, window, ufunc):
+    # Trailing rolling max/min in O(n) with the van Herk/Gil-Werman block scheme:
+    # each window is the suffix extreme of one block joined with the prefix
+    # extreme of the next. NaN inside a window yields NaN, as in pandas.
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if window < 1 or window > n:
+        return out
+    blocks = np.concatenate([x, np.full(-n % window, np.nan)]).reshape(-1, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+def rolling_max(x, window):
+    return _rolling_extreme(x, window, np.maximum)
+
+def rolling_min(x, window):
+    return _rolling_extreme(x, window, np.minimum)
+
+def _shift(x, periods):
+    out = np.full(len(x), np.nan)
+    if periods >= 0:
+        out[periods:] = x[:len(x) - periods]
+    else:
+        out[:periods] = x[-periods:]
+    return out
+
+def _index_of(*series):
+    return next((s.index for s in series if isinstance(s, pd.Series)), None)
+
+@cached_indicator
+def identify_support_resistance(high, low, close, window=14, causal=False):
+    # Pivots of the centered rolling extremes. A centered window looks
+    # window - 1 - window // 2 bars ahead and a pivot needs one more bar to be
+    # confirmed, so causal=True moves every level to the bar where it is first
+    # known, which is what a backtest may act on.
+    index = _index_of(high, low, close)
+    lookahead = window - 1 - window // 2
+    pivot_high = _shift(rolling_max(high, window), -lookahead)
+    pivot_low = _shift(rolling_min(low, window), -lookahead)
 
-def calculate_zigzag(high, low, deviation=5):
-    zigzag = pd.Series(index=high.index, dtype=float)
+    with np.errstate(invalid='ignore'):
+        support = np.where((_shift(pivot_low, 1) > pivot_low) & (_shift(pivot_low, -1) > pivot_low), pivot_low, np.nan)
+        resistance = np.where((_shift(pivot_high, 1) < pivot_high) & (_shift(pivot_high, -1) < pivot_high),
+                              pivot_high, np.nan)
+    if causal:
+        support, resistance = _shift(support, lookahead + 1), _shift(resistance, lookahead + 1)
+    return pd.Series(support, index=index), pd.Series(resistance, index=index)
+
+def _first_true(condition, start, n, chunk=256):
+    # First i >= start where condition(slice) holds, scanning chunks that double
+    # in size so a leg of length k costs O(k) vectorized work
+    while start < n:
+        end = min(n, start + chunk)
+        hits = np.flatnonzero(condition(start, end))
+        if len(hits):
+            return start + int(hits[0])
+        start, chunk = end, chunk * 2
+    return n
+
+@cached_indicator
+def calculate_zigzag(high, low, deviation=5, causal=False):
+    # Swing pivots that reverse once price moves `deviation` percent against the
+    # last extreme. While a leg runs the reversal threshold is fixed, so each leg
+    # is one vectorized search plus an argmax/argmin over its bars. Pivots are
+    # placed on the extreme bar, or with causal=True on the bar that confirms
+    # them (the unconfirmed last leg is then left out).
+    index = _index_of(high, low)
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    n = len(high)
+    zigzag = np.full(n, np.nan)
+    if n == 0:
+        return pd.Series(zigzag, index=index)
     deviation /= 100
-    
-    last_high, last_low = high.iloc[0], low.iloc[0]
+
+    last_high, last_low = high[0], low[0]
     last_high_index, last_low_index = 0, 0
     trend = None
-    
-    for i in range(1, len(high)):
-        if trend is None or trend == 1:
-            if low[i] < last_low * (1 - deviation):
+    i = 1
+    with np.errstate(invalid='ignore'):
+        while i < n:
+            if trend is None or trend == 1:
+                threshold = last_low * (1 - deviation)
+                flip = _first_true(lambda a, b: low[a:b] < threshold, i, n)
+                if flip > i:
+                    peak = i + int(np.argmax(high[i:flip]))
+                    if high[peak] > last_high:
+                        last_high, last_high_index = high[peak], peak
+                if flip == n:
+                    break
                 if trend == 1:
-                    zigzag[last_high_index] = last_high
+                    zigzag[flip if causal else last_high_index] = last_high
                 trend = -1
-                last_low = low[i]
-                last_low_index = i
-            elif high[i] > last_high:
-                last_high = high[i]
-                last_high_index = i
-        else:
-            if high[i] > last_high * (1 + deviation):
-                zigzag[last_low_index] = last_low
+                last_low, last_low_index = low[flip], flip
+            else:
+                threshold = last_high * (1 + deviation)
+                flip = _first_true(lambda a, b: high[a:b] > threshold, i, n)
+                if flip > i:
+                    trough = i + int(np.argmin(low[i:flip]))
+                    if low[trough] < last_low:
+                        last_low, last_low_index = low[trough], trough
+                if flip == n:
+                    break
+                zigzag[flip if causal else last_low_index] = last_low
                 trend = 1
-                last_high = high[i]
-                last_high_index = i
-            elif low[i] < last_low:
-                last_low = low[i]
-                last_low_index = i
-    
-    if trend == 1:
-        zigzag[last_high_index] = last_high
-    elif trend == -1:
-        zigzag[last_low_index] = last_low
-    
-    return zigzag
+                last_high, last_high_index = high[flip], flip
+            i = flip + 1
+
+    if not causal:
+        if trend == 1:
+            zigzag[last_high_index] = last_high
+        elif trend == -1:
+            zigzag[last_low_index] = last_low
+
+    return pd.Series(zigzag, index=index)
 
 def calculate_ichimoku(high, low, close):
     tenkan_window = 9
@@ -0,0 +1,340 @@
+import math
+from collections import deque
+
+NAN = float('nan')
+
+# Stateful indicators that update in O(1) per bar. Seeding and smoothing follow
+# TA-Lib (and pandas-ta for supertrend), so after the same history the values
+# match the batch functions used in FeatureEngineer and the strategies.
+
+class SMA:
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        if len(self.window) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+class EMA:
+    # Seeded with the SMA of the first `period` values, like TA-Lib
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self.total += x
+        elif self.count == self.period:
+            self.value = (self.total + x) / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+class Wilder:
+    # Wilder smoothing seeded with the mean of the first `period` values
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self.total += x
+        elif self.count == self.period:
+            self.value = (self.total + x) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + x) / self.period
+        return self.value
+
+class RSI:
+    def __init__(self, period=14):
+        self.gain = Wilder(period)
+        self.loss = Wilder(period)
+        self.prev = None
+        self.value = NAN
+
+    def update(self, close):
+        if self.prev is not None:
+            change = close - self.prev
+            gain = self.gain.update(max(change, 0.0))
+            loss = self.loss.update(max(-change, 0.0))
+            if not math.isnan(gain):
+                total = gain + loss
+                self.value = 100.0 * gain / total if total else 0.0
+        self.prev = close
+        return self.value
+
+class MACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast_ema = EMA(fast)
+        self.slow_ema = EMA(slow)
+        self.signal_ema = EMA(signal)
+        # TA-Lib starts the fast EMA late so both EMAs produce their first value on the same bar
+        self.fast_offset = slow - fast
+        self.count = 0
+        self.value = NAN
+        self.signal = NAN
+        self.hist = NAN
+
+    def update(self, close):
+        self.count += 1
+        slow = self.slow_ema.update(close)
+        if self.count > self.fast_offset:
+            fast = self.fast_ema.update(close)
+            if not math.isnan(slow):
+                line = fast - slow
+                self.signal = self.signal_ema.update(line)
+                if not math.isnan(self.signal):
+                    self.value = line
+                    self.hist = line - self.signal
+        return self.value, self.signal, self.hist
+
+class ATR:
+    def __init__(self, period=14):
+        self.smoother = Wilder(period)
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, high, low, close):
+        if self.prev_close is not None:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            self.value = self.smoother.update(true_range)
+        self.prev_close = close
+        return self.value
+
+class RollingStd:
+    # Windowed Welford variance, ddof=1 matches pandas rolling().std()
+    def __init__(self, period, ddof=1):
+        self.period = period
+        self.ddof = ddof
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        self.window.append(x)
+        n = len(self.window)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+        if n > self.period:
+            old = self.window.popleft()
+            n -= 1
+            delta = old - self.mean
+            self.mean -= delta / n
+            self.m2 -= delta * (old - self.mean)
+        if n == self.period:
+            self.value = math.sqrt(max(self.m2, 0.0) / (n - self.ddof))
+        return self.value
+
+class BollingerBands:
+    def __init__(self, period=5, nbdev=2.0):
+        self.sma = SMA(period)
+        self.std = RollingStd(period, ddof=0)
+        self.nbdev = nbdev
+        self.upper = self.middle = self.lower = NAN
+
+    def update(self, close):
+        self.middle = self.sma.update(close)
+        deviation = self.std.update(close) * self.nbdev
+        self.upper = self.middle + deviation
+        self.lower = self.middle - deviation
+        return self.upper, self.middle, self.lower
+
+class RollingExtreme:
+    # Monotonic deque of (index, value), the front is the window extreme
+    def __init__(self, period, mode='max'):
+        self.period = period
+        self.better = (lambda a, b: a >= b) if mode == 'max' else (lambda a, b: a <= b)
+        self.window = deque()
+        self.count = 0
+        self.value = NAN
+
+    def update(self, x):
+        while self.window and self.better(x, self.window[-1][1]):
+            self.window.pop()
+        self.window.append((self.count, x))
+        if self.window[0][0] <= self.count - self.period:
+            self.window.popleft()
+        self.count += 1
+        if self.count >= self.period:
+            self.value = self.window[0][1]
+        return self.value
+
+class OBV:
+    def __init__(self):
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, close, volume):
+        if self.prev_close is None:
+            self.value = volume
+        elif close > self.prev_close:
+            self.value += volume
+        elif close < self.prev_close:
+            self.value -= volume
+        self.prev_close = close
+        return self.value
+
+class ADOSC:
+    # TA-Lib seeds both EMAs with the first A/D value instead of an SMA
+    def __init__(self, fast=3, slow=10):
+        self.fast_alpha = 2.0 / (fast + 1)
+        self.slow_alpha = 2.0 / (slow + 1)
+        self.slow = slow
+        self.ad = 0.0
+        self.fast_ema = self.slow_ema = None
+        self.count = 0
+        self.value = NAN
+
+    def update(self, high, low, close, volume):
+        if high > low:
+            self.ad += ((close - low) - (high - close)) / (high - low) * volume
+        if self.fast_ema is None:
+            self.fast_ema = self.slow_ema = self.ad
+        else:
+            self.fast_ema += self.fast_alpha * (self.ad - self.fast_ema)
+            self.slow_ema += self.slow_alpha * (self.ad - self.slow_ema)
+        self.count += 1
+        if self.count >= self.slow:
+            self.value = self.fast_ema - self.slow_ema
+        return self.value
+
+class Lag:
+    def __init__(self, period):
+        self.window = deque(maxlen=period + 1)
+
+    def update(self, x):
+        self.window.append(x)
+        return self.window[0] if len(self.window) == self.window.maxlen else NAN
+
+class Momentum:
+    def __init__(self, period=10):
+        self.lag = Lag(period)
+        self.value = NAN
+
+    def update(self, close):
+        previous = self.lag.update(close)
+        self.value = close - previous
+        return self.value
+
+class ROC:
+    def __init__(self, period=10):
+        self.lag = Lag(period)
+        self.value = NAN
+
+    def update(self, close):
+        previous = self.lag.update(close)
+        self.value = (close / previous - 1.0) * 100.0 if previous else NAN
+        return self.value
+
+class PctChange:
+    def __init__(self):
+        self.prev = None
+        self.value = NAN
+
+    def update(self, x):
+        if self.prev is not None:
+            self.value = x / self.prev - 1.0 if self.prev else NAN
+        self.prev = x
+        return self.value
+
+class Supertrend:
+    # Same band-ratcheting loop as pandas-ta's supertrend
+    def __init__(self, period=10, multiplier=3.0):
+        self.atr = ATR(period)
+        self.multiplier = multiplier
+        self.direction = 1
+        self.upper = self.lower = NAN
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, high, low, close):
+        hl2 = (high + low) / 2.0
+        band = self.multiplier * self.atr.update(high, low, close)
+        upper, lower = hl2 + band, hl2 - band
+        if self.prev_close is not None:
+            if close > self.upper:
+                self.direction = 1
+            elif close < self.lower:
+                self.direction = -1
+            else:
+                if self.direction > 0 and lower < self.lower:
+                    lower = self.lower
+                if self.direction < 0 and upper > self.upper:
+                    upper = self.upper
+        self.upper, self.lower = upper, lower
+        self.prev_close = close
+        self.value = lower if self.direction > 0 else upper
+        return self.value
+
+class IncrementalFeatures:
+    # Per-bar counterpart of FeatureEngineer.calculate_features for the live loop
+    def __init__(self):
+        self.sma_fast = SMA(20)
+        self.sma_slow = SMA(50)
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.atr = ATR(14)
+        self.bollinger = BollingerBands(5, 2.0)  # the same period as FeatureEngineer's BBANDS
+        self.obv = OBV()
+        self.adosc = ADOSC()
+        self.mom = Momentum(10)
+        self.roc = ROC(10)
+        self.volatility = RollingStd(20)
+        self.price_change = PctChange()
+        self.volume_change = PctChange()
+        self.support = RollingExtreme(20, 'min')
+        self.resistance = RollingExtreme(20, 'max')
+        self.supertrend = Supertrend(10, 3.0)
+        self.values = {}
+
+    def update(self, open_, high, low, close, volume):
+        sma_fast = self.sma_fast.update(close)
+        sma_slow = self.sma_slow.update(close)
+        macd, macd_signal, _ = self.macd.update(close)
+        upper, middle, lower = self.bollinger.update(close)
+        self.values = {
+            'sma_fast': sma_fast,
+            'sma_slow': sma_slow,
+            'rsi': self.rsi.update(close),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'atr': self.atr.update(high, low, close),
+            'bollinger_upper': upper,
+            'bollinger_middle': middle,
+            'bollinger_lower': lower,
+            'obv': self.obv.update(close, volume),
+            'adosc': self.adosc.update(high, low, close, volume),
+            'mom': self.mom.update(close),
+            'roc': self.roc.update(close),
+            'volatility': self.volatility.update(close),
+            'price_change': self.price_change.update(close),
+            'volume_change': self.volume_change.update(volume),
+            'high_low_range': (high - low) / low,
+            'market_regime': 1 if sma_fast > sma_slow else -1,
+            'support': self.support.update(low),
+            'resistance': self.resistance.update(high),
+            'supertrend': self.supertrend.update(high, low, close),
+        }
+        return self.values
+
+    def warm_up(self, df):
+        for row in df[['open', 'high', 'low', 'close', 'volume']].itertuples(index=False):
+            self.update(*row)
+        return self.values
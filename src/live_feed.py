@@ -0,0 +1,211 @@
+import asyncio
+import json
+from collections import namedtuple
+from datetime import datetime
+import aiohttp
+import numpy as np
+import pandas as pd
+from src.candle_buffer import OHLCV_COLUMNS
+from src.utils.logger import get_logger
+from src.utils.timeframe import timeframe_to_ms
+
+Bar = namedtuple('Bar', ['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+
+class BarRing:
+    # Fixed-capacity ring of closed bars, oldest bars are overwritten first
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self.size = 0
+        self.head = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, bar):
+        self.timestamps[self.head] = bar.timestamp
+        self.values[self.head] = bar[1:]
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last_timestamp(self):
+        return int(self.timestamps[self.head - 1]) if self.size else None
+
+    def to_frame(self):
+        order = (np.arange(self.size) + self.head - self.size) % self.capacity
+        index = pd.DatetimeIndex(self.timestamps[order].astype('datetime64[ms]'), name='timestamp')
+        return pd.DataFrame(self.values[order], index=index, columns=OHLCV_COLUMNS)
+
+class CandleFeed:
+    def __init__(self, data_fetcher, ws_url='wss://api.hyperliquid.xyz/ws', capacity=1000,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0, ping_interval=30.0, queue_size=100):
+        self.fetcher = data_fetcher
+        self.symbol = data_fetcher.symbol
+        self.timeframe = data_fetcher.timeframe
+        self.interval_ms = timeframe_to_ms(self.timeframe)
+        self.ws_url = ws_url
+        self.bars = BarRing(capacity)
+        self.current = None  # the bar that is still forming
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.dropped_events = 0
+        self.connected = asyncio.Event()
+        self.logger = get_logger()
+
+    @property
+    def name(self):
+        return f"{self.symbol} {self.timeframe}"
+
+    @property
+    def feeds(self):
+        # Feeds served by this connection, keyed like CandleFeedGroup.feeds
+        return {(self.symbol, self.timeframe): self}
+
+    def subscribe(self, maxsize=None):
+        queue = asyncio.Queue(maxsize=maxsize or self.queue_size)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.remove(queue)
+
+    def _publish(self, bar):
+        for queue in self.subscribers:
+            if queue.full():
+                # Slow consumers lose the oldest bar rather than stalling the feed
+                queue.get_nowait()
+                self.dropped_events += 1
+            queue.put_nowait(bar)
+
+    def _close_bar(self, bar):
+        last = self.bars.last_timestamp()
+        if last is not None and bar.timestamp <= last:
+            return
+        self.bars.append(bar)
+        self._publish(bar)
+
+    def _on_candle(self, candle):
+        bar = Bar(int(candle['t']), float(candle['o']), float(candle['h']),
+                  float(candle['l']), float(candle['c']), float(candle['v']))
+        if self.current is not None and bar.timestamp > self.current.timestamp:
+            # The first update of a new candle means the previous one has closed
+            self._close_bar(self.current)
+        if self.current is None or bar.timestamp >= self.current.timestamp:
+            self.current = bar
+
+    async def backfill(self):
+        # Recovers bars missed while disconnected through the REST candleSnapshot path
+        last = self.bars.last_timestamp()
+        if last is None:
+            start_ms = int(datetime.now().timestamp() * 1000) - self.bars.capacity * self.interval_ms
+        else:
+            start_ms = last + self.interval_ms
+        df = await self.fetcher._fetch_range(datetime.fromtimestamp(start_ms / 1000), datetime.now(), concurrent=True)
+        if not len(df):
+            return
+
+        timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+        for timestamp, values in zip(timestamps[:-1].tolist(), df.values[:-1].tolist()):
+            self._close_bar(Bar(timestamp, *values))
+        # The newest REST candle is still forming unless the socket has moved past it
+        latest = Bar(int(timestamps[-1]), *df.values[-1].tolist())
+        if self.current is None or latest.timestamp >= self.current.timestamp:
+            if self.current is not None and latest.timestamp > self.current.timestamp:
+                self._close_bar(self.current)
+            self.current = latest
+        elif latest.timestamp < self.current.timestamp:
+            self._close_bar(latest)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send_json({"method": "ping"})
+
+    def _route(self, candle):
+        feed = self.feeds.get((candle.get('s'), candle.get('i')))
+        if feed is not None:
+            feed._on_candle(candle)
+
+    async def _stream(self, session):
+        async with session.ws_connect(self.ws_url) as ws:
+            for symbol, timeframe in self.feeds:
+                await ws.send_json({
+                    "method": "subscribe",
+                    "subscription": {"type": "candle", "coin": symbol, "interval": timeframe}
+                })
+            await self.backfill()
+            self.connected.set()
+            ping_task = asyncio.create_task(self._ping(ws))
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        message = json.loads(msg.data)
+                        if message.get('channel') != 'candle':
+                            continue
+                        candles = message['data']
+                        for candle in candles if isinstance(candles, list) else [candles]:
+                            self._route(candle)
+                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+            finally:
+                ping_task.cancel()
+                self.connected.clear()
+
+    async def run(self):
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    await self._stream(session)
+                    delay = self.reconnect_delay
+                    self.logger.warning(f"Candle feed for {self.name} closed, reconnecting")
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Candle feed error for {self.name}: {e}, reconnecting in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+
+class CandleFeedGroup(CandleFeed):
+    # Serves many CandleFeeds over one socket: every (symbol, timeframe) is
+    # subscribed on the same connection and candles are routed to their feed.
+    # Subscribers attach to the individual feeds, not to the group.
+    def __init__(self, feeds, ws_url='wss://api.hyperliquid.xyz/ws', reconnect_delay=1.0,
+                 max_reconnect_delay=30.0, ping_interval=30.0, max_backfills=8):
+        self.group = {(feed.symbol, feed.timeframe): feed for feed in feeds}
+        self.ws_url = ws_url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        self.max_backfills = max_backfills
+        self.connected = asyncio.Event()
+        self.logger = get_logger()
+
+    @property
+    def name(self):
+        return f"{len(self.group)} feeds"
+
+    @property
+    def feeds(self):
+        return self.group
+
+    def subscribe(self, maxsize=None):
+        raise TypeError("Subscribe to a feed of the group, see CandleFeedGroup.feeds")
+
+    async def backfill(self):
+        # Backfills run concurrently but bounded, a failed one only costs that feed its gap
+        semaphore = asyncio.Semaphore(self.max_backfills)
+
+        async def backfill_feed(feed):
+            async with semaphore:
+                try:
+                    await feed.backfill()
+                except Exception as e:
+                    self.logger.error(f"Backfill failed for {feed.name}: {e}")
+
+        await asyncio.gather(*(backfill_feed(feed) for feed in self.group.values()))
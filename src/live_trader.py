@@ -1,39 +1,267 @@
 import asyncio
-import ccxt.async_support as ccxt
+import contextlib
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.account_state import AccountState
+from src.data_fetcher import DataFetcher
+from src.live_feed import CandleFeed, CandleFeedGroup
 from src.utils.logger import get_logger
+from src.utils.metrics import get_metrics
+from src.utils.rate_limiter import TokenBucket
+
+def _run_shard(api_key, api_secret, options, strategies):
+    # Entry point of a shard process: its own event loop, exchange client and feed socket
+    trader = LiveTrader(api_key, api_secret, **options)
+    asyncio.run(trader.start_trading(strategies))
 
 class LiveTrader:
-    def __init__(self, api_key, api_secret):
-        self.exchange = ccxt.hyperliquid({
-            'apiKey': api_key,
-            'secret': api_secret,
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'future'
-            }
-        })
+    # Bar closes from a CandleFeed drive three kinds of task: the feed itself,
+    # signal computation and order execution, connected by bounded queues. When
+    # order placement lags, the signal task blocks on the full order queue and
+    # the feed keeps only the newest bars for it, so stale signals are never
+    # queued up.
+    #
+    # One trader runs any number of slots, a slot being a strategy instance with
+    # its own symbol, timeframe and parameters. All slots share the exchange
+    # client, one request budget and one candle socket, and their positions are
+    # reconciled together in a single request. Orders on the same symbol are
+    # placed one at a time.
+    #
+    # Positions and balance live in an AccountState that our fills keep current
+    # and a background task reconciles every reconcile_interval seconds. Close
+    # decisions and sizing read it without network I/O; a strategy sees it as
+    # `strategy.account`.
+    def __init__(self, api_key, api_secret, history=100, bar_queue_size=1, order_queue_size=1,
+                 requests_per_second=10, exchange=None, reconcile_interval=30.0,
+                 max_staleness=60.0, metrics_port=None, metrics_path=None, metrics_interval=15.0):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        if exchange is None:
+            # ccxt takes long to import, only pay for it when no client is injected
+            import ccxt.async_support as ccxt
+            exchange = ccxt.hyperliquid({
+                'apiKey': api_key,
+                'secret': api_secret,
+                'enableRateLimit': True,
+                'options': {
+                    'defaultType': 'future'
+                }
+            })
+        self.exchange = exchange
         self.logger = get_logger()
+        self.metrics = get_metrics()
+        # Stage latencies and order counters are served on metrics_port and/or
+        # written to metrics_path every metrics_interval seconds
+        self.metrics_port = metrics_port
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.history = history
+        self.bar_queue_size = bar_queue_size
+        self.order_queue_size = order_queue_size
+        self.requests_per_second = requests_per_second
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.reconcile_interval = reconcile_interval
+        self.account = AccountState(max_staleness=max_staleness)
+        self.symbols = []
+        self.order_handlers = {
+            'buy': self.open_long_position,
+            'sell': self.open_short_position,
+            'close': self.close_positions,
+        }
+        self.last_latency = None  # seconds from bar close event to order completion
+        self._symbol_locks = defaultdict(asyncio.Lock)
+        self._balance_request = None
+
+    def _build_feed(self, strategies):
+        # One CandleFeed per (symbol, timeframe), all served by a single socket
+        feeds = {}
+        for strategy in strategies:
+            key = (strategy.symbol, strategy.timeframe)
+            if key not in feeds:
+                fetcher = DataFetcher(strategy.symbol, strategy.timeframe, self.history, rate_limiter=self.rate_limiter)
+                feeds[key] = CandleFeed(fetcher, capacity=self.history)
+        if len(feeds) == 1:
+            return next(iter(feeds.values()))
+        return CandleFeedGroup(feeds.values())
+
+    async def start_trading(self, strategies, feed=None):
+        # `strategies` is one strategy or a list of slots; `feed` is a CandleFeed or
+        # CandleFeedGroup covering every slot's symbol and timeframe
+        if not isinstance(strategies, (list, tuple)):
+            strategies = [strategies]
+        feed = feed or self._build_feed(strategies)
+        self.symbols = sorted({strategy.symbol for strategy in strategies})
+        try:
+            await self.reconcile()
+        except Exception as e:
+            self.logger.error(f"Initial account reconciliation failed: {e}")
 
-    async def start_trading(self, strategy):
+        tasks = [asyncio.create_task(feed.run(), name='candle-feed'),
+                 asyncio.create_task(self._reconcile_loop(), name='reconcile')]
+        if self.metrics_path:
+            tasks.append(asyncio.create_task(self._metrics_loop(), name='metrics'))
+        metrics_server = None
+        subscriptions = []
         try:
-            while True:
-                await self.execute_trading_cycle(strategy)
-                await asyncio.sleep(60)  # Wait for 1 minute before the next cycle
+            # Inside the try, so a metrics port that cannot be bound still stops
+            # the tasks above and closes the exchange session
+            if self.metrics_port:
+                metrics_server = await self.metrics.serve(port=self.metrics_port)
+            for strategy in strategies:
+                strategy.account = self.account
+                slot_feed = feed.feeds[(strategy.symbol, strategy.timeframe)]
+                bars = slot_feed.subscribe(maxsize=self.bar_queue_size)
+                subscriptions.append((slot_feed, bars))
+                orders = asyncio.Queue(maxsize=self.order_queue_size)
+                tasks.append(asyncio.create_task(self._signal_loop(strategy, slot_feed, bars, orders),
+                                                 name=f'signals-{strategy.symbol}'))
+                tasks.append(asyncio.create_task(self._order_loop(strategy, orders),
+                                                 name=f'orders-{strategy.symbol}'))
+            await asyncio.gather(*tasks)
         except Exception as e:
             self.logger.error(f"Error in live trading: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for slot_feed, bars in subscriptions:
+                slot_feed.unsubscribe(bars)
+            if metrics_server is not None:
+                await metrics_server.cleanup()
+            await self.exchange.close()
+
+    async def _metrics_loop(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                self.metrics.write(self.metrics_path)
+            except OSError as e:
+                self.logger.error(f"Error writing metrics snapshot: {e}")
+
+    async def start_sharded(self, strategies, workers):
+        # Spreads the slots over worker processes, each with its own trader and an
+        # equal share of the request budget. Strategies must be picklable.
+        shards = [strategies[i::workers] for i in range(workers) if strategies[i::workers]]
+        options = {'history': self.history, 'bar_queue_size': self.bar_queue_size,
+                   'order_queue_size': self.order_queue_size,
+                   'reconcile_interval': self.reconcile_interval, 'max_staleness': self.account.max_staleness,
+                   'requests_per_second': self.requests_per_second / len(shards),
+                   'metrics_interval': self.metrics_interval}
+        loop = asyncio.get_running_loop()
+        try:
+            with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+                await asyncio.gather(*(loop.run_in_executor(pool, _run_shard, self.api_key, self.api_secret,
+                                                            {**options, **self._shard_metrics(index)}, shard)
+                                       for index, shard in enumerate(shards)))
         finally:
             await self.exchange.close()
 
+    def _shard_metrics(self, index):
+        # Each shard process has its own registry, so it serves on metrics_port +
+        # index and writes <metrics_path root>.shard<index><ext>
+        options = {}
+        if self.metrics_port:
+            options['metrics_port'] = self.metrics_port + index
+        if self.metrics_path:
+            root, ext = os.path.splitext(self.metrics_path)
+            options['metrics_path'] = f"{root}.shard{index}{ext}"
+        return options
+
+    def _ohlcv(self, feed):
+        # The closed bars in the exchange's [timestamp, open, high, low, close, volume] layout
+        df = feed.bars.to_frame().iloc[-self.history:]
+        timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+        return np.column_stack([timestamps, df.to_numpy()]).tolist()
+
+    async def _signal_loop(self, strategy, feed, bars, orders):
+        while True:
+            bar = await bars.get()
+            # Only the newest closed bar matters, older ones queued behind a slow cycle are skipped
+            while not bars.empty():
+                bar = bars.get_nowait()
+            received = time.perf_counter()
+            try:
+                with self.metrics.timer('signal'):
+                    strategy.update_data(self._ohlcv(feed))
+                    signal = strategy.generate_signal()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.inc('signal_errors')
+                self.logger.error("Error computing signal for %s bar %s: %s", strategy.symbol, bar.timestamp, e)
+                continue
+            if signal in self.order_handlers:
+                # Blocks while the order task is still busy, which is the backpressure on this loop
+                await orders.put((signal, bar, received))
+
+    async def _order_loop(self, strategy, orders):
+        while True:
+            signal, bar, received = await orders.get()
+            try:
+                await self.order_handlers[signal](strategy)
+                self.last_latency = time.perf_counter() - received
+                self.metrics.histogram('bar_to_order', signal=signal).record(self.last_latency)
+                self.logger.debug("%s %s for bar %s handled in %.1fms", signal, strategy.symbol, bar.timestamp,
+                                  self.last_latency * 1000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error("Error executing %s %s for bar %s: %s", signal, strategy.symbol, bar.timestamp, e)
+            finally:
+                orders.task_done()
+
+    async def _request(self, method, *args):
+        # Every exchange call draws from the shared request budget and is timed per method
+        name = method.__name__
+        with self.metrics.timer('rate_limit_wait'):
+            await self.rate_limiter.acquire()
+        try:
+            with self.metrics.timer('exchange_request', method=name):
+                return await method(*args)
+        except Exception:
+            self.metrics.inc('exchange_errors', method=name)
+            raise
+
+    async def reconcile(self):
+        # Replaces the cached account state with the exchange's and reports drift,
+        # except for symbols our own orders touched while the query was out
+        since = self.account.order_versions()
+        positions, balance = await asyncio.gather(
+            self._request(self.exchange.fetch_positions, self.symbols or None),
+            self._request(self.exchange.fetch_balance),
+        )
+        return self.account.reconcile(positions, balance['total'], self.symbols or None, since=since)
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Account reconciliation failed, state is {self.account.staleness():.0f}s old: {e}")
+
+    async def _fresh_account(self):
+        # Enforces the staleness bound; normally the reconcile loop keeps this a no-op
+        if self.account.is_stale():
+            await self.reconcile()
+        return self.account
+
     async def execute_trading_cycle(self, strategy):
+        # One polling cycle over REST, for running a single decision outside the event loop
         # Fetch latest market data
-        ohlcv = await self.exchange.fetch_ohlcv(strategy.symbol, strategy.timeframe, limit=100)
-        
+        ohlcv = await self._request(self.exchange.fetch_ohlcv, strategy.symbol, strategy.timeframe, None, 100)
+
         # Update strategy with latest data
         strategy.update_data(ohlcv)
-        
+
         # Get trading signals
         signal = strategy.generate_signal()
-        
+
         if signal == 'buy':
             await self.open_long_position(strategy)
         elif signal == 'sell':
@@ -41,38 +269,76 @@ class LiveTrader:
         elif signal == 'close':
             await self.close_positions(strategy)
 
+    def _log_order(self, message, order):
+        # The fields that identify a fill rather than the whole ccxt order dict,
+        # also passed as `extra` for the JSON-lines log
+        fields = {key: order.get(key) for key in ('symbol', 'id', 'side', 'filled', 'average')}
+        self.logger.info("%s: %s %s %s filled %s at %s", message, fields['symbol'], fields['side'], fields['id'],
+                         fields['filled'], fields['average'], extra={'order': fields})
+
+    @contextlib.asynccontextmanager
+    async def _placing(self, symbol):
+        # One order at a time per symbol, marked as in flight for reconcile()
+        async with self._symbol_locks[symbol]:
+            with self.account.placing(symbol):
+                yield
+
     async def open_long_position(self, strategy):
         try:
             amount = strategy.calculate_position_size()
-            order = await self.exchange.create_market_buy_order(strategy.symbol, amount)
-            self.logger.info(f"Opened long position: {order}")
+            async with self._placing(strategy.symbol):
+                order = await self._request(self.exchange.create_market_buy_order, strategy.symbol, amount)
+                self.account.apply_fill(order)
+            self.metrics.inc('orders', side='buy')
+            self._log_order("Opened long position", order)
         except Exception as e:
-            self.logger.error(f"Error opening long position: {e}")
+            self.metrics.inc('order_rejects', side='buy')
+            self.logger.error("Error opening long position on %s: %s", strategy.symbol, e)
 
     async def open_short_position(self, strategy):
         try:
             amount = strategy.calculate_position_size()
-            order = await self.exchange.create_market_sell_order(strategy.symbol, amount)
-            self.logger.info(f"Opened short position: {order}")
+            async with self._placing(strategy.symbol):
+                order = await self._request(self.exchange.create_market_sell_order, strategy.symbol, amount)
+                self.account.apply_fill(order)
+            self.metrics.inc('orders', side='sell')
+            self._log_order("Opened short position", order)
         except Exception as e:
-            self.logger.error(f"Error opening short position: {e}")
+            self.metrics.inc('order_rejects', side='sell')
+            self.logger.error("Error opening short position on %s: %s", strategy.symbol, e)
 
     async def close_positions(self, strategy):
         try:
-            positions = await self.exchange.fetch_positions([strategy.symbol])
-            for position in positions:
-                if position['side'] == 'long':
-                    await self.exchange.create_market_sell_order(strategy.symbol, position['amount'])
-                elif position['side'] == 'short':
-                    await self.exchange.create_market_buy_order(strategy.symbol, position['amount'])
-            self.logger.info("Closed all positions")
+            account = await self._fresh_account()
+            async with self._placing(strategy.symbol):
+                # Read under the lock, so an order still in flight on the symbol is counted
+                position = account.position(strategy.symbol)
+                if position > 0:
+                    order = await self._request(self.exchange.create_market_sell_order, strategy.symbol, position)
+                    account.apply_fill(order)
+                elif position < 0:
+                    order = await self._request(self.exchange.create_market_buy_order, strategy.symbol, -position)
+                    account.apply_fill(order)
+            self.metrics.inc('orders', side='close')
+            self.logger.info("Closed all %s positions", strategy.symbol)
         except Exception as e:
-            self.logger.error(f"Error closing positions: {e}")
+            self.metrics.inc('order_rejects', side='close')
+            self.logger.error("Error closing %s positions: %s", strategy.symbol, e)
 
-    async def get_account_balance(self):
+    async def get_account_balance(self, max_age=None):
+        # Served from the account state while it is younger than max_age (the
+        # staleness bound by default); otherwise concurrent callers share the
+        # balance request that is already in flight
+        max_age = self.account.max_staleness if max_age is None else max_age
+        if self.account.balance is not None and self.account.staleness() <= max_age:
+            return self.account.balance
         try:
-            balance = await self.exchange.fetch_balance()
+            if self._balance_request is None:
+                self._balance_request = asyncio.ensure_future(self._request(self.exchange.fetch_balance))
+                self._balance_request.add_done_callback(lambda _: setattr(self, '_balance_request', None))
+            balance = await asyncio.shield(self._balance_request)
+            self.account.balance = balance['total']
             return balance['total']
         except Exception as e:
             self.logger.error(f"Error fetching account balance: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,74 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter, defaultdict
+
+class MockExchange:
+    # In-memory stand-in for the ccxt client used by LiveTrader, for dry runs and
+    # load tests. Market orders fill immediately at the last price set for the
+    # symbol and pay fee_rate of their notional. Every call is counted in
+    # `calls` and takes `latency` seconds, half on the way in and half on the
+    # way back: the exchange acts on a request in the middle, so a query can
+    # answer with state an order issued later has already changed. With jitter
+    # each half varies by up to that fraction, so responses can also arrive out
+    # of order.
+    def __init__(self, balance=10000.0, latency=0.005, fee_rate=0.0, jitter=0.0, seed=None):
+        self.balance = balance
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.fee_rate = fee_rate
+        self.prices = defaultdict(lambda: 1.0)
+        self.positions = defaultdict(float)  # signed amount per symbol
+        self.orders = []
+        self.calls = Counter()
+        self._ids = itertools.count(1)
+
+    async def _call(self, name, handle):
+        self.calls[name] += 1
+        await asyncio.sleep(self._leg())
+        result = handle()
+        await asyncio.sleep(self._leg())
+        return result
+
+    def _leg(self):
+        return self.latency / 2 * (1 + self.jitter * self.random.uniform(-1, 1))
+
+    def _fill(self, symbol, side, amount):
+        price = self.prices[symbol]
+        fee = amount * price * self.fee_rate
+        self.positions[symbol] += amount if side == 'buy' else -amount
+        self.balance -= (amount if side == 'buy' else -amount) * price + fee
+        order = {'id': str(next(self._ids)), 'symbol': symbol, 'side': side, 'type': 'market',
+                 'amount': amount, 'filled': amount, 'price': price, 'average': price,
+                 'fee': {'cost': fee, 'currency': 'USDC'}, 'status': 'closed',
+                 'timestamp': int(time.time() * 1000)}
+        self.orders.append(order)
+        return order
+
+    async def create_market_buy_order(self, symbol, amount, params=None):
+        return await self._call('create_market_buy_order', lambda: self._fill(symbol, 'buy', amount))
+
+    async def create_market_sell_order(self, symbol, amount, params=None):
+        return await self._call('create_market_sell_order', lambda: self._fill(symbol, 'sell', amount))
+
+    async def fetch_positions(self, symbols=None, params=None):
+        return await self._call('fetch_positions', lambda: [
+            {'symbol': symbol, 'side': 'long' if amount > 0 else 'short', 'amount': abs(amount),
+             'contracts': abs(amount), 'entryPrice': self.prices[symbol]}
+            for symbol, amount in self.positions.items()
+            if amount and (symbols is None or symbol in symbols)])
+
+    async def fetch_balance(self, params=None):
+        return await self._call('fetch_balance', self._balances)
+
+    def _balances(self):
+        equity = self.balance + sum(amount * self.prices[symbol] for symbol, amount in self.positions.items())
+        return {'total': {'USDC': equity}, 'free': {'USDC': self.balance}}
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        return await self._call('fetch_ohlcv', list)
+
+    async def close(self):
+        pass
@@ -0,0 +1,234 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.utils.performance_metrics import batch_performance_metrics
+from src.utils.shared_frame import SharedFrame, attach_frame
+
+# Monte Carlo resampling of a finished backtest. Simulations run in batches of
+# (simulations x bars) arrays sized to fit memory_budget, and only a few
+# scalars per simulation are kept. With summary=True not even those are: each
+# batch is folded into streaming quantile sketches, so memory stays bounded
+# whatever the simulation count.
+
+# Peak bytes per simulated bar held by one batch (indices, returns, equity, drawdown, metrics)
+SIMULATION_BYTES_PER_CELL = 64
+PERCENTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+class QuantileSketch:
+    # Streaming quantiles over any number of values in O(capacity * log n)
+    # memory. Values are kept in levels, level h holding samples that stand for
+    # 2**h values each; a level that outgrows `capacity` is sorted and every
+    # other sample (from a random offset) moves up a level. Quantiles are
+    # within a fraction of a percent in rank of the exact ones for the default
+    # capacity, while count, mean, std, min and max are exact.
+    def __init__(self, capacity=4096, seed=None):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        # Chan et al.'s pairwise update of mean and squared deviations
+        count, mean = len(values), values.mean()
+        delta = mean - self.mean
+        total = self.count + count
+        self.m2 += ((values - mean) ** 2).sum() + delta ** 2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        for height in range(len(self.levels)):
+            level = self.levels[height]
+            if len(level) <= self.capacity:
+                continue
+            level = np.sort(level)
+            kept, level = level[:len(level) // 2 * 2], level[len(level) // 2 * 2:]
+            if height + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[height + 1] = np.concatenate([self.levels[height + 1], kept[self.rng.integers(2)::2]])
+            self.levels[height] = level
+
+    def quantile(self, q):
+        if not self.count:
+            return np.nan
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        rank = np.clip(np.searchsorted(cumulative, q * cumulative[-1], side='left'), 0, len(values) - 1)
+        return float(np.clip(values[rank], self.min, self.max))
+
+    def describe(self, percentiles=PERCENTILES):
+        # The rows DataFrame.describe() gives for the same values
+        stats = {'count': float(self.count), 'mean': self.mean if self.count else np.nan,
+                 'std': np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan,
+                 'min': self.min if self.count else np.nan}
+        stats.update({_percentile_label(q): self.quantile(q) for q in percentiles})
+        stats['max'] = self.max if self.count else np.nan
+        return pd.Series(stats)
+
+def _percentile_label(q):
+    return f"{q * 100:g}%"
+
+def _summarize_paths(growth):
+    # growth: (simulations, steps) equity multiples starting from 1
+    equity = np.concatenate([np.ones((len(growth), 1)), growth], axis=1)
+    drawdown = 1 - equity / np.maximum.accumulate(equity, axis=1)
+    return (equity[:, -1] - 1) * 100, -drawdown.max(axis=1) * 100
+
+def _batches(num_simulations, steps, memory_budget):
+    batch_size = max(1, memory_budget // (SIMULATION_BYTES_PER_CELL * max(steps, 1)))
+    for start in range(0, num_simulations, batch_size):
+        yield min(batch_size, num_simulations - start)
+
+def collect(tables, summary=False, percentiles=PERCENTILES, seed=None):
+    # One row per simulation, or with summary=True the describe() table of every
+    # column built from streaming sketches, without keeping the rows
+    if not summary:
+        tables = list(tables)
+        return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    sketches = {}
+    for table in tables:
+        for column in table:
+            sketches.setdefault(column, QuantileSketch(seed=seed)).update(table[column].to_numpy())
+    described = pd.DataFrame({column: sketch.describe(percentiles) for column, sketch in sketches.items()})
+    described.attrs['summary'] = True
+    return described
+
+def trade_equity_returns(trades, equity):
+    # Each trade's PnL relative to the account equity when its order was placed.
+    # ReturnPct is the price move of the trade whatever its size, these are what
+    # the trades did to the account; compounded in order they retrace the
+    # equity at every exit of a run with one position at a time.
+    pnl = trades['PnL'].to_numpy(dtype=float)
+    entry_equity = np.asarray(equity, dtype=float)[np.maximum(trades['EntryBar'].to_numpy(dtype=int) - 1, 0)]
+    return pnl / entry_equity
+
+def trade_permutation(trade_returns, num_simulations, seed=None, memory_budget=256 * 1024 * 1024, replace=False,
+                      summary=False, percentiles=PERCENTILES):
+    # Reorders (or, with replace=True, bootstraps) per-trade equity returns,
+    # see trade_equity_returns(). Plain permutation keeps the final return and
+    # only moves the drawdown, which is measured at trade exits.
+    trade_returns = np.asarray(trade_returns, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    def tables():
+        for size in _batches(num_simulations, len(trade_returns), memory_budget):
+            if not len(trade_returns):
+                yield pd.DataFrame({'Return [%]': np.zeros(size), 'Max. Drawdown [%]': np.zeros(size)})
+                continue
+            if replace:
+                sampled = trade_returns[rng.integers(0, len(trade_returns), (size, len(trade_returns)))]
+            else:
+                sampled = rng.permuted(np.broadcast_to(trade_returns, (size, len(trade_returns))), axis=1)
+            batch_returns, batch_drawdowns = _summarize_paths(np.cumprod(1 + sampled, axis=1))
+            yield pd.DataFrame({'Return [%]': batch_returns, 'Max. Drawdown [%]': batch_drawdowns})
+
+    return collect(tables(), summary, percentiles, seed)
+
+def block_indices(n, block_size, size, rng):
+    # Circular block bootstrap: `size` rows of n bar indices made of contiguous blocks
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n, (size, n_blocks))
+    indices = (starts[:, :, None] + np.arange(block_size)) % n
+    return indices.reshape(size, -1)[:, :n]
+
+def block_bootstrap(bar_returns, num_simulations, block_size=None, seed=None, memory_budget=256 * 1024 * 1024,
+                    periods_per_year=None, summary=False, percentiles=PERCENTILES):
+    # Resamples the strategy's bar returns in blocks, which keeps short-range
+    # autocorrelation (volatility clusters, trade durations) intact. With
+    # periods_per_year the annualized metrics of every path are added as well.
+    bar_returns = np.nan_to_num(np.asarray(bar_returns, dtype=float))
+    block_size = block_size or max(1, int(round(len(bar_returns) ** (1 / 3))))
+    rng = np.random.default_rng(seed)
+
+    def tables():
+        for size in _batches(num_simulations, len(bar_returns), memory_budget):
+            sampled = bar_returns[block_indices(len(bar_returns), block_size, size, rng)]
+            growth = np.cumprod(1 + sampled, axis=1)
+            del sampled
+            batch_returns, batch_drawdowns = _summarize_paths(growth)
+            table = pd.DataFrame({'Return [%]': batch_returns, 'Max. Drawdown [%]': batch_drawdowns})
+            if periods_per_year is not None:
+                equity = np.concatenate([np.ones((size, 1)), growth], axis=1)
+                del growth
+                metrics = batch_performance_metrics(equity, periods_per_year)
+                table = table.join(metrics[['CAGR (%)', 'Volatility (%)', 'Sharpe Ratio', 'Sortino Ratio',
+                                            'Calmar Ratio']])
+            yield table
+
+    return collect(tables(), summary, percentiles, seed)
+
+def synthetic_ohlcv(data, block_size, rng):
+    # Block-resamples bars and chains them into a new price path. Open/high/low
+    # stay relative to their own bar, so every synthetic bar is a valid candle.
+    close = data['close'].to_numpy(dtype=float)
+    prev_close = np.r_[close[0], close[:-1]]
+    index = block_indices(len(data), block_size, 1, rng)[0]
+    step = (close / prev_close)[index]
+    new_close = close[0] * np.cumprod(step)
+    new_prev_close = np.r_[close[0], new_close[:-1]]
+    scale = new_prev_close / prev_close[index]
+    synthetic = pd.DataFrame({
+        'open': data['open'].to_numpy(dtype=float)[index] * scale,
+        'high': data['high'].to_numpy(dtype=float)[index] * scale,
+        'low': data['low'].to_numpy(dtype=float)[index] * scale,
+        'close': new_close,
+        'volume': data['volume'].to_numpy(dtype=float)[index],
+    }, index=data.index)
+    return synthetic
+
+# Worker process state for path simulations, set once per worker
+_worker = {}
+
+def _set_path_state(data, strategy, backtester_cls, cash, commission, engine, block_size):
+    _worker.update(data=data, strategy=strategy, backtester_cls=backtester_cls,
+                   cash=cash, commission=commission, engine=engine, block_size=block_size)
+
+def _init_path_worker(frame_spec, *state):
+    shm, data = attach_frame(frame_spec)
+    _worker['shm'] = shm
+    _set_path_state(data, *state)
+
+def _simulate_path(seed, params=None):
+    w = _worker
+    synthetic = synthetic_ohlcv(w['data'], w['block_size'], np.random.default_rng(seed))
+    backtester = w['backtester_cls'](synthetic, w['strategy'], cash=w['cash'], commission=w['commission'], engine=w['engine'])
+    stats = backtester.run(**(params or {}))
+    return stats['Return [%]'], stats['Max. Drawdown [%]']
+
+def path_simulation(backtester, num_simulations, block_size=None, seed=None, workers=1, params=None, summary=False,
+                    percentiles=PERCENTILES):
+    # Re-runs the full strategy on block-bootstrapped price paths, for effects
+    # (stops, sizing, indicator warm-up) that resampling returns cannot capture
+    data = backtester.data[['open', 'high', 'low', 'close', 'volume']]
+    block_size = block_size or max(1, int(round(len(data) ** (1 / 3))))
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(num_simulations)]
+    initargs = (backtester.strategy, type(backtester), backtester.cash, backtester.commission,
+                backtester.engine, block_size)
+
+    if workers > 1:
+        shared = SharedFrame(data)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_path_worker,
+                                     initargs=(shared.spec,) + initargs) as pool:
+                results = list(pool.map(_simulate_path, seeds, [params] * len(seeds),
+                                        chunksize=max(1, len(seeds) // (workers * 4))))
+        finally:
+            shared.close()
+    else:
+        _set_path_state(data, *initargs)
+        try:
+            results = [_simulate_path(s, params) for s in seeds]
+        finally:
+            _worker.clear()
+    return collect([pd.DataFrame(results, columns=['Return [%]', 'Max. Drawdown [%]'])], summary, percentiles, seed)
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Figures are built on the object-oriented API with the Agg canvas, never through
+# pyplot, so rendering needs no display, keeps no global figure state and is
+# safe to run off the main thread. matplotlib is imported with the first figure,
+# a run that draws no charts never loads it.
+
+def equity_curve(results):
+    curve = results['_equity_curve']
+    return curve['Equity'] if hasattr(curve, 'columns') else curve
+
+def drawdown_curve(results):
+    curve = results['_equity_curve']
+    if hasattr(curve, 'columns') and 'DrawdownPct' in curve:
+        return curve['DrawdownPct']
+    equity = equity_curve(results)
+    return 1 - equity / equity.cummax()
+
+def _line_figure(series, title, ylabel):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(series.index, series.to_numpy())
+    ax.set_title(title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel(ylabel)
+    return fig
+
+def equity_figure(results):
+    return _line_figure(equity_curve(results), 'Equity Curve', 'Equity')
+
+def drawdown_figure(results):
+    return _line_figure(drawdown_curve(results) * 100, 'Drawdown', 'Drawdown %')
+
+def save_figure(fig, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(path)
+    return path
+
+def _render(directory, name, equity, drawdown):
+    # Runs on the render thread with copies of the curves only
+    results = {'_equity_curve': equity.to_frame('Equity').assign(DrawdownPct=drawdown)}
+    return [
+        save_figure(equity_figure(results), os.path.join(directory, f"{name}_equity.png")),
+        save_figure(drawdown_figure(results), os.path.join(directory, f"{name}_drawdown.png")),
+    ]
+
+class ReportRenderer:
+    # Writes equity and drawdown charts to `directory` on a background thread.
+    # submit() returns a future with the written paths; wait() blocks until
+    # everything queued so far is on disk.
+    def __init__(self, directory, workers=1):
+        self.directory = directory
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-render')
+        self.pending = []
+
+    def submit(self, name, results):
+        equity = equity_curve(results).copy()
+        drawdown = drawdown_curve(results).copy()
+        future = self.executor.submit(_render, self.directory, name, equity, drawdown)
+        self.pending.append(future)
+        return future
+
+    def wait(self):
+        pending, self.pending = self.pending, []
+        return [path for future in pending for path in future.result()]
+
+    def close(self):
+        try:
+            return self.wait()
+        finally:
+            self.executor.shutdown()
@@ -0,0 +1,129 @@
+import numpy as np
+from src.candle_buffer import CandleBuffer, OHLCV_COLUMNS
+from src.utils.timeframe import timeframe_to_ms
+
+# Higher timeframes derived from one base-resolution candle series. Bars are
+# aligned to multiples of the interval since the epoch, which is how the
+# exchange buckets its own candles for minute, hour and day intervals (weeks
+# and months are not derived, see _interval). Each
+# derived series is cached and extended as base bars arrive: only the last,
+# possibly still forming, bar is re-aggregated.
+
+def resample_ohlcv(timestamps, values, interval_ms):
+    # One pass over sorted epoch-ms timestamps and an (n, 5) OHLCV block,
+    # returns the bar open times and the aggregated (m, 5) block
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if not len(timestamps):
+        return np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_COLUMNS)), dtype=values.dtype)
+    buckets = timestamps // interval_ms
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.append(starts[1:], len(timestamps)) - 1
+    out = np.empty((len(starts), len(OHLCV_COLUMNS)), dtype=values.dtype)
+    out[:, 0] = values[starts, 0]
+    out[:, 1] = np.maximum.reduceat(values[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(values[:, 2], starts)
+    out[:, 3] = values[ends, 3]
+    out[:, 4] = np.add.reduceat(values[:, 4], starts)
+    return buckets[starts] * interval_ms, out
+
+def align_positions(bar_timestamps, interval_ms, timestamps, bar_ms):
+    # For bars of bar_ms opening at `timestamps`, the row of the latest
+    # interval_ms bar that had closed by their close, -1 before the first one.
+    # Higher-timeframe values looked up this way never see the future.
+    closes = np.asarray(bar_timestamps, dtype=np.int64) + interval_ms
+    return np.searchsorted(closes, np.asarray(timestamps, dtype=np.int64) + bar_ms, side='right') - 1
+
+def align_values(values, positions):
+    # Rows of `values` at `positions`, NaN where no bar had closed yet
+    values = np.asarray(values, dtype=np.float64)
+    out = values[np.maximum(positions, 0)]
+    out[positions < 0] = np.nan
+    return out
+
+def index_timestamps(index):
+    return np.asarray(index.values).astype('datetime64[ms]').astype(np.int64)
+
+class Resampler:
+    def __init__(self, base_timeframe, capacity=1024):
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.base = CandleBuffer(capacity)
+        self._bars = {}  # timeframe -> [CandleBuffer of bars, base row where the last bar starts]
+
+    @classmethod
+    def from_frame(cls, df, base_timeframe):
+        resampler = cls(base_timeframe, capacity=max(1, len(df)))
+        resampler.update(index_timestamps(df.index), df[OHLCV_COLUMNS].to_numpy(dtype=np.float64))
+        return resampler
+
+    def _interval(self, timeframe):
+        if timeframe[-1:] in ('w', 'M'):
+            # Exchange weeks start on Monday and months differ in length, while
+            # epoch-aligned buckets would start weeks on Thursday and months anywhere
+            raise ValueError(f"Cannot derive {timeframe} candles, weekly and monthly bars are not epoch-aligned")
+        interval_ms = timeframe_to_ms(timeframe)
+        if interval_ms < self.base_ms or interval_ms % self.base_ms:
+            raise ValueError(f"Cannot derive {timeframe} candles from {self.base_timeframe} candles")
+        return interval_ms
+
+    def update(self, timestamps, values):
+        # Appends sorted base bars. A bar with the timestamp of the last one
+        # replaces it (the forming candle); anything older is rejected.
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), len(OHLCV_COLUMNS))
+        if not len(timestamps):
+            return
+        keep = int(np.searchsorted(self.base.timestamps[:self.base.size], timestamps[0], side='left'))
+        if keep < self.base.size - 1:
+            raise ValueError("Base candles must arrive in order, only the last candle can be replaced")
+        self.base.truncate(keep)
+        self.base.append(timestamps, values)
+        for timeframe in self._bars:
+            self._extend(timeframe)
+
+    def _extend(self, timeframe):
+        # Re-aggregates from the first base row of the last cached bar, which is
+        # never after the first base row that changed
+        interval_ms = self._interval(timeframe)
+        bars, start = self._bars[timeframe]
+        if bars.size:
+            bars.truncate(bars.size - 1)
+        timestamps = self.base.timestamps[start:self.base.size]
+        bar_timestamps, values = resample_ohlcv(timestamps, self.base.values[start:self.base.size], interval_ms)
+        bars.append(bar_timestamps, values)
+        if len(bar_timestamps):
+            self._bars[timeframe][1] = start + int(np.searchsorted(timestamps, bar_timestamps[-1], side='left'))
+
+    def bars(self, timeframe):
+        # The cached CandleBuffer for `timeframe`, aggregated on first use
+        if timeframe == self.base_timeframe:
+            return self.base
+        if timeframe not in self._bars:
+            self._interval(timeframe)
+            self._bars[timeframe] = [CandleBuffer(max(1, self.base.size * self.base_ms // timeframe_to_ms(timeframe) + 1)), 0]
+            self._extend(timeframe)
+        return self._bars[timeframe][0]
+
+    def is_closed(self, timeframe):
+        # Whether the last bar of `timeframe` is complete, judging by the base bars seen so far
+        bars = self.bars(timeframe)
+        if not bars.size:
+            return True
+        last = self.base.timestamps[self.base.size - 1] + self.base_ms
+        return bars.timestamps[bars.size - 1] + timeframe_to_ms(timeframe) <= last
+
+    def get(self, timeframe, closed_only=False):
+        # Candles of `timeframe` as a frame that wraps the cached buffer; the
+        # last row changes while that bar is forming, copy it to keep it
+        frame = self.bars(timeframe).to_frame()
+        if closed_only and not self.is_closed(timeframe):
+            frame = frame.iloc[:-1]
+        return frame
+
+    def align(self, values, timeframe, index, bar_ms=None):
+        # Maps per-bar `values` of `timeframe` (rows matching get(timeframe)) onto
+        # the bars opening at `index`, using only bars closed by then
+        bars = self.bars(timeframe)
+        positions = align_positions(bars.timestamps[:bars.size], timeframe_to_ms(timeframe), index_timestamps(index),
+                                    self.base_ms if bar_ms is None else bar_ms)
+        return align_values(values, positions)
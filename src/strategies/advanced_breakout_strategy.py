@@ -1,12 +1,24 @@
+from functools import reduce
 import numpy as np
-import pandas as pd
 from backtesting import Strategy
+from src.indicators.cache import history_window
 from src.indicators.custom_indicators import (
     calculate_atr, calculate_supertrend, calculate_vwap,
-    calculate_volume_profile, identify_support_resistance
+    calculate_volume_profile, identify_support_resistance,
+    calculate_rsi, calculate_macd, calculate_sma
 )
 
+def _window(values, window):
+    if isinstance(values, tuple):
+        return tuple(_window(value, window) for value in values)
+    return np.asarray(values, dtype=float)[window]
+
 class AdvancedBreakoutStrategy(Strategy):
+    # Every indicator is computed from OHLCV in init, no precomputed features
+    # needed. On a window of the history registered with set_history() (a
+    # walk-forward fold) they are computed on the full history and sliced, so
+    # folds and individuals that share a period share one computation.
+    FEATURES = ()
     n_atr = 14
     n_supertrend = 10
     atr_multiplier = 3
@@ -20,18 +32,26 @@ class AdvancedBreakoutStrategy(Strategy):
     breakout_threshold = 1.5
 
     def init(self):
-        self.atr = self.I(calculate_atr, self.data.high, self.data.low, self.data.close, self.n_atr)
-        self.supertrend = self.I(calculate_supertrend, self.data.high, self.data.low, self.data.close, self.n_supertrend, self.atr_multiplier)
-        self.vwap = self.I(calculate_vwap, self.data.high, self.data.low, self.data.close, self.data.volume)
-        self.volume_profile = self.I(calculate_volume_profile, self.data.close, self.data.volume)
-        self.support, self.resistance = self.I(identify_support_resistance, self.data.high, self.data.low, self.data.close)
-        
-        self.rsi = self.I(lambda: pd.Series(self.data.ta.rsi(length=self.rsi_period)))
-        macd_data = self.data.ta.macd(fast=self.macd_fast, slow=self.macd_slow, signal=self.macd_signal)
-        self.macd = self.I(lambda: macd_data['MACD_' + str(self.macd_fast) + '_' + str(self.macd_slow) + '_' + str(self.macd_signal)])
-        self.macd_signal = self.I(lambda: macd_data['MACDs_' + str(self.macd_fast) + '_' + str(self.macd_slow) + '_' + str(self.macd_signal)])
+        (high, low, close, volume), window = self._source_arrays(self.data.df)
+
+        def indicator(func, *args, **kwargs):
+            return self.I(lambda: _window(func(*args, **kwargs), window), name=func.__name__)
+
+        self.atr = indicator(calculate_atr, high, low, close, self.n_atr)
+        self.supertrend = indicator(calculate_supertrend, high, low, close, self.n_supertrend, self.atr_multiplier)
+        self.vwap = indicator(calculate_vwap, high, low, close, volume)
+        # A histogram of this run's own bars, not a per-bar series, so not an I() indicator
+        self.volume_profile = calculate_volume_profile(self.data.close, self.data.volume)
+        # Causal levels: a pivot only shows up once the bars that confirm it have closed
+        self.support, self.resistance = indicator(identify_support_resistance, high, low, close, causal=True)
         
-        self.volume_sma = self.I(lambda: pd.Series(self.data.volume).rolling(20).mean())
+        # Indicators come from the shared indicator cache, so parameter sets that
+        # share a period (e.g. rsi_period=14) compute that column only once
+        self.rsi = indicator(calculate_rsi, close, self.rsi_period)
+        # Stored as macd_signal_line so the macd_signal period parameter is not shadowed
+        self.macd, self.macd_signal_line = indicator(calculate_macd, close, self.macd_fast, self.macd_slow, self.macd_signal)
+
+        self.volume_sma = indicator(calculate_sma, volume, 20)
 
     def next(self):
         # Trend analysis
@@ -49,8 +69,8 @@ class AdvancedBreakoutStrategy(Strategy):
         rsi_sell_condition = self.rsi[-1] > self.rsi_overbought
 
         # MACD conditions
-        macd_buy_condition = self.macd[-1] > self.macd_signal[-1] and self.macd[-2] <= self.macd_signal[-2]
-        macd_sell_condition = self.macd[-1] < self.macd_signal[-1] and self.macd[-2] >= self.macd_signal[-2]
+        macd_buy_condition = self.macd[-1] > self.macd_signal_line[-1] and self.macd[-2] <= self.macd_signal_line[-2]
+        macd_sell_condition = self.macd[-1] < self.macd_signal_line[-1] and self.macd[-2] >= self.macd_signal_line[-2]
 
         # Entry conditions
         long_condition = trend == 1 and breakout_up and volume_confirmed and rsi_buy_condition and macd_buy_condition
@@ -61,11 +81,11 @@ class AdvancedBreakoutStrategy(Strategy):
         stop_loss_pips = self.atr[-1] * self.atr_multiplier
         position_size = self.position_size_calculator(risk_per_trade, stop_loss_pips)
 
-        # Execute trades
+        # Execute trades, in whole units; a stop too wide for one unit skips the entry
         if not self.position:
-            if long_condition:
+            if long_condition and position_size >= 1:
                 self.buy(size=position_size, sl=self.data.close[-1] - stop_loss_pips)
-            elif short_condition:
+            elif short_condition and position_size >= 1:
                 self.sell(size=position_size, sl=self.data.close[-1] + stop_loss_pips)
         
         # Exit conditions
@@ -76,10 +96,109 @@ class AdvancedBreakoutStrategy(Strategy):
             if trend == 1 or (breakout_up and rsi_buy_condition):
                 self.position.close()
 
+    PARAMS = ('n_atr', 'n_supertrend', 'atr_multiplier', 'volume_threshold', 'rsi_period', 'rsi_overbought',
+              'rsi_oversold', 'macd_fast', 'macd_slow', 'macd_signal', 'breakout_threshold')
+
+    @staticmethod
+    def _source_arrays(data):
+        # OHLCV arrays to compute indicators on and the slice of them that is `data`
+        source, window = history_window(data)
+        return tuple(source[column].to_numpy(dtype=float) for column in ('high', 'low', 'close', 'volume')), window
+
+    @classmethod
+    def _indicator_arrays(cls, high, low, close, volume, p, shared=None):
+        # The same indicators (and indicator cache entries) as init()
+        if shared is None:
+            support, resistance = (np.asarray(x, dtype=float) for x in identify_support_resistance(high, low, close, causal=True))
+            shared = {'support': support, 'resistance': resistance,
+                      'volume_sma': np.asarray(calculate_sma(volume, 20), dtype=float)}
+        macd, macd_signal_line = (np.asarray(x, dtype=float) for x in
+                                  calculate_macd(close, p['macd_fast'], p['macd_slow'], p['macd_signal']))
+        return dict(shared,
+                    atr=np.asarray(calculate_atr(high, low, close, p['n_atr']), dtype=float),
+                    supertrend=np.asarray(calculate_supertrend(high, low, close, p['n_supertrend'], p['atr_multiplier']), dtype=float),
+                    rsi=np.asarray(calculate_rsi(close, p['rsi_period']), dtype=float),
+                    macd=macd, macd_signal_line=macd_signal_line)
+
+    @staticmethod
+    def _signal_masks(close, volume, ind, p):
+        # The conditions of next() on whole arrays. Indicators are (bars,) or
+        # (bars, params) and parameters are scalars or (params,) vectors, so the
+        # same code serves single runs and batches by broadcasting.
+        def prev(x):
+            shifted = np.empty_like(x, dtype=float)
+            shifted[0] = np.nan
+            shifted[1:] = x[:-1]
+            return shifted
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            trend = np.where(ind['supertrend'] < close, 1, -1)
+            volume_confirmed = volume > ind['volume_sma'] * p['volume_threshold']
+            breakout_up = (close > ind['resistance'] * p['breakout_threshold']) & (prev(close) <= prev(ind['resistance']))
+            breakout_down = (close < ind['support'] / p['breakout_threshold']) & (prev(close) >= prev(ind['support']))
+            rsi_buy_condition = ind['rsi'] < p['rsi_oversold']
+            rsi_sell_condition = ind['rsi'] > p['rsi_overbought']
+            macd, signal = ind['macd'], ind['macd_signal_line']
+            macd_buy_condition = (macd > signal) & (prev(macd) <= prev(signal))
+            macd_sell_condition = (macd < signal) & (prev(macd) >= prev(signal))
+
+        # backtesting.py only calls next() once every indicator has a value
+        warmup = reduce(np.maximum, [np.isnan(ind[name]).argmin(axis=0) for name in (
+            'atr', 'supertrend', 'support', 'resistance', 'rsi', 'macd', 'macd_signal_line', 'volume_sma')])
+
+        return {
+            'long_entry': (trend == 1) & breakout_up & volume_confirmed & rsi_buy_condition & macd_buy_condition,
+            'short_entry': (trend == -1) & breakout_down & volume_confirmed & rsi_sell_condition & macd_sell_condition,
+            'long_exit': (trend == -1) | (breakout_down & rsi_sell_condition),
+            'short_exit': (trend == 1) | (breakout_up & rsi_buy_condition),
+            'stop_distance': ind['atr'] * p['atr_multiplier'],
+            'risk_per_trade': 0.02,
+            'start': warmup + 1,
+        }
+
+    @classmethod
+    def vectorized_signals(cls, data, **params):
+        # Array form of init()/next() for the vectorized engine
+        p = {name: params.get(name, getattr(cls, name)) for name in cls.PARAMS}
+        (high, low, close, volume), window = cls._source_arrays(data)
+        ind = {name: values[window] for name, values in cls._indicator_arrays(high, low, close, volume, p).items()}
+        signals = cls._signal_masks(close[window], volume[window], ind, p)
+        signals['start'] = int(signals['start'])
+        return signals
+
+    @classmethod
+    def vectorized_signals_batch(cls, data, param_sets):
+        # (bars, params) masks for many parameter sets, every distinct indicator
+        # period is computed once and shared by the columns that use it
+        rows = [{name: params.get(name, getattr(cls, name)) for name in cls.PARAMS} for params in param_sets]
+        (high, low, close, volume), window = cls._source_arrays(data)
+
+        shared = None
+        columns = {}
+        by_params = {}
+        for p in rows:
+            key = (p['n_atr'], p['n_supertrend'], p['atr_multiplier'], p['rsi_period'],
+                   p['macd_fast'], p['macd_slow'], p['macd_signal'])
+            if key not in by_params:
+                by_params[key] = cls._indicator_arrays(high, low, close, volume, p, shared)
+                shared = shared or {name: by_params[key][name] for name in ('support', 'resistance', 'volume_sma')}
+            for name, values in by_params[key].items():
+                if name not in shared:
+                    columns.setdefault(name, []).append(values[window])
+
+        ind = {name: np.column_stack(values) for name, values in columns.items()}
+        ind.update({name: values[window, None] for name, values in shared.items()})
+        vectors = {name: np.array([p[name] for p in rows], dtype=float) for name in cls.PARAMS}
+        return cls._signal_masks(close[window, None], volume[window, None], ind, vectors)
+
     def position_size_calculator(self, risk_per_trade, stop_loss_pips):
+        # Whole units rounded down: backtesting.py takes a size below 1 as a
+        # fraction of equity and rejects other fractional sizes
         account_balance = self.equity
+        if not stop_loss_pips > 0:
+            return 0
         position_size = (account_balance * risk_per_trade) / stop_loss_pips
-        return position_size
+        return int(position_size)
 
     def update_params(self, params):
         for key, value in params.items():
@@ -2,6 +2,8 @@ import numpy as np
 from backtesting import Strategy
 
 class BreakoutStrategy(Strategy):
+    # Precomputed columns this strategy reads from the data, see FeatureEngineer
+    FEATURES = ('sma_fast', 'sma_slow', 'rsi', 'atr', 'support', 'resistance')
     n_sma_fast = 20
     n_sma_slow = 50
     rsi_period = 14
@@ -15,7 +17,7 @@ class BreakoutStrategy(Strategy):
         self.sma_slow = self.I(lambda: self.data.sma_slow)
         self.rsi = self.I(lambda: self.data.rsi)
         self.atr = self.I(lambda: self.data.atr)
-        self.volume_ratio = self.I(lambda: self.data.volume / self.data.volume.rolling(20).mean())
+        self.volume_ratio = self.I(lambda: self.data.volume / self.data.volume.s.rolling(20).mean())
 
     def next(self):
         # Trend following
@@ -0,0 +1,104 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+
+# Multi-fidelity search: every candidate is scored on a short prefix of the
+# history, the best 1/eta of them move on to a prefix eta times longer, and so
+# on until the survivors are scored on the full history. Cost is counted in
+# bar-evaluations (candidates x bars backtested).
+
+def fidelity_schedule(n_bars, min_fraction=0.1, eta=3, min_bars=0):
+    # Bars per rung, growing by eta and ending with the full history
+    rungs = max(0, int(math.floor(math.log(1 / min_fraction) / math.log(eta) + 1e-9)))
+    bars = [min(n_bars, max(min_bars, int(round(n_bars / eta ** (rungs - rung))))) for rung in range(rungs + 1)]
+    return sorted(set(bars))
+
+def halving_cost(n_candidates, schedule, eta):
+    # Bar-evaluations of a full run starting from n_candidates
+    cost = 0
+    for bars in schedule:
+        cost += bars * n_candidates
+        n_candidates = max(1, math.ceil(n_candidates / eta))
+    return cost
+
+def _score(backtester, params_list, columns):
+    if backtester.engine == 'vectorized' and hasattr(backtester.strategy, 'vectorized_signals_batch'):
+        return backtester.run_batch(params_list)[columns].reset_index(drop=True)
+    rows = []
+    for params in params_list:
+        stats = backtester.run(**params)
+        rows.append({column: stats[column] for column in columns})
+    return pd.DataFrame(rows, columns=columns)
+
+def successive_halving(backtester, param_sets, maximize='Return [%]', min_fraction=0.1, eta=3, min_bars=0,
+                       max_drawdown=None, budget=None):
+    # Returns a dict with the best parameters, the per-rung history, the cost in
+    # bar-evaluations and the wall-clock time. The full-fidelity time and the
+    # time saved are estimates, extrapolated from bar-evaluations, not measured.
+    # max_drawdown (in %) drops candidates that lose more than that at any rung,
+    # budget caps the total bar-evaluations by starting with fewer candidates.
+    data = backtester.data
+    schedule = fidelity_schedule(len(data), min_fraction, eta, min_bars)
+    candidates = list(range(len(param_sets)))
+    if budget is not None:
+        # Largest starting pool whose whole run fits the budget
+        low, high = 0, len(candidates)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if halving_cost(middle, schedule, eta) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        candidates = candidates[:low]
+        if not candidates:
+            raise ValueError(f"Budget of {budget} bar-evaluations cannot score a single candidate")
+    initial = len(candidates)
+    columns = list(dict.fromkeys([maximize, 'Return [%]', 'Max. Drawdown [%]']))
+
+    start = time.perf_counter()
+    bar_evaluations = 0
+    history = []
+    for rung, bars in enumerate(schedule):
+        rung_backtester = type(backtester)(data.iloc[:bars], backtester.strategy, cash=backtester.cash,
+                                           commission=backtester.commission, engine=backtester.engine)
+        table = _score(rung_backtester, [param_sets[i] for i in candidates], columns)
+        bar_evaluations += bars * len(candidates)
+
+        score = table[maximize].to_numpy(dtype=float)
+        score = np.where(np.isnan(score), -np.inf, score)
+        alive = np.isfinite(score)
+        if max_drawdown is not None:
+            alive &= table['Max. Drawdown [%]'].to_numpy(dtype=float) >= -max_drawdown
+        if not alive.any():
+            alive[:] = True
+
+        final = rung == len(schedule) - 1
+        keep = len(candidates) if final else max(1, math.ceil(len(candidates) / eta))
+        order = [i for i in np.argsort(-score, kind='stable') if alive[i]][:keep]
+        promoted = set(order)
+        for position, candidate in enumerate(candidates):
+            history.append({'rung': rung, 'bars': bars, 'candidate': candidate, 'score': score[position],
+                            'drawdown': table['Max. Drawdown [%]'].iloc[position], 'promoted': position in promoted})
+        if final:
+            break
+        candidates = [candidates[i] for i in order]
+
+    elapsed = time.perf_counter() - start
+    full_bar_evaluations = initial * len(data)
+    # Backtest cost grows roughly linearly with bars, which gives the full-fidelity estimate
+    estimated_full_elapsed = elapsed * full_bar_evaluations / bar_evaluations
+    best = candidates[order[0]]
+    final_scores = {candidate: score[position] for position, candidate in enumerate(candidates)}
+    return {
+        'best': param_sets[best],
+        'best_score': score[order[0]],
+        'final_scores': final_scores,
+        'history': pd.DataFrame(history),
+        'schedule': schedule,
+        'bar_evaluations': bar_evaluations,
+        'full_bar_evaluations': full_bar_evaluations,
+        'elapsed': elapsed,
+        'estimated_full_elapsed': estimated_full_elapsed,
+        'estimated_time_saved': estimated_full_elapsed - elapsed,
+    }
@@ -0,0 +1,57 @@
+import json
+import os
+from collections import OrderedDict
+
+def _plain(value):
+    # numpy scalars from grids like np.arange(5, 50, 5), keyed like the Python number they hold
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FitnessCache:
+    # Fitness values keyed by the decoded parameter dict, optionally persisted as
+    # JSON so repeated runs on the same data skip known individuals. `namespace`
+    # should identify the data and strategy the fitness was measured on.
+    def __init__(self, path=None, max_entries=100000, namespace=''):
+        self.path = path
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries.update((key, tuple(value)) for key, value in json.load(f))
+
+    def key(self, params):
+        return json.dumps([self.namespace, params], sort_keys=True, default=_plain)
+
+    def get(self, params):
+        key = self.key(params)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, params, fitness):
+        key = self.key(params)
+        self.entries[key] = tuple(fitness)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(tmp_path, self.path)
@@ -1,33 +1,108 @@
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from src.utils.metrics import get_metrics
 
-def setup_logger():
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came in through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+class JsonFormatter(logging.Formatter):
+    # One compact JSON object per line, with any fields passed through `extra`
+    def format(self, record):
+        entry = {'ts': round(record.created, 6), 'level': record.levelname, 'logger': record.name,
+                 'msg': record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown, wait for room instead of raising
+        self.queue.put(self._sentinel)
+
+class BoundedQueueHandler(QueueHandler):
+    # Hands records to a listener thread that runs the real handlers, so a slow
+    # disk or terminal never stalls the caller (the event loop). Records are
+    # queued unformatted and the message is built on the listener thread, so
+    # log arguments must not be mutated after the call. The caller never blocks:
+    # a full queue drops the record, and with sample_every set, once the queue
+    # is half full only every sample_every-th record below WARNING is kept.
+    def __init__(self, handlers, maxsize=10000, sample_every=None):
+        super().__init__(queue.Queue(maxsize))
+        self.sample_every = sample_every
+        self.dropped = 0
+        self.sampled_out = 0
+        self._under_pressure = 0
+        self.listener = _Listener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.sample_every and record.levelno < logging.WARNING and self.queue.qsize() > self.queue.maxsize // 2:
+            self._under_pressure += 1
+            if self._under_pressure % self.sample_every:
+                self.sampled_out += 1
+                get_metrics().inc('log_records_dropped', reason='sampled')
+                return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            get_metrics().inc('log_records_dropped', reason='full')
+
+    def close(self):
+        # Drains what is queued into the handlers, then closes them; they are
+        # only reachable through this handler, so nothing else would
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+        super().close()
+
+def setup_logger(level=logging.DEBUG, console_level=logging.INFO, log_dir='logs', json_lines=False,
+                 queued=True, queue_size=10000, sample_every=None):
     logger = logging.getLogger('hyperliquid_bot')
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(level)
+
+    # Calling this again replaces the handlers instead of adding a second set
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
 
     # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    os.makedirs(log_dir, exist_ok=True)
 
     # Create file handler which logs even debug messages
-    fh = RotatingFileHandler('logs/bot.log', maxBytes=10*1024*1024, backupCount=5)
+    fh = RotatingFileHandler(os.path.join(log_dir, 'bot.jsonl' if json_lines else 'bot.log'),
+                             maxBytes=10*1024*1024, backupCount=5)
     fh.setLevel(logging.DEBUG)
+    fh.setFormatter(JsonFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
 
     # Create console handler with a higher log level
     ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-
-    # Create formatter and add it to the handlers
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    fh.setFormatter(formatter)
-    ch.setFormatter(formatter)
+    ch.setLevel(console_level)
+    ch.setFormatter(logging.Formatter(LOG_FORMAT))
 
-    # Add the handlers to the logger
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    # Add the handlers to the logger, behind a queue unless queued=False. The
+    # queue handler is created last, so logging.shutdown() closes it (draining
+    # the queue) before the file and console handlers.
+    if queued:
+        logger.addHandler(BoundedQueueHandler([fh, ch], maxsize=queue_size, sample_every=sample_every))
+    else:
+        logger.addHandler(fh)
+        logger.addHandler(ch)
 
     return logger
 
 def get_logger():
-    return logging.getLogger('hyperliquid_bot')
\ No newline at end of file
+    return logging.getLogger('hyperliquid_bot')
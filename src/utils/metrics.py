@@ -0,0 +1,174 @@
+import functools
+import inspect
+import math
+import os
+import time
+from contextlib import contextmanager
+
+# Lightweight in-process instrumentation. Latencies go into log-linear
+# histograms (HDR style: every power of two is split into SUB_BUCKETS linear
+# buckets, so relative error stays under 1/SUB_BUCKETS at any scale) and
+# recording is a frexp and a list increment. Everything renders to the
+# Prometheus text format, pulled over HTTP or written to a snapshot file.
+
+SUB_BUCKETS = 16
+MAX_EXPONENT = 40  # 2**40 microseconds is about 12 days
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (MAX_EXPONENT * SUB_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        micros = max(1.0, seconds * 1e6)
+        mantissa, exponent = math.frexp(micros)  # micros = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        index = min((exponent - 1) * SUB_BUCKETS + int((mantissa * 2 - 1) * SUB_BUCKETS), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    @staticmethod
+    def upper_bound(index):
+        # Upper edge of a bucket in seconds
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return 2.0 ** exponent * (1 + (sub + 1) / SUB_BUCKETS) / 1e6
+
+    def quantile(self, q):
+        if not self.count:
+            return float('nan')
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return self.upper_bound(index)
+        return self.upper_bound(len(self.counts) - 1)
+
+    def buckets(self):
+        # Cumulative counts at every power of two up to the largest recorded value,
+        # the fixed bucket layout Prometheus expects
+        last = max((i for i, count in enumerate(self.counts) if count), default=-1)
+        cumulative = 0
+        for exponent in range(last // SUB_BUCKETS + 1):
+            cumulative += sum(self.counts[exponent * SUB_BUCKETS:(exponent + 1) * SUB_BUCKETS])
+            yield 2.0 ** (exponent + 1) / 1e6, cumulative
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+def _labels(labels, **extra):
+    items = {**labels, **extra}
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in sorted(items.items())) + '}'
+
+class MetricsRegistry:
+    def __init__(self, prefix='hyperliquid_bot'):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        return self.histograms[key]
+
+    def counter(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.counters:
+            self.counters[key] = Counter()
+        return self.counters[key]
+
+    def inc(self, name, amount=1, **labels):
+        self.counter(name, **labels).inc(amount)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        # Records the block's wall time in the `name` histogram, also when it raises
+        histogram = self.histogram(name, **labels)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.record(time.perf_counter() - started)
+
+    def timed(self, name, **labels):
+        # Decorator form of timer() for plain and async functions
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        # Quantiles of every histogram, for logs and reports
+        return {
+            name + _labels(dict(labels)): {'count': h.count, 'p50': h.quantile(0.5), 'p99': h.quantile(0.99)}
+            for (name, labels), h in self.histograms.items()
+        }
+
+    def to_prometheus(self):
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            full_name = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {full_name} counter")
+            for (counter_name, labels), counter in sorted(self.counters.items()):
+                if counter_name == name:
+                    lines.append(f"{full_name}{_labels(dict(labels))} {counter.value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            full_name = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {full_name} histogram")
+            for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                if histogram_name != name:
+                    continue
+                labels = dict(labels)
+                for bound, cumulative in histogram.buckets():
+                    lines.append(f"{full_name}_bucket{_labels(labels, le=f'{bound:.6g}')} {cumulative}")
+                lines.append(f"{full_name}_bucket{_labels(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{full_name}_sum{_labels(labels)} {histogram.sum:.9g}")
+                lines.append(f"{full_name}_count{_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # Snapshot for the node exporter textfile collector, replaced atomically
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    async def serve(self, host='0.0.0.0', port=9108):
+        # Pull endpoint at /metrics; returns the runner, call runner.cleanup() to stop
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.to_prometheus(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+_metrics = MetricsRegistry()
+
+def get_metrics():
+    return _metrics
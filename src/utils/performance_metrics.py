@@ -1,28 +1,62 @@
 import numpy as np
 import pandas as pd
+from src.utils.timeframe import timeframe_to_ms
 
-def calculate_performance_metrics(results):
-    returns = results['_equity_curve'].pct_change().dropna()
-    
-    total_return = (results['_equity_curve'].iloc[-1] / results['_equity_curve'].iloc[0] - 1) * 100
-    cagr = (results['_equity_curve'].iloc[-1] / results['_equity_curve'].iloc[0]) ** (252 / len(returns)) - 1
-    volatility = returns.std() * np.sqrt(252)
-    sharpe_ratio = (returns.mean() * 252) / (returns.std() * np.sqrt(252))
-    sortino_ratio = (returns.mean() * 252) / (returns[returns < 0].std() * np.sqrt(252))
-    max_drawdown = results['_drawdown'].max()
-    calmar_ratio = cagr / max_drawdown
-    
-    win_rate = results['Win Rate [%]']
-    profit_factor = results['Profit Factor']
-    
-    return pd.Series({
-        'Total Return (%)': total_return,
-        'CAGR (%)': cagr * 100,
-        'Volatility (%)': volatility * 100,
-        'Sharpe Ratio': sharpe_ratio,
-        'Sortino Ratio': sortino_ratio,
-        'Max Drawdown (%)': max_drawdown * 100,
-        'Calmar Ratio': calmar_ratio,
-        'Win Rate (%)': win_rate,
-        'Profit Factor': profit_factor
-    })
\ No newline at end of file
+# Crypto markets trade around the clock, so a year is 365 full days of candles
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+
+def periods_per_year(timeframe):
+    return YEAR_MS / timeframe_to_ms(timeframe)
+
+def infer_periods_per_year(index):
+    # Falls back to the daily-bar convention when the index carries no timestamps
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return 252.0
+    step_ms = np.median(np.diff(index.values).astype('timedelta64[ms]').astype(np.int64))
+    return YEAR_MS / step_ms if step_ms > 0 else 252.0
+
+def batch_performance_metrics(equity, periods_per_year):
+    # Metrics for every row of a (curves x bars) equity matrix in one pass.
+    # Returns one row per curve with the same columns as calculate_performance_metrics.
+    equity = np.atleast_2d(np.asarray(equity, dtype=float))
+    returns = equity[:, 1:] / equity[:, :-1] - 1
+    n_returns = returns.shape[1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        growth = equity[:, -1] / equity[:, 0]
+        cagr = growth ** (periods_per_year / n_returns) - 1
+        mean = returns.mean(axis=1)
+        std = returns.std(axis=1, ddof=1)
+        # Sample std of the negative returns only, without building ragged arrays
+        negative = returns < 0
+        n_negative = negative.sum(axis=1)
+        negative_returns = np.where(negative, returns, 0)
+        negative_sum = negative_returns.sum(axis=1)
+        negative_var = ((negative_returns ** 2).sum(axis=1) - negative_sum ** 2 / n_negative) / (n_negative - 1)
+        downside = np.sqrt(np.maximum(negative_var, 0))
+
+        annual_mean = mean * periods_per_year
+        volatility = std * np.sqrt(periods_per_year)
+        max_drawdown = (1 - equity / np.maximum.accumulate(equity, axis=1)).max(axis=1)
+
+        return pd.DataFrame({
+            'Total Return (%)': (growth - 1) * 100,
+            'CAGR (%)': cagr * 100,
+            'Volatility (%)': volatility * 100,
+            'Sharpe Ratio': annual_mean / volatility,
+            'Sortino Ratio': annual_mean / (downside * np.sqrt(periods_per_year)),
+            'Max Drawdown (%)': max_drawdown * 100,
+            'Calmar Ratio': cagr / max_drawdown,
+        })
+
+def calculate_performance_metrics(results, periods_per_year=None):
+    # The equity curve is the backtesting.py frame with 'Equity' and 'DrawdownPct'
+    curve = results['_equity_curve']
+    equity = curve['Equity'] if isinstance(curve, pd.DataFrame) else curve
+    if periods_per_year is None:
+        periods_per_year = infer_periods_per_year(equity.index)
+
+    metrics = batch_performance_metrics(equity.to_numpy()[None, :], periods_per_year).iloc[0]
+    metrics['Win Rate (%)'] = results['Win Rate [%]']
+    metrics['Profit Factor'] = results['Profit Factor']
+    return metrics.rename(None)
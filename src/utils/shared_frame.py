@@ -0,0 +1,30 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+class SharedFrame:
+    # Copies a numeric DataFrame into one shared memory block so worker processes
+    # can map it instead of receiving a pickled copy with every task
+    def __init__(self, df):
+        rows, cols = df.shape
+        self.shm = shared_memory.SharedMemory(create=True, size=max((rows * (cols + 1)) * 8, 1))
+        block = np.ndarray((rows, cols + 1), dtype=np.float64, buffer=self.shm.buf)
+        block[:, :cols] = df.to_numpy(dtype=np.float64)
+        is_datetime = isinstance(df.index, pd.DatetimeIndex)
+        index = df.index.values.astype('datetime64[ns]').astype(np.int64) if is_datetime else np.asarray(df.index)
+        # Index values travel in the last column as int64 bit patterns
+        block[:, cols].view(np.int64)[:] = index
+        self.spec = (self.shm.name, rows, list(df.columns), is_datetime)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_frame(spec):
+    # Returns the shared memory handle (keep it referenced) and a frame over it
+    name, rows, columns, is_datetime = spec
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((rows, len(columns) + 1), dtype=np.float64, buffer=shm.buf)
+    index = block[:, len(columns)].view(np.int64)
+    index = pd.DatetimeIndex(index.astype('datetime64[ns]')) if is_datetime else pd.Index(index)
+    return shm, pd.DataFrame(block[:, :len(columns)], index=index, columns=columns, copy=False)
@@ -0,0 +1,21 @@
+_UNIT_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+    'M': 30 * 24 * 60 * 60 * 1000,
+}
+
+def timeframe_to_ms(timeframe):
+    # Hyperliquid intervals look like '1m', '15m', '4h', '1d', '1w', '1M'
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in _UNIT_MS or not amount.isdigit():
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(amount) * _UNIT_MS[unit]
+
+def ms_to_timeframe(interval_ms):
+    # Inverse of timeframe_to_ms, in the largest unit that divides the interval
+    for unit in ('w', 'd', 'h', 'm'):
+        if interval_ms % _UNIT_MS[unit] == 0:
+            return f"{interval_ms // _UNIT_MS[unit]}{unit}"
+    raise ValueError(f"Interval of {interval_ms} ms is not a whole number of minutes")
@@ -0,0 +1,339 @@
+import numpy as np
+import pandas as pd
+
+# Array-based alternative to backtesting.Backtest for strategies that expose
+# vectorized_signals(). Positions are exclusive (one trade at a time), market
+# orders fill on the next bar's open, commission is applied to the fill price
+# the way backtesting.py does, and the ATR stop is a stop order checked from
+# the fill bar on (backtesting.py processes it right after the entry fills).
+# Orders are sized in whole units, equity * risk_per_trade / stop_distance
+# rounded down, as the strategies place them (backtesting.py accepts no other
+# sizes above one); a signal whose stop is too wide for one unit is skipped.
+
+TRADE_COLUMNS = ['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice', 'PnL', 'ReturnPct']
+
+def _next_true(mask):
+    # next_true[i] is the first j >= i where mask[j] is set, len(mask) if none;
+    # a (bars, params) mask is searched down every column
+    n = len(mask)
+    indices = np.where(mask, np.arange(n).reshape((n,) + (1,) * (np.ndim(mask) - 1)), n)
+    return np.minimum.accumulate(indices[::-1], axis=0)[::-1]
+
+def simulate(open_, high, low, close, signals, cash=10000, commission=0.002):
+    n = len(close)
+    long_entry = np.asarray(signals['long_entry'], dtype=bool)
+    short_entry = np.asarray(signals['short_entry'], dtype=bool)
+    stop_distance = np.asarray(signals['stop_distance'], dtype=float)
+    risk_per_trade = signals['risk_per_trade']
+    start = signals.get('start', 1)
+
+    entries = long_entry | short_entry
+    entries[:start] = False
+    entries[n - 1:] = False  # an order on the last bar never fills
+    next_entry = _next_true(entries)
+    next_exit = {1: _next_true(signals['long_exit']), -1: _next_true(signals['short_exit'])}
+
+    equity = np.empty(n)
+    trades = []
+    filled = 0  # equity[:filled] is already written
+    cash = float(cash)
+
+    i = next_entry[start] if start < n else n
+    while i < n:
+        direction = 1 if long_entry[i] else -1
+        stop = stop_distance[i]
+        if not np.isfinite(stop) or stop <= 0:
+            i = next_entry[i + 1]
+            continue
+
+        fill = i + 1
+        entry_price = open_[fill] * (1 + direction * commission)
+        units = int(cash * risk_per_trade / stop)
+        if units < 1 or units * entry_price > cash:
+            # The broker cancels orders it cannot margin
+            i = next_entry[i + 1]
+            continue
+        stop_price = close[i] - direction * stop
+
+        # A signal exit on bar j fills at the next open, before the stop is checked
+        j = next_exit[direction][fill]
+        exit_bar = min(j + 1, n)
+        window = slice(fill, exit_bar)
+        hit = (low[window] <= stop_price) if direction == 1 else (high[window] >= stop_price)
+        if hit.any():
+            exit_bar = fill + int(hit.argmax())
+            exit_price = min(open_[exit_bar], stop_price) if direction == 1 else max(open_[exit_bar], stop_price)
+            close_bar = exit_bar
+        elif exit_bar < n:
+            exit_price = open_[exit_bar]
+            close_bar = exit_bar
+        else:
+            # Still open at the end of the data, closed on the last bar's open like backtesting.py
+            exit_bar = n - 1
+            exit_price = open_[-1]
+            close_bar = n - 1
+
+        exit_price *= 1 - direction * commission
+        pnl = direction * units * (exit_price - entry_price)
+
+        equity[filled:fill] = cash
+        equity[fill:close_bar] = cash + direction * units * (close[fill:close_bar] - entry_price)
+        cash += pnl
+        filled = close_bar
+        trades.append((direction * units, fill, exit_bar, entry_price, exit_price, pnl,
+                       direction * (exit_price / entry_price - 1)))
+
+        i = next_entry[close_bar] if close_bar < n else n
+
+    equity[filled:] = cash
+    return equity, pd.DataFrame(trades, columns=TRADE_COLUMNS)
+
+def _geometric_mean(returns):
+    returns = np.asarray(returns, dtype=float)
+    returns = np.nan_to_num(returns) + 1
+    if np.any(returns <= 0):
+        return 0
+    return np.exp(np.log(returns).sum() / (len(returns) or np.nan)) - 1
+
+def _drawdown_duration_peaks(dd):
+    iloc = np.unique(np.r_[(dd == 0).values.nonzero()[0], len(dd) - 1])
+    iloc = pd.Series(iloc, index=dd.index[iloc])
+    df = iloc.to_frame('iloc').assign(prev=iloc.shift())
+    df = df[df['iloc'] > df['prev'] + 1].astype(int)
+    if not len(df):
+        return (dd.replace(0, np.nan),) * 2
+    df['duration'] = df['iloc'].map(dd.index.__getitem__) - df['prev'].map(dd.index.__getitem__)
+    df['peak_dd'] = df.apply(lambda row: dd.iloc[row['prev']:row['iloc'] + 1].max(), axis=1)
+    df = df.reindex(dd.index)
+    return df['duration'], df['peak_dd']
+
+def compute_stats(index, close, equity, trades, strategy=None):
+    # Mirrors the statistics of backtesting.py so both engines are interchangeable
+    dd = 1 - equity / np.maximum.accumulate(equity)
+    dd_dur, dd_peaks = _drawdown_duration_peaks(pd.Series(dd, index=index))
+    equity_df = pd.DataFrame({'Equity': equity, 'DrawdownPct': dd, 'DrawdownDuration': dd_dur}, index=index)
+
+    trades_df = trades.copy()
+    if isinstance(index, pd.DatetimeIndex):
+        trades_df['EntryTime'] = index[trades_df['EntryBar'].to_numpy(dtype=int)]
+        trades_df['ExitTime'] = index[trades_df['ExitBar'].to_numpy(dtype=int)]
+    pl = trades_df['PnL']
+    returns = trades_df['ReturnPct']
+
+    have_position = np.zeros(len(index))
+    for entry_bar, exit_bar in zip(trades_df['EntryBar'], trades_df['ExitBar']):
+        have_position[entry_bar:exit_bar + 1] = 1
+
+    s = pd.Series(dtype=object)
+    s.loc['Start'] = index[0]
+    s.loc['End'] = index[-1]
+    s.loc['Duration'] = s.End - s.Start
+    s.loc['Exposure Time [%]'] = have_position.mean() * 100
+    s.loc['Equity Final [$]'] = equity[-1]
+    s.loc['Equity Peak [$]'] = equity.max()
+    s.loc['Return [%]'] = (equity[-1] - equity[0]) / equity[0] * 100
+    s.loc['Buy & Hold Return [%]'] = (close[-1] - close[0]) / close[0] * 100
+
+    gmean_day_return = 0
+    day_returns = np.array(np.nan)
+    annual_trading_days = np.nan
+    if isinstance(index, pd.DatetimeIndex):
+        day_returns = equity_df['Equity'].resample('D').last().dropna().pct_change()
+        gmean_day_return = _geometric_mean(day_returns)
+        annual_trading_days = float(365 if index.dayofweek.to_series().between(5, 6).mean() > 2 / 7 * .6 else 252)
+    annualized_return = (1 + gmean_day_return) ** annual_trading_days - 1
+    s.loc['Return (Ann.) [%]'] = annualized_return * 100
+    s.loc['Volatility (Ann.) [%]'] = np.sqrt(
+        (np.nanvar(day_returns, ddof=int(bool(np.shape(day_returns)))) + (1 + gmean_day_return) ** 2) ** annual_trading_days
+        - (1 + gmean_day_return) ** (2 * annual_trading_days)) * 100
+    s.loc['Sharpe Ratio'] = s.loc['Return (Ann.) [%]'] / (s.loc['Volatility (Ann.) [%]'] or np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s.loc['Sortino Ratio'] = annualized_return / (
+            np.sqrt(np.nanmean(np.clip(day_returns, -np.inf, 0) ** 2)) * np.sqrt(annual_trading_days))
+    max_dd = -np.nan_to_num(dd.max())
+    s.loc['Calmar Ratio'] = annualized_return / (-max_dd or np.nan)
+    s.loc['Max. Drawdown [%]'] = max_dd * 100
+    s.loc['Avg. Drawdown [%]'] = -dd_peaks.mean() * 100
+    s.loc['Max. Drawdown Duration'] = dd_dur.max()
+    s.loc['Avg. Drawdown Duration'] = dd_dur.mean()
+
+    n_trades = len(trades_df)
+    s.loc['# Trades'] = n_trades
+    s.loc['Win Rate [%]'] = np.nan if not n_trades else (pl > 0).mean() * 100
+    s.loc['Best Trade [%]'] = returns.max() * 100
+    s.loc['Worst Trade [%]'] = returns.min() * 100
+    s.loc['Avg. Trade [%]'] = _geometric_mean(returns) * 100
+    s.loc['Profit Factor'] = returns[returns > 0].sum() / (abs(returns[returns < 0].sum()) or np.nan)
+    s.loc['Expectancy [%]'] = returns.mean() * 100
+    s.loc['SQN'] = np.sqrt(n_trades) * pl.mean() / (pl.std() or np.nan)
+    s.loc['_strategy'] = strategy
+    s.loc['_equity_curve'] = equity_df
+    s.loc['_trades'] = trades_df
+    return s
+
+def run_vectorized(data, strategy, params=None, cash=10000, commission=0.002):
+    params = params or {}
+    signals = strategy.vectorized_signals(data, **params)
+    open_, high, low, close = (data[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close'))
+    equity, trades = simulate(open_, high, low, close, signals, cash=cash, commission=commission)
+    label = f"{strategy.__name__}({','.join(f'{k}={v}' for k, v in params.items())})"
+    return compute_stats(data.index, close, equity, trades, strategy=label)
+
+def _first_stop_hit(low, high, start, end, direction, stop_price, window=16):
+    # First bar in [start, end) where each column's stop is touched, -1 if none.
+    # Windows are scanned in doubling chunks, so a column costs about twice its
+    # trade's length however long the other columns' trades are.
+    hit_bar = np.full(len(start), -1)
+    pending = np.flatnonzero(start < end)
+    start = start.copy()
+    while len(pending):
+        bars = start[pending, None] + np.arange(window)
+        inside = bars < end[pending, None]
+        bars = np.minimum(bars, len(low) - 1)
+        long = direction[pending, None] == 1
+        level = stop_price[pending, None]
+        hit = inside & np.where(long, low[bars] <= level, high[bars] >= level)
+        found = hit.any(axis=1)
+        hit_bar[pending[found]] = bars[found, hit[found].argmax(axis=1)]
+        start[pending] += window
+        pending = pending[~found & (start[pending] < end[pending])]
+        window *= 2
+    return hit_bar
+
+def simulate_batch(open_, high, low, close, signals, cash=10000, commission=0.002):
+    # signals hold (bars, params) masks, every column is simulated independently
+    # with the rules of simulate(). The columns advance in lockstep one trade at
+    # a time: each round resolves the next entry signal of every column that
+    # still has one, with array operations across the columns. Returns the
+    # (bars, params) equity and one table of all trades, 'Column' telling
+    # which parameter set made each, ordered by column and entry.
+    n = len(close)
+    n_params = np.shape(signals['long_entry'])[1]
+    shape = (n, n_params)
+    long_entry = np.broadcast_to(np.asarray(signals['long_entry'], dtype=bool), shape)
+    stop_distance = np.broadcast_to(np.asarray(signals['stop_distance'], dtype=float), shape)
+    risk_per_trade = np.broadcast_to(np.asarray(signals['risk_per_trade'], dtype=float), (n_params,))
+    start = np.broadcast_to(signals.get('start', 1), (n_params,)).astype(int)
+
+    entries = long_entry | np.broadcast_to(np.asarray(signals['short_entry'], dtype=bool), shape)
+    entries[np.arange(n)[:, None] < start] = False
+    entries[n - 1:] = False  # an order on the last bar never fills
+    # One padding row, so next_entry[n] is n
+    next_entry = np.vstack([_next_true(entries), np.full((1, n_params), n)])
+    next_exit = {direction: np.broadcast_to(_next_true(np.broadcast_to(np.asarray(signals[name], dtype=bool), shape)),
+                                            shape)
+                 for direction, name in ((1, 'long_exit'), (-1, 'short_exit'))}
+
+    balance = np.full(n_params, float(cash))
+    signal_bar = np.where(start < n, next_entry[np.minimum(start, n), np.arange(n_params)], n)
+    rounds = []
+    while True:
+        columns = np.flatnonzero(signal_bar < n)
+        if not len(columns):
+            break
+        i = signal_bar[columns]
+        direction = np.where(long_entry[i, columns], 1, -1)
+        stop = stop_distance[i, columns]
+        fill = i + 1
+        entry_price = open_[fill] * (1 + direction * commission)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            units = np.floor(balance[columns] * risk_per_trade[columns] / stop)
+        # Invalid stops, orders under one unit and ones the broker cannot margin are skipped
+        valid = np.isfinite(stop) & (stop > 0) & np.isfinite(units) & (units >= 1)
+        valid &= units * entry_price <= balance[columns]
+        signal_bar[columns[~valid]] = next_entry[i[~valid] + 1, columns[~valid]]
+        columns, i, direction, stop, fill, entry_price, units = (
+            x[valid] for x in (columns, i, direction, stop, fill, entry_price, units))
+        if not len(columns):
+            continue
+        stop_price = close[i] - direction * stop
+
+        # A signal exit on bar j fills at the next open, before the stop is checked
+        j = np.where(direction == 1, next_exit[1][fill, columns], next_exit[-1][fill, columns])
+        exit_bar = np.minimum(j + 1, n)
+        hit_bar = _first_stop_hit(low, high, fill, exit_bar, direction, stop_price)
+        hit = hit_bar >= 0
+        at_open = open_[np.minimum(exit_bar, n - 1)]
+        exit_price = np.where(exit_bar < n, at_open, open_[-1])
+        stopped_at = open_[hit_bar[hit]]
+        exit_price[hit] = np.where(direction[hit] == 1, np.minimum(stopped_at, stop_price[hit]),
+                                   np.maximum(stopped_at, stop_price[hit]))
+        # Still open at the end of the data, closed on the last bar's open like backtesting.py
+        exit_bar = np.where(hit, hit_bar, np.minimum(exit_bar, n - 1))
+
+        exit_price = exit_price * (1 - direction * commission)
+        pnl = direction * units * (exit_price - entry_price)
+        balance[columns] += pnl
+        rounds.append((columns, direction * units, fill, exit_bar, entry_price, exit_price, pnl,
+                       direction * (exit_price / entry_price - 1)))
+        signal_bar[columns] = next_entry[exit_bar, columns]
+
+    # Equity from per-bar changes: the balance moves on each exit bar, and
+    # while a trade is open its signed size and entry price mark it to market
+    balance_change = np.zeros((n, n_params))
+    held = np.zeros((n + 1, n_params))
+    entry = np.zeros((n + 1, n_params))
+    balance_change[0] = cash
+    for columns, signed_units, fill, exit_bar, entry_price, exit_price, pnl, _ in rounds:
+        balance_change[exit_bar, columns] += pnl
+        held[fill, columns] += signed_units
+        held[exit_bar, columns] -= signed_units
+        entry[fill, columns] += entry_price
+        entry[exit_bar, columns] -= entry_price
+    held = np.cumsum(held[:n], axis=0)
+    entry = np.cumsum(entry[:n], axis=0)
+    # Flat bars add an exact zero
+    equity = np.cumsum(balance_change, axis=0) + held * (close[:, None] - entry)
+
+    fields = [np.concatenate(field) for field in zip(*rounds)] if rounds else [np.empty(0)] * (len(TRADE_COLUMNS) + 1)
+    trades = pd.DataFrame(dict(zip(['Column'] + TRADE_COLUMNS, fields)))
+    trades = trades.astype({'Column': int, 'Size': int, 'EntryBar': int, 'ExitBar': int})
+    return equity, trades.sort_values(['Column', 'EntryBar'], ignore_index=True)
+
+def batch_summary(index, equity, trades):
+    # Headline statistics for every column of an equity matrix in one pass,
+    # using the same daily-resampled definitions as compute_stats
+    n_columns = equity.shape[1]
+    column = trades['Column'].to_numpy()
+    pnl, returns = trades['PnL'].to_numpy(), trades['ReturnPct'].to_numpy()
+    n_trades = np.bincount(column, minlength=n_columns)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        win_rate = np.bincount(column, pnl > 0, minlength=n_columns) / np.where(n_trades, n_trades, np.nan) * 100
+        gains = np.bincount(column, np.where(returns > 0, returns, 0), minlength=n_columns)
+        losses = -np.bincount(column, np.where(returns < 0, returns, 0), minlength=n_columns)
+        profit_factor = gains / np.where(losses > 0, losses, np.nan)
+        max_dd = (1 - equity / np.maximum.accumulate(equity, axis=0)).max(axis=0)
+
+        annual_return = volatility = downside = np.full(equity.shape[1], np.nan)
+        if isinstance(index, pd.DatetimeIndex) and len(index) > 1:
+            days = index.normalize()
+            day_end = np.flatnonzero(np.r_[days[1:] != days[:-1], True])
+            day_equity = equity[day_end]
+            day_returns = day_equity[1:] / day_equity[:-1] - 1
+            # Like pandas pct_change, the first day counts as a zero return in the mean
+            growth = np.log1p(np.where(day_returns > -1, day_returns, np.nan)).sum(axis=0) / len(day_end)
+            gmean = np.where(np.all(day_returns > -1, axis=0), np.expm1(growth), 0)
+            annual_days = 365.0 if index.dayofweek.to_series().between(5, 6).mean() > 2 / 7 * .6 else 252.0
+            annual_return = (1 + gmean) ** annual_days - 1
+            variance = day_returns.var(axis=0, ddof=1) if len(day_returns) > 1 else np.full(len(gmean), np.nan)
+            volatility = np.sqrt((variance + (1 + gmean) ** 2) ** annual_days - (1 + gmean) ** (2 * annual_days))
+            downside = np.sqrt(np.mean(np.clip(day_returns, -np.inf, 0) ** 2, axis=0)) * np.sqrt(annual_days)
+
+        return pd.DataFrame({
+            'Return [%]': (equity[-1] / equity[0] - 1) * 100,
+            'Equity Final [$]': equity[-1],
+            'Return (Ann.) [%]': annual_return * 100,
+            'Volatility (Ann.) [%]': volatility * 100,
+            'Sharpe Ratio': annual_return / np.where(volatility > 0, volatility, np.nan),
+            'Sortino Ratio': annual_return / np.where(downside > 0, downside, np.nan),
+            'Max. Drawdown [%]': -max_dd * 100,
+            '# Trades': n_trades,
+            'Win Rate [%]': win_rate,
+            'Profit Factor': profit_factor,
+        })
+
+def run_vectorized_batch(data, strategy, param_sets, cash=10000, commission=0.002):
+    signals = strategy.vectorized_signals_batch(data, param_sets)
+    open_, high, low, close = (data[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close'))
+    equity, trades = simulate_batch(open_, high, low, close, signals, cash=cash, commission=commission)
+    return batch_summary(data.index, equity, trades)
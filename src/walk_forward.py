@@ -0,0 +1,137 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.genetic_optimizer import GeneticOptimizer
+from src.indicators.cache import set_history
+from src.utils.performance_metrics import batch_performance_metrics, infer_periods_per_year
+from src.utils.shared_frame import SharedFrame, attach_frame
+
+# Walk-forward optimization: the GA runs on each train window and the best
+# parameters are scored on the bars that follow it. Features are computed once
+# on the full history by the caller and every fold works on slices of that
+# frame, so overlapping folds never recompute them. The full frame is also
+# registered with set_history(), so strategies that compute indicators in
+# init (AdvancedBreakoutStrategy) compute each one once per worker on the full
+# history and slice it per fold.
+
+def walk_forward_windows(n, train_size, test_size, step=None, anchored=False):
+    # (train_start, train_end, test_start, test_end) bar positions, end exclusive.
+    # Rolling windows keep the train size fixed, anchored ones grow from bar 0.
+    step = step or test_size
+    windows = []
+    train_start, train_end = 0, train_size
+    while train_end + test_size <= n:
+        windows.append((train_start, train_end, train_end, train_end + test_size))
+        train_end += step
+        if not anchored:
+            train_start += step
+    return windows
+
+def _equity(results):
+    curve = results['_equity_curve']
+    return curve['Equity'] if isinstance(curve, pd.DataFrame) else curve
+
+# Worker process state for fold runs, set once per worker
+_worker = {}
+
+def _set_fold_state(data, strategy, backtester_cls, cash, commission, engine, warmup, optimizer_options):
+    _worker.update(data=data, strategy=strategy, backtester_cls=backtester_cls, cash=cash, commission=commission,
+                   engine=engine, warmup=warmup, optimizer_options=optimizer_options)
+    set_history(data)
+
+def _init_fold_worker(frame_spec, *state):
+    shm, data = attach_frame(frame_spec)
+    _worker['shm'] = shm
+    _set_fold_state(data, *state)
+
+def _run_fold(window, param_ranges, population_size, generations, seed):
+    w = _worker
+    train_start, train_end, test_start, test_end = window
+    train = w['data'].iloc[train_start:train_end]
+
+    backtester = w['backtester_cls'](train, w['strategy'], cash=w['cash'], commission=w['commission'], engine=w['engine'])
+    optimizer = GeneticOptimizer(w['strategy'], backtester, **w['optimizer_options'])
+    params = optimizer.optimize(train, param_ranges, population_size=population_size,
+                                generations=generations, seed=seed, verbose=False)
+    train_results = backtester.run(**params)
+
+    # The test run starts `warmup` bars early so indicators are settled at
+    # test_start; only the equity from the bar before test_start on is kept,
+    # that bar being the base the test returns are measured from
+    backtester.data = w['data'].iloc[max(0, test_start - w['warmup']):test_end]
+    test_results = backtester.run(**params)
+    test_equity = _equity(test_results).iloc[-(test_end - test_start + 1):]
+    return params, train_results['Return [%]'], test_equity
+
+class WalkForward:
+    def __init__(self, strategy, backtester_cls, cash=10000, commission=0.002, engine='backtesting',
+                 train_size=5000, test_size=1000, step=None, anchored=False, warmup=200, workers=1,
+                 optimizer_options=None):
+        self.strategy = strategy
+        self.backtester_cls = backtester_cls
+        self.cash = cash
+        self.commission = commission
+        self.engine = engine
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step
+        self.anchored = anchored
+        self.warmup = warmup
+        self.workers = workers
+        # Passed to each fold's GeneticOptimizer; folds run their GA serially
+        self.optimizer_options = optimizer_options or {}
+
+    def run(self, data, param_ranges, population_size=50, generations=10, seed=None):
+        # Returns a dict with the per-fold table, the stitched out-of-sample
+        # equity curve and its performance metrics
+        windows = walk_forward_windows(len(data), self.train_size, self.test_size, self.step, self.anchored)
+        if not windows:
+            raise ValueError(f"{len(data)} bars are too few for train_size={self.train_size}, test_size={self.test_size}")
+        # Independent, reproducible GA seeds per fold regardless of scheduling
+        seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(windows))]
+        args = [(window, param_ranges, population_size, generations, fold_seed)
+                for window, fold_seed in zip(windows, seeds)]
+        state = (self.strategy, self.backtester_cls, self.cash, self.commission, self.engine,
+                 self.warmup, self.optimizer_options)
+
+        if self.workers > 1:
+            shared = SharedFrame(data)
+            try:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(windows)), initializer=_init_fold_worker,
+                                         initargs=(shared.spec,) + state) as pool:
+                    folds = list(pool.map(_run_fold, *zip(*args)))
+            finally:
+                shared.close()
+        else:
+            _set_fold_state(data, *state)
+            try:
+                folds = [_run_fold(*fold_args) for fold_args in args]
+            finally:
+                _worker.clear()
+                set_history(None)
+
+        return self._summarize(data, windows, folds)
+
+    def _summarize(self, data, windows, folds):
+        rows, pieces = [], []
+        value = self.cash
+        for number, (window, (params, train_return, test_equity)) in enumerate(zip(windows, folds)):
+            # Chain each test fold onto the ending value of the previous one
+            train_start, train_end, test_start, test_end = window
+            growth = (test_equity / test_equity.iloc[0]).iloc[-(test_end - test_start):]
+            pieces.append(growth * value)
+            value = pieces[-1].iloc[-1]
+            rows.append({
+                'fold': number,
+                'train_start': data.index[train_start],
+                'train_end': data.index[train_end - 1],
+                'test_start': data.index[test_start],
+                'test_end': data.index[test_end - 1],
+                'train_return': train_return,
+                'test_return': (growth.iloc[-1] - 1) * 100,
+                **params,
+            })
+
+        equity = pd.concat(pieces)
+        metrics = batch_performance_metrics(equity.to_numpy()[None, :], infer_periods_per_year(equity.index)).iloc[0]
+        return {'folds': pd.DataFrame(rows), 'equity': equity, 'metrics': metrics.rename(None)}
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# The per-bar implementations that calculate_zigzag and
+# identify_support_resistance replaced, kept as the reference the vectorized
+# versions are tested and benchmarked against. Only the indexing changed:
+# positions are read from arrays, which is what `low[i]` did on the pandas the
+# originals were written for.
+
+def support_resistance(high, low, close, window=14):
+    high, low = pd.Series(high), pd.Series(low)
+    pivot_high = high.rolling(window=window, center=True).max()
+    pivot_low = low.rolling(window=window, center=True).min()
+
+    support = pivot_low.where((pivot_low.shift(1) > pivot_low) & (pivot_low.shift(-1) > pivot_low))
+    resistance = pivot_high.where((pivot_high.shift(1) < pivot_high) & (pivot_high.shift(-1) < pivot_high))
+
+    return support, resistance
+
+def zigzag(high, low, deviation=5):
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    zigzag = np.full(len(high), np.nan)
+    deviation /= 100
+
+    last_high, last_low = high[0], low[0]
+    last_high_index, last_low_index = 0, 0
+    trend = None
+
+    for i in range(1, len(high)):
+        if trend is None or trend == 1:
+            if low[i] < last_low * (1 - deviation):
+                if trend == 1:
+                    zigzag[last_high_index] = last_high
+                trend = -1
+                last_low = low[i]
+                last_low_index = i
+            elif high[i] > last_high:
+                last_high = high[i]
+                last_high_index = i
+        else:
+            if high[i] > last_high * (1 + deviation):
+                zigzag[last_low_index] = last_low
+                trend = 1
+                last_high = high[i]
+                last_high_index = i
+            elif low[i] < last_low:
+                last_low = low[i]
+                last_low_index = i
+
+    if trend == 1:
+        zigzag[last_high_index] = last_high
+    elif trend == -1:
+        zigzag[last_low_index] = last_low
+
+    return zigzag
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from aiohttp import web
+
+# Local stand-ins for the Hyperliquid endpoints, served on an ephemeral port
+
+def make_candle(t, interval_ms, symbol='ETH', timeframe='1h'):
+    # Deterministic prices, so two fetches of the same bar always agree
+    price = 100 + (t // interval_ms) % 50
+    return {'t': t, 'T': t + interval_ms - 1, 's': symbol, 'i': timeframe, 'o': str(price), 'c': str(price + 1),
+            'h': str(price + 2), 'l': str(price - 1), 'v': str(10 + (t // interval_ms) % 7), 'n': 5}
+
+class CandleServer:
+    # candleSnapshot over HTTP. Every window fails with HTTP 500 on its first
+    # `fail_first` requests, answers take `latency` seconds, and bars whose open
+    # time is in `missing` or after `until` are left out. Records what the
+    # client did.
+    def __init__(self, interval_ms=3600000, fail_first=0, latency=0.0, missing=(), until=None):
+        self.interval_ms = interval_ms
+        self.fail_first = fail_first
+        self.latency = latency
+        self.missing = set(missing)
+        self.until = until
+        self.attempts = Counter()
+        self.request_times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runner = None
+        self.url = None
+        self.ws_url = None
+
+    async def handle(self, request):
+        payload = await request.json()
+        req = payload['req']
+        window = (req['startTime'], req['endTime'])
+        self.request_times.append(time.monotonic())
+        self.attempts[window] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.attempts[window] <= self.fail_first:
+                return web.Response(status=500, text='try again')
+            first = -(-window[0] // self.interval_ms) * self.interval_ms
+            last = window[1] if self.until is None else min(window[1], self.until)
+            candles = [make_candle(t, self.interval_ms, req['coin'], req['interval'])
+                       for t in range(first, last + 1, self.interval_ms) if t not in self.missing]
+            return web.json_response(candles)
+        finally:
+            self.in_flight -= 1
+
+    def add_routes(self, app):
+        app.router.add_post('/info', self.handle)
+
+    async def __aenter__(self):
+        app = web.Application()
+        self.add_routes(app)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/info'
+        self.ws_url = f'ws://127.0.0.1:{port}/ws'
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.runner.cleanup()
+
+class FeedServer(CandleServer):
+    # CandleServer plus the candle WebSocket. Records every connection and
+    # subscription; the test pushes candle updates with send() and drops the
+    # connections with disconnect().
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.sockets = []
+        self.connections = 0
+        self.subscriptions = []
+
+    def add_routes(self, app):
+        super().add_routes(app)
+        app.router.add_get('/ws', self.handle_socket)
+
+    async def handle_socket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.sockets.append(ws)
+        try:
+            async for msg in ws:
+                message = json.loads(msg.data)
+                if message.get('method') == 'subscribe':
+                    self.subscriptions.append(message['subscription'])
+        finally:
+            self.sockets.remove(ws)
+        return ws
+
+    async def send(self, *candles):
+        for ws in list(self.sockets):
+            await ws.send_json({'channel': 'candle', 'data': list(candles)})
+
+    async def disconnect(self):
+        for ws in list(self.sockets):
+            await ws.close()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from backtesting import Strategy
+
+# Small strategies for the optimizer and engine tests. They depend on numpy
+# only, not on the indicator libraries the real strategies use.
+
+def make_ohlcv(n=2000, seed=0, freq='h'):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.002, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, n)))
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                         'volume': rng.lognormal(0, 0.6, n)},
+                        index=pd.date_range('2024-01-01', periods=n, freq=freq))
+
+def _sma(x, n):
+    x = np.asarray(x, dtype=float)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        sums = np.cumsum(np.r_[0.0, x])
+        out[n - 1:] = (sums[n:] - sums[:-n]) / n
+    return out
+
+def _crosses(fast, slow):
+    prev_fast, prev_slow = np.r_[np.nan, fast[:-1]], np.r_[np.nan, slow[:-1]]
+    with np.errstate(invalid='ignore'):
+        return (fast > slow) & (prev_fast <= prev_slow), (fast < slow) & (prev_fast >= prev_slow)
+
+class SmaCross(Strategy):
+    # Long on a fast/slow SMA cross up, short on a cross down, each one closing
+    # the other side; the stop sits `stop_multiplier` average bar ranges away.
+    # Risking half a percent keeps positions well within the cash, so no order
+    # depends on how the broker checks margin.
+    n_fast = 10
+    n_slow = 30
+    stop_multiplier = 3
+    risk_per_trade = 0.005
+    PARAMS = ('n_fast', 'n_slow', 'stop_multiplier')
+
+    def init(self):
+        close = self.data.close
+        self.fast = self.I(_sma, close, self.n_fast)
+        self.slow = self.I(_sma, close, self.n_slow)
+        self.bar_range = self.I(_sma, self.data.high - self.data.low, 14)
+
+    def next(self):
+        cross_up = self.fast[-1] > self.slow[-1] and self.fast[-2] <= self.slow[-2]
+        cross_down = self.fast[-1] < self.slow[-1] and self.fast[-2] >= self.slow[-2]
+        stop = self.bar_range[-1] * self.stop_multiplier
+        size = int(self.equity * self.risk_per_trade / stop)
+        if not self.position:
+            if cross_up:
+                self.buy(size=size, sl=self.data.close[-1] - stop)
+            elif cross_down:
+                self.sell(size=size, sl=self.data.close[-1] + stop)
+        elif self.position.is_long and cross_down:
+            self.position.close()
+        elif self.position.is_short and cross_up:
+            self.position.close()
+
+    @classmethod
+    def vectorized_signals(cls, data, **params):
+        p = {name: params.get(name, getattr(cls, name)) for name in cls.PARAMS}
+        close = data['close'].to_numpy(dtype=float)
+        fast, slow = _sma(close, p['n_fast']), _sma(close, p['n_slow'])
+        bar_range = _sma(data['high'].to_numpy(dtype=float) - data['low'].to_numpy(dtype=float), 14)
+        cross_up, cross_down = _crosses(fast, slow)
+        return {
+            'long_entry': cross_up, 'short_entry': cross_down,
+            'long_exit': cross_down, 'short_exit': cross_up,
+            'stop_distance': bar_range * p['stop_multiplier'],
+            'risk_per_trade': cls.risk_per_trade,
+            # backtesting.py calls next() once every indicator has a value
+            'start': max(p['n_fast'], p['n_slow'], 14),
+        }
+
+    @classmethod
+    def vectorized_signals_batch(cls, data, param_sets):
+        columns = [cls.vectorized_signals(data, **params) for params in param_sets]
+        signals = {name: np.column_stack([column[name] for column in columns])
+                   for name in ('long_entry', 'short_entry', 'long_exit', 'short_exit', 'stop_distance')}
+        signals['risk_per_trade'] = cls.risk_per_trade
+        signals['start'] = np.array([column['start'] for column in columns])
+        return signals
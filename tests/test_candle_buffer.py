@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from src.candle_buffer import CandleBuffer, decode_candles
+from tests.servers import make_candle
+
+MINUTE = 60000
+
+def buffer_of(timestamps, dtype=np.float64, capacity=4):
+    buffer = CandleBuffer(capacity=capacity, dtype=dtype)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.repeat(np.arange(len(timestamps), dtype=float)[:, None], 5, axis=1)
+    buffer.append(timestamps, values)
+    return buffer
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_decode_parses_the_price_strings(dtype):
+    data = [make_candle(t * MINUTE, MINUTE, timeframe='1m') for t in range(5)]
+    data[2] = dict(data[2], o='0.1', v='123456.789')
+    timestamps, values = decode_candles(data, dtype)
+
+    assert timestamps.dtype == np.int64 and values.dtype == dtype and values.shape == (5, 5)
+    np.testing.assert_array_equal(timestamps, np.arange(5) * MINUTE)
+    expected = np.array([[candle[key] for key in 'ohlcv'] for candle in data], dtype=float)
+    # Parsed straight into float32, not rounded twice through float64
+    np.testing.assert_array_equal(values, np.array([[dtype(candle[key]) for key in 'ohlcv'] for candle in data]))
+    np.testing.assert_allclose(values, expected, rtol=np.finfo(dtype).eps)
+
+    empty_timestamps, empty = decode_candles([], dtype)
+    assert empty_timestamps.shape == (0,) and empty.shape == (0, 5)
+
+def test_appends_grow_the_storage_and_keep_the_rows():
+    buffer = buffer_of(np.arange(3) * MINUTE, capacity=2)
+    assert len(buffer.timestamps) == 4
+    buffer.append(np.arange(3, 10) * MINUTE, np.full((7, 5), 7.0))
+    assert len(buffer) == 10 and len(buffer.timestamps) == 10
+    np.testing.assert_array_equal(buffer.timestamps[:10], np.arange(10) * MINUTE)
+    np.testing.assert_array_equal(buffer.values[:3, 0], [0, 1, 2])
+
+    # Truncating keeps the storage for the next append
+    buffer.truncate(5)
+    buffer.append([5 * MINUTE], [[9.0] * 5])
+    assert len(buffer) == 6 and len(buffer.timestamps) == 10
+    assert buffer.to_frame()['close'].iloc[-1] == 9.0
+
+@pytest.mark.parametrize('keep, closes', [('last', [0, 3, 2, 4]), ('first', [0, 1, 2, 4])])
+def test_normalize_sorts_and_drops_duplicated_timestamps(keep, closes):
+    buffer = buffer_of(np.array([0, 1, 2, 1, 3]) * MINUTE)
+    assert buffer.normalize(keep=keep) == 1
+    np.testing.assert_array_equal(buffer.timestamps[:len(buffer)], np.arange(4) * MINUTE)
+    np.testing.assert_array_equal(buffer.to_frame()['close'], closes)
+    assert buffer.normalize() == 0
+
+def test_gaps_are_pairs_around_missing_candles():
+    buffer = buffer_of(np.array([0, 1, 4, 5, 7]) * MINUTE, capacity=8)
+    assert buffer.gaps(MINUTE) == [(1 * MINUTE, 4 * MINUTE), (5 * MINUTE, 7 * MINUTE)]
+
+def test_float32_frames_wrap_the_buffer():
+    buffer = buffer_of(np.arange(3) * MINUTE, dtype=np.float32)
+    frame = buffer.to_frame()
+    assert (frame.dtypes == np.float32).all()
+    assert np.shares_memory(frame.to_numpy(), buffer.values)
+    assert str(frame.index[1]) == '1970-01-01 00:01:00'
@@ -0,0 +1,36 @@
+import numpy as np
+from src.candle_store import CANDLE_DTYPE, CandleStore
+
+def make_records(start, count, step=60000):
+    records = np.zeros(count, dtype=CANDLE_DTYPE)
+    records['timestamp'] = start + np.arange(count) * step
+    records['close'] = np.arange(count) + 100.0
+    return records
+
+def test_top_up_replaces_the_overlap_and_appends(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write('ETH', '1m', make_records(0, 10))
+    # The last stored candle was still forming, the top-up starts from it
+    store.write('ETH', '1m', make_records(9 * 60000, 5))
+
+    stored = store.load('ETH', '1m')
+    np.testing.assert_array_equal(stored['timestamp'], np.arange(14) * 60000)
+    assert stored['close'][9] == 100.0 and stored['close'][-1] == 104.0
+
+def test_empty_top_up_keeps_the_stored_candles(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write('ETH', '1m', make_records(0, 10))
+    store.write('ETH', '1m', make_records(0, 0))
+    assert len(store.load('ETH', '1m')) == 10
+    assert store.last_timestamp('ETH', '1m') == 9 * 60000
+
+    store.write('ETH', '1m', make_records(0, 0), replace=True)
+    assert len(store.load('ETH', '1m')) == 0
+
+def test_query_returns_the_requested_dtype(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write('ETH', '1m', make_records(0, 10))
+    frame = store.query('ETH', '1m', start=2 * 60000, end=5 * 60000, dtype=np.float32)
+    assert (frame.dtypes == np.float32).all()
+    np.testing.assert_array_equal(frame['close'], [102, 103, 104, 105])
+    assert (store.query('ETH', '1m').dtypes == np.float64).all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.indicators.custom_indicators import calculate_zigzag, identify_support_resistance, rolling_max, rolling_min
+from tests import reference_indicators as reference
+from tests.strategies import make_ohlcv
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rolling_extremes_match_pandas(seed):
+    x = np.random.default_rng(seed).normal(size=500)
+    x[[40, 41, 300]] = np.nan
+    for window in (1, 2, 7, 14, 500, 501):
+        np.testing.assert_array_equal(rolling_max(x, window), pd.Series(x).rolling(window).max())
+        np.testing.assert_array_equal(rolling_min(x, window), pd.Series(x).rolling(window).min())
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('window', [1, 5, 14])
+def test_support_resistance_match_the_centered_windows(seed, window):
+    data = make_ohlcv(3000, seed)
+    support, resistance = identify_support_resistance(data['high'], data['low'], data['close'], window=window)
+    expected_support, expected_resistance = reference.support_resistance(data['high'].to_numpy(),
+                                                                         data['low'].to_numpy(),
+                                                                         data['close'].to_numpy(), window=window)
+    assert support.index.equals(data.index)
+    np.testing.assert_array_equal(support, expected_support)
+    np.testing.assert_array_equal(resistance, expected_resistance)
+    if window == 1:
+        # Wider windows hold each extreme over several bars, so strict pivots of them are rare
+        assert support.notna().sum() > 100 and resistance.notna().sum() > 100
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('deviation', [0.3, 1, 5])
+def test_zigzag_matches_the_bar_loop(seed, deviation):
+    data = make_ohlcv(3000, seed)
+    zigzag = calculate_zigzag(data['high'], data['low'], deviation=deviation)
+    assert zigzag.index.equals(data.index)
+    np.testing.assert_array_equal(zigzag, reference.zigzag(data['high'], data['low'], deviation=deviation))
+
+def test_causal_levels_only_use_past_bars():
+    data = make_ohlcv(1500, 7)
+    full = identify_support_resistance(data['high'], data['low'], data['close'], window=14, causal=True)
+    centered = identify_support_resistance(data['high'], data['low'], data['close'], window=14)
+    for causal, level in zip(full, centered):
+        # Known 7 bars late: 6 bars of the centered window plus the confirming bar
+        np.testing.assert_array_equal(causal.to_numpy()[7:], level.to_numpy()[:-7])
+    for end in (100, 731, 1200):
+        prefix = identify_support_resistance(data['high'][:end], data['low'][:end], data['close'][:end], window=14,
+                                             causal=True)
+        for levels, whole in zip(prefix, full):
+            np.testing.assert_array_equal(levels, whole[:end])
+
+def test_causal_zigzag_only_uses_past_bars():
+    data = make_ohlcv(3000, 8)
+    full = calculate_zigzag(data['high'], data['low'], deviation=1, causal=True)
+    pivots = calculate_zigzag(data['high'], data['low'], deviation=1)
+    # The same swing levels, each on the bar that confirms it, without the open last leg
+    np.testing.assert_array_equal(full.dropna(), pivots.dropna()[:-1])
+    assert np.all(np.flatnonzero(full.notna()) > np.flatnonzero(pivots.notna())[:-1])
+    for end in (500, 1234, 2999):
+        np.testing.assert_array_equal(calculate_zigzag(data['high'][:end], data['low'][:end], deviation=1, causal=True),
+                                      full[:end])
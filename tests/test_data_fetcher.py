@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import pytest
+from src.candle_store import CandleStore
+from src.data_fetcher import DataFetchError, DataFetcher
+from src.utils.metrics import get_metrics
+from tests.servers import CandleServer
+
+HOUR = 3600000
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 1, 8, tzinfo=timezone.utc)
+
+def fetch(server_options, concurrent=True, **fetcher_options):
+    async def run():
+        async with CandleServer(**server_options) as server:
+            fetcher = DataFetcher('ETH', '1h', 7, base_url=server.url, **fetcher_options)
+            df = await fetcher._fetch_range(START, END, concurrent)
+            return server, fetcher, df
+    return asyncio.run(run())
+
+def test_concurrent_fetch_matches_serial_fetch():
+    server, fetcher, df = fetch({'latency': 0.01}, requests_per_second=1000)
+    _, _, serial = fetch({'latency': 0.01}, concurrent=False, requests_per_second=1000)
+
+    assert df.equals(serial)
+    # 7 daily windows of 24 bars, each sharing its last bar with the next window
+    assert len(df) == 7 * 24 + 1
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    assert fetcher.duplicates == 6
+    assert fetcher.gaps == []
+    assert 1 < server.max_in_flight <= fetcher.max_concurrency
+    np.testing.assert_array_equal(df['close'] - df['open'], 1.0)
+
+def test_in_flight_requests_stay_within_max_concurrency():
+    server, fetcher, df = fetch({'latency': 0.05}, requests_per_second=1000, max_concurrency=3)
+    assert server.max_in_flight == 3
+    assert len(df) == 7 * 24 + 1
+
+def test_failed_requests_are_retried_with_backoff():
+    retries = get_metrics().counter('data_fetch_retries').value
+    server, fetcher, df = fetch({'fail_first': 2}, requests_per_second=1000, retry_backoff=0.01)
+
+    assert len(df) == 7 * 24 + 1
+    assert set(server.attempts.values()) == {3}
+    assert get_metrics().counter('data_fetch_retries').value - retries == 7 * 2
+
+def test_exhausted_retries_raise_instead_of_returning_nothing():
+    with pytest.raises(DataFetchError, match='HTTP 500'):
+        fetch({'fail_first': 10}, requests_per_second=1000, max_retries=2, retry_backoff=0.01)
+
+def test_requests_follow_the_rate_limit():
+    server, fetcher, _ = fetch({}, requests_per_second=20, max_concurrency=2)
+    times = np.array(server.request_times) - server.request_times[0]
+    # A burst of at most `capacity` (max_concurrency) requests, then 20 per
+    # second, give or take one for timer granularity
+    sent = np.arange(1, len(times) + 1)
+    assert np.all(sent <= 2 + 20 * times + 1)
+    assert times[-1] >= (len(times) - 2) / 20 - 0.01
+
+def test_missing_candles_are_reported_as_gaps():
+    missing = {int(START.timestamp() * 1000) + 30 * HOUR, int(START.timestamp() * 1000) + 31 * HOUR}
+    _, fetcher, df = fetch({'missing': missing}, requests_per_second=1000)
+
+    assert len(df) == 7 * 24 + 1 - 2
+    assert len(fetcher.gaps) == 1
+    before, after = fetcher.gaps[0]
+    assert (after - before).total_seconds() * 1000 == 3 * HOUR
+
+def test_float32_fetcher_reads_float32_through_the_store(tmp_path):
+    async def run():
+        async with CandleServer() as server:
+            store = CandleStore(str(tmp_path))
+            fetcher = DataFetcher('ETH', '1h', 2, base_url=server.url, requests_per_second=1000, store=store,
+                                  dtype=np.float32)
+            return await fetcher.fetch_data(), store.query('ETH', '1h')
+    df, stored = asyncio.run(run())
+
+    assert len(df) >= 2 * 24 and (df.dtypes == np.float32).all()
+    np.testing.assert_array_equal(df.to_numpy(), stored.loc[df.index].to_numpy(dtype=np.float32))
+
+def test_second_fetch_only_requests_the_tail_after_the_store(tmp_path):
+    async def run():
+        now = int(datetime.now().timestamp() * 1000)
+        # The first run only gets candles up to ten hours ago
+        async with CandleServer(until=now - 10 * HOUR) as server:
+            store = CandleStore(str(tmp_path))
+            fetcher = DataFetcher('ETH', '1h', 2, base_url=server.url, requests_per_second=1000, store=store)
+            first = await fetcher.fetch_data()
+            last_stored = store.last_timestamp('ETH', '1h')
+            server.until = None
+            server.attempts.clear()
+            second = await fetcher.fetch_data()
+            return first, second, last_stored, list(server.attempts)
+    first, second, last_stored, windows = asyncio.run(run())
+
+    # One request, starting at the last stored candle (which may have been forming)
+    assert len(windows) == 1 and windows[0][0] == last_stored
+    assert len(second) - len(first) >= 9
+    # The stored head and the fetched tail are one hourly series without gaps
+    assert second.index.is_unique and (np.diff(second.index.values) == np.timedelta64(1, 'h')).all()
+    assert second.index[-1] - second.index[0] >= pd.Timedelta(hours=47)
+    np.testing.assert_array_equal(second.loc[first.index[1:]], first.iloc[1:])
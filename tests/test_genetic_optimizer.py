@@ -0,0 +1,122 @@
+import json
+import warnings
+import numpy as np
+import pytest
+from src.backtester import AdvancedBacktester
+from src.genetic_optimizer import GeneticOptimizer
+from src.utils.fitness_cache import FitnessCache
+from tests.strategies import SmaCross, make_ohlcv
+
+PARAM_RANGES = {'n_fast': list(range(3, 15)), 'n_slow': list(range(20, 60, 5)), 'stop_multiplier': [2, 3, 4]}
+
+def optimize(engine='backtesting', seed=0, data=None, **options):
+    data = make_ohlcv(1000) if data is None else data
+    backtester = AdvancedBacktester(data, SmaCross, engine=engine)
+    optimizer = GeneticOptimizer(SmaCross, backtester, **options)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        best = optimizer.optimize(data, PARAM_RANGES, population_size=12, generations=4, seed=seed, verbose=False)
+    return best, optimizer
+
+def test_cache_counts_hits_and_evicts_the_least_recent(tmp_path):
+    cache = FitnessCache(str(tmp_path / 'fitness.json'), max_entries=2, namespace='data')
+    assert cache.get({'a': 1}) is None
+    cache.put({'a': 1}, (1.0,))
+    cache.put({'a': 2}, (2.0,))
+    assert cache.get({'a': 1}) == (1.0,)
+    cache.put({'a': 3}, (3.0,))
+    assert cache.get({'a': 2}) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    # Key order of the parameter dict does not matter, the namespace does
+    assert cache.key({'x': 1, 'y': 2}) == cache.key({'y': 2, 'x': 1})
+    assert FitnessCache(namespace='other').key({'a': 1}) != cache.key({'a': 1})
+
+    cache.save()
+    reloaded = FitnessCache(cache.path, max_entries=2, namespace='data')
+    assert reloaded.get({'a': 1}) == (1.0,) and reloaded.get({'a': 3}) == (3.0,)
+
+def test_numpy_parameter_grids(tmp_path):
+    cache = FitnessCache(namespace='data')
+    assert cache.key({'n': np.int64(5), 'x': np.float32(0.5)}) == cache.key({'n': 5, 'x': 0.5})
+
+    data = make_ohlcv(1000)
+    backtester = AdvancedBacktester(data, SmaCross)
+    optimizer = GeneticOptimizer(SmaCross, backtester, cache_path=str(tmp_path / 'fitness.json'))
+    ranges = {'n_fast': np.arange(3, 15), 'n_slow': np.arange(20, 60, 5), 'stop_multiplier': np.linspace(2, 4, 3)}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        best = optimizer.optimize(data, ranges, population_size=8, generations=2, seed=0, verbose=False)
+    assert best['n_fast'] in ranges['n_fast'] and best['n_slow'] in ranges['n_slow']
+    assert len(FitnessCache(optimizer.cache_path, namespace=optimizer.fitness_cache.namespace)) > 0
+
+def test_duplicates_and_known_individuals_are_not_backtested_again(tmp_path):
+    path = str(tmp_path / 'fitness.json')
+    first, optimizer = optimize(cache_path=path)
+    log = optimizer.logbook
+    assert sum(log.select('nevals')) == len(optimizer.fitness_cache)
+    # Later generations repeat individuals, each repeat is a hit instead of a backtest
+    assert sum(log.select('hits')) > 0
+    for record in log:
+        assert record['hit_rate'] == pytest.approx(record['hits'] / (record['hits'] + record['nevals']))
+
+    # The same search again is served from the cache on disk, with the same result
+    second, optimizer = optimize(cache_path=path)
+    assert second == first
+    assert sum(optimizer.logbook.select('nevals')) == 0
+    assert set(optimizer.logbook.select('hit_rate')) == {1.0}
+
+    # Other data is another namespace, nothing is reused
+    _, optimizer = optimize(cache_path=path, data=make_ohlcv(1000, seed=1))
+    assert optimizer.logbook[0]['hits'] < optimizer.logbook[0]['nevals']
+
+@pytest.mark.parametrize('engine', ['backtesting', 'vectorized'])
+def test_worker_pool_is_deterministic_under_a_seed(engine):
+    serial, serial_optimizer = optimize(engine, seed=3)
+    pooled, pooled_optimizer = optimize(engine, seed=3, workers=2)
+    assert pooled == serial
+    for field in ('nevals', 'hits', 'avg', 'max'):
+        assert pooled_optimizer.logbook.select(field) == serial_optimizer.logbook.select(field)
+    assert pooled_optimizer.pool is None
+
+def test_interrupted_run_resumes_to_the_uninterrupted_result(tmp_path, monkeypatch):
+    data = make_ohlcv(1000)
+    path = str(tmp_path / 'full' / 'ga.pkl')
+    full, full_optimizer = optimize(data=data, seed=5, checkpoint_path=path)
+
+    # Crash while evaluating generation 3, after the checkpoint of generation 2
+    backtester = AdvancedBacktester(data, SmaCross)
+    optimizer = GeneticOptimizer(SmaCross, backtester, checkpoint_path=str(tmp_path / 'resumed' / 'ga.pkl'))
+    evaluate = optimizer._evaluate_population
+    calls = []
+    def crash_at_generation_3(individuals):
+        calls.append(1)
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        return evaluate(individuals)
+    monkeypatch.setattr(optimizer, '_evaluate_population', crash_at_generation_3)
+    with warnings.catch_warnings(), pytest.raises(KeyboardInterrupt):
+        warnings.simplefilter('ignore')
+        optimizer.optimize(data, PARAM_RANGES, population_size=12, generations=4, seed=5, verbose=False)
+    assert optimizer.load_checkpoint()['generation'] == 2
+
+    monkeypatch.undo()
+    resumed_optimizer = GeneticOptimizer(SmaCross, AdvancedBacktester(data, SmaCross),
+                                         checkpoint_path=optimizer.checkpoint_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        resumed = resumed_optimizer.resume(data, verbose=False)
+
+    assert resumed == full
+    full_fame = full_optimizer.load_checkpoint()['halloffame']
+    resumed_fame = resumed_optimizer.load_checkpoint()['halloffame']
+    assert list(resumed_fame[0]) == list(full_fame[0])
+    assert resumed_fame[0].fitness.values == full_fame[0].fitness.values
+    for field in ('gen', 'nevals', 'hits', 'hit_rate', 'avg', 'max'):
+        assert resumed_optimizer.logbook.select(field) == full_optimizer.logbook.select(field)
+
+    # One metrics line per generation, across the crash and the resume
+    with open(resumed_optimizer.checkpoint_path + '.metrics.jsonl') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['gen'] for line in lines] == list(range(5))
+    for line in lines:
+        assert line['evals_per_s'] == pytest.approx(line['nevals'] / line['seconds'])
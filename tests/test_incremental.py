@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import talib
+from src.feature_engineering import FeatureEngineer
+from src.indicators.incremental import IncrementalFeatures
+from tests.strategies import make_ohlcv
+
+DATA = make_ohlcv(300)
+
+def incremental_rows():
+    features = IncrementalFeatures()
+    rows = []
+    for open_, high, low, close, volume in DATA[['open', 'high', 'low', 'close', 'volume']].to_numpy():
+        rows.append(dict(features.update(open_, high, low, close, volume)))
+    return rows
+
+ROWS = incremental_rows()
+
+@pytest.mark.parametrize('name', list(ROWS[-1]))
+def test_every_column_matches_the_feature_matrix(name):
+    if name == 'supertrend':
+        pytest.importorskip('pandas_ta')
+    expected = FeatureEngineer(workers=1).calculate_feature_matrix(DATA, [name])[name]
+    values = np.array([row[name] for row in ROWS])
+    # The matrix is float32, the per-bar values stay float64
+    np.testing.assert_allclose(values.astype(np.float32), expected, rtol=1e-5, atol=1e-6)
+
+def test_bollinger_bands_match_the_batch_feature():
+    rows = [[row[name] for name in ('bollinger_upper', 'bollinger_middle', 'bollinger_lower')] for row in ROWS]
+    expected = talib.BBANDS(DATA['close'].to_numpy(), timeperiod=5, nbdevup=2, nbdevdn=2)
+    np.testing.assert_allclose(np.array(rows), np.column_stack(expected), rtol=1e-9)
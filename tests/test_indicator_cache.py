@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from src.indicators.cache import IndicatorCache, get_indicator_cache
+from src.indicators.custom_indicators import calculate_sma, identify_support_resistance
+from tests.strategies import make_ohlcv
+
+def test_hits_misses_and_lru_eviction():
+    cache = IndicatorCache(max_bytes=3 * 800)
+    calls = []
+
+    def compute(name):
+        calls.append(name)
+        return np.zeros(100)  # 800 bytes
+
+    for name in ('a', 'b', 'c', 'a'):
+        cache.get_or_compute(name, lambda: compute(name))
+    assert calls == ['a', 'b', 'c']
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
+
+    # 'b' is now the least recently used and makes room for 'd'
+    cache.get_or_compute('d', lambda: compute('d'))
+    assert list(cache.entries) == ['c', 'a', 'd']
+    assert cache.nbytes == 3 * 800
+    cache.get_or_compute('b', lambda: compute('b'))
+    assert calls[-1] == 'b'
+
+    # Results larger than the whole budget are returned but never stored
+    cache.get_or_compute('big', lambda: np.zeros(1000))
+    assert 'big' not in cache.entries
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'entries': 0, 'nbytes': 0}
+
+def test_callers_cannot_change_cached_results():
+    get_indicator_cache().clear()
+    close = make_ohlcv(200)['close']
+    first = calculate_sma(close, 5)
+    first.iloc[10] = -999.0
+    second = calculate_sma(close, 5)
+    assert second is not first and second.iloc[10] != -999.0
+    second.iloc[11] = -999.0
+    pd.testing.assert_series_equal(calculate_sma(close, 5), close.rolling(5).mean())
+    assert get_indicator_cache().stats()['hits'] == 2
+
+    data = make_ohlcv(300)
+    support, resistance = identify_support_resistance(data['high'], data['low'], data['close'], window=1)
+    support[:] = 0.0
+    again, _ = identify_support_resistance(data['high'], data['low'], data['close'], window=1)
+    assert again.notna().sum() > 0 and not (again == 0.0).any()
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+from src.data_fetcher import DataFetcher
+from src.live_feed import Bar, BarRing, CandleFeed, CandleFeedGroup
+from tests.servers import FeedServer, make_candle
+
+MINUTE = 60000
+
+def current_minute():
+    return int(time.time() * 1000) // MINUTE * MINUTE
+
+def make_feed(server, symbol='ETH', capacity=30):
+    fetcher = DataFetcher(symbol, '1m', 1, base_url=server.url, requests_per_second=1000)
+    return CandleFeed(fetcher, ws_url=server.ws_url, capacity=capacity, reconnect_delay=0.05)
+
+async def drain(queue):
+    bars = []
+    while not queue.empty():
+        bars.append(queue.get_nowait())
+    return bars
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        await asyncio.sleep(0.01)
+
+def test_bar_ring_keeps_the_newest_bars_in_order():
+    ring = BarRing(3)
+    for t in range(5):
+        ring.append(Bar(t * MINUTE, t, t, t, t, t))
+    frame = ring.to_frame()
+    assert len(ring) == 3 and ring.last_timestamp() == 4 * MINUTE
+    np.testing.assert_array_equal(frame['close'], [2, 3, 4])
+
+def test_closed_bars_are_pushed_when_the_next_candle_starts():
+    async def run():
+        async with FeedServer(interval_ms=MINUTE) as server:
+            feed = make_feed(server)
+            queue = feed.subscribe()
+            task = asyncio.create_task(feed.run())
+            try:
+                await asyncio.wait_for(feed.connected.wait(), 5)
+                # The newest REST candle is still forming and not published. The
+                # test goes on from that candle, the clock may have moved on since.
+                now = feed.current.timestamp
+                backfilled = await drain(queue)
+                assert current_minute() - MINUTE <= now <= current_minute()
+                assert [bar.timestamp for bar in backfilled][-1] == now - MINUTE
+
+                # Updates of the forming bar publish nothing, the next candle closes it
+                forming = dict(make_candle(now, MINUTE, 'ETH', '1m'), c='150.5')
+                await server.send(forming)
+                await server.send(make_candle(now + MINUTE, MINUTE, 'ETH', '1m'))
+                bar = await asyncio.wait_for(queue.get(), 5)
+                assert bar.timestamp == now and bar.close == 150.5
+                assert queue.empty()
+                assert server.subscriptions == [{'type': 'candle', 'coin': 'ETH', 'interval': '1m'}]
+            finally:
+                task.cancel()
+    asyncio.run(run())
+
+def test_reconnect_backfills_the_gap_through_rest():
+    async def run():
+        now = current_minute()
+        # REST lags ten minutes behind until the socket drops
+        async with FeedServer(interval_ms=MINUTE, until=now - 10 * MINUTE) as server:
+            feed = make_feed(server)
+            queue = feed.subscribe()
+            task = asyncio.create_task(feed.run())
+            try:
+                await asyncio.wait_for(feed.connected.wait(), 5)
+                before = await drain(queue)
+                assert before[-1].timestamp == now - 11 * MINUTE
+
+                server.until = None
+                await server.disconnect()
+                await wait_for(lambda: server.connections == 2 and feed.connected.is_set())
+                after = await drain(queue)
+            finally:
+                task.cancel()
+
+            timestamps = [bar.timestamp for bar in before + after]
+            # Every bar exactly once, in order and without holes
+            assert np.all(np.diff(timestamps) == MINUTE)
+            assert timestamps[-1] >= now - MINUTE
+            assert len(server.subscriptions) == 2
+            ring = feed.bars.to_frame()
+            assert ring.index.is_unique and ring.index[-1] == ring.index[0] + (len(ring) - 1) * pd.Timedelta('1min')
+    asyncio.run(run())
+
+def test_group_routes_candles_of_one_socket_to_their_feeds():
+    async def run():
+        async with FeedServer(interval_ms=MINUTE) as server:
+            feeds = [make_feed(server, symbol) for symbol in ('ETH', 'BTC')]
+            group = CandleFeedGroup(feeds, ws_url=server.ws_url, reconnect_delay=0.05)
+            queues = {feed.symbol: feed.subscribe() for feed in feeds}
+            task = asyncio.create_task(group.run())
+            try:
+                await asyncio.wait_for(group.connected.wait(), 5)
+                for queue in queues.values():
+                    await drain(queue)
+                now = feeds[1].current.timestamp
+                await server.send(make_candle(now + MINUTE, MINUTE, 'BTC', '1m'))
+                bar = await asyncio.wait_for(queues['BTC'].get(), 5)
+            finally:
+                task.cancel()
+            assert bar.timestamp == now
+            assert queues['ETH'].empty()
+            assert server.connections == 1
+            assert sorted(sub['coin'] for sub in server.subscriptions) == ['BTC', 'ETH']
+    asyncio.run(run())
@@ -0,0 +1,159 @@
+import asyncio
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src import live_trader
+from src.live_feed import CandleFeed, CandleFeedGroup
+from src.live_trader import LiveTrader
+from src.mock_exchange import MockExchange
+from src.utils.metrics import MetricsRegistry
+
+class StubFetcher:
+    # Stands in for DataFetcher in a CandleFeed, backfills nothing
+    def __init__(self, symbol, timeframe='1m'):
+        self.symbol = symbol
+        self.timeframe = timeframe
+
+    async def _fetch_range(self, start_time, end_time, concurrent=True):
+        return pd.DataFrame()
+
+class ScriptedFeed(CandleFeedGroup):
+    # Pushes `bars` candles to every feed, `interval` seconds apart, then ends
+    # the trading run once the last orders had time to complete
+    def __init__(self, symbols, bars, interval, settle=0.5):
+        super().__init__([CandleFeed(StubFetcher(symbol), capacity=100) for symbol in symbols])
+        self.bars = bars
+        self.interval = interval
+        self.settle = settle
+
+    async def run(self):
+        for i in range(self.bars + 1):
+            for feed in self.group.values():
+                feed._on_candle({'t': i * 60000, 'o': 1, 'h': 2, 'l': 0.5, 'c': 1, 'v': 3,
+                                 's': feed.symbol, 'i': feed.timeframe})
+            await asyncio.sleep(self.interval)
+        await asyncio.sleep(self.settle)
+        raise RuntimeError('feed script finished')
+
+class CyclingStrategy:
+    # Opens one unit, closes it, opens one unit short, closes it, ...
+    timeframe = '1m'
+    signals = ['buy', 'close', 'sell', 'close']
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bars_seen = 0
+
+    def update_data(self, ohlcv):
+        self.rows = len(ohlcv)
+
+    def generate_signal(self):
+        signal = self.signals[self.bars_seen % len(self.signals)]
+        self.bars_seen += 1
+        return signal
+
+    def calculate_position_size(self):
+        return 1.0
+
+def run_trader(n_symbols, bars, interval, latency=0.005, jitter=0.0, **options):
+    exchange = MockExchange(latency=latency, fee_rate=0.001, jitter=jitter, seed=0)
+    trader = LiveTrader('key', 'secret', exchange=exchange, requests_per_second=5000, **options)
+    strategies = [CyclingStrategy(f'S{i}') for i in range(n_symbols)]
+    feed = ScriptedFeed([strategy.symbol for strategy in strategies], bars, interval)
+    asyncio.run(trader.start_trading(strategies, feed))
+    return trader, exchange, strategies
+
+def test_reconcile_under_concurrent_orders_keeps_cache_in_step():
+    # Reconciling every 5ms against an exchange answering in 2.5-7.5ms overlaps
+    # nearly every order, and some answers predate fills already applied
+    trader, exchange, _ = run_trader(150, bars=8, interval=0.1, jitter=0.5, reconcile_interval=0.005)
+
+    assert exchange.calls['create_market_buy_order'] + exchange.calls['create_market_sell_order'] == len(exchange.orders)
+    assert exchange.calls['fetch_positions'] > 10
+    # Every open is one unit and every close exactly undoes it, nothing doubled or flipped
+    assert len(exchange.orders) == 150 * 8
+    assert all(order['amount'] == 1.0 for order in exchange.orders)
+    remote = {symbol: amount for symbol, amount in exchange.positions.items() if amount}
+    assert trader.account.positions == remote == {}
+    assert not trader.account.drift_events
+    assert not trader.account.pending
+
+def test_fills_update_the_cached_balance():
+    trader, exchange, _ = run_trader(20, bars=4, interval=0.05, reconcile_interval=3600)
+
+    # One reconciliation at start-up, after that only our fills moved the balance
+    assert exchange.calls['fetch_balance'] == 1
+    fees = sum(order['fee']['cost'] for order in exchange.orders)
+    assert fees > 0
+    assert abs(trader.account.equity() - (10000.0 - fees)) < 1e-9
+    assert abs(trader.account.equity() - (exchange.balance + sum(exchange.positions.values()))) < 1e-9
+
+def test_one_trader_scales_to_150_symbols(monkeypatch):
+    # Ten times the slots in one trader cost no extra wall time: every slot's
+    # order is out within the same bar, and reconciliation stays one request
+    # for all symbols
+    interval = 0.2
+    runs = {}
+    for n_symbols in (15, 150):
+        registry = MetricsRegistry()
+        monkeypatch.setattr(live_trader, 'get_metrics', lambda: registry)
+        started = time.perf_counter()
+        trader, exchange, _ = run_trader(n_symbols, bars=8, interval=interval, reconcile_interval=0.05)
+        latency = max(histogram.quantile(0.95) for (name, _), histogram in registry.histograms.items()
+                      if name == 'bar_to_order')
+        runs[n_symbols] = time.perf_counter() - started, latency, exchange
+        assert len(exchange.orders) == n_symbols * 8
+        assert trader.account.positions == {}
+
+    (small_seconds, small_latency, small), (seconds, latency, large) = runs[15], runs[150]
+    assert seconds < small_seconds * 1.5
+    assert latency < interval
+    assert large.calls['fetch_positions'] <= small.calls['fetch_positions'] + 2
+
+class ClosingExchange(MockExchange):
+    closed = False
+
+    async def close(self):
+        self.closed = True
+
+def test_metrics_port_in_use_stops_the_trader_cleanly():
+    with socket.socket() as taken:
+        taken.bind(('0.0.0.0', 0))
+        taken.listen()
+        exchange = ClosingExchange()
+        trader = LiveTrader('key', 'secret', exchange=exchange, metrics_port=taken.getsockname()[1])
+        feed = ScriptedFeed(['S0'], bars=100, interval=0.1)
+
+        async def run():
+            started = time.perf_counter()
+            await trader.start_trading([CyclingStrategy('S0')], feed)
+            others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            return time.perf_counter() - started, others
+
+        seconds, leftover = asyncio.run(run())
+    # Given up at start-up, not after the 10s feed script, with nothing left running
+    assert seconds < 1
+    assert leftover == []
+    assert exchange.closed
+    assert feed.feeds['S0', '1m'].subscribers == []
+
+def test_shards_get_their_own_metrics_port_and_path(monkeypatch):
+    launched = []
+    monkeypatch.setattr(live_trader, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(live_trader, '_run_shard', lambda key, secret, options, shard: launched.append((options, shard)))
+    exchange = ClosingExchange()
+    trader = LiveTrader('key', 'secret', exchange=exchange, requests_per_second=9, metrics_port=9108,
+                        metrics_path='metrics/bot.prom', metrics_interval=5.0)
+    strategies = [CyclingStrategy(f'S{i}') for i in range(7)]
+    asyncio.run(trader.start_sharded(strategies, workers=3))
+
+    launched.sort(key=lambda launch: launch[0]['metrics_port'])
+    assert [options['metrics_port'] for options, _ in launched] == [9108, 9109, 9110]
+    assert [options['metrics_path'] for options, _ in launched] == [
+        'metrics/bot.shard0.prom', 'metrics/bot.shard1.prom', 'metrics/bot.shard2.prom']
+    assert all(options['metrics_interval'] == 5.0 and options['requests_per_second'] == 3
+               for options, _ in launched)
+    assert [[strategy.symbol for strategy in shard] for _, shard in launched] == [['S0', 'S3', 'S6'], ['S1', 'S4'],
+                                                                                    ['S2', 'S5']]
+    assert exchange.closed
@@ -0,0 +1,22 @@
+import logging
+from src.utils.logger import BoundedQueueHandler, setup_logger
+
+def test_setup_again_closes_the_previous_handlers(tmp_path):
+    first = setup_logger(log_dir=str(tmp_path / 'first'))
+    queued = first.handlers[0]
+    assert isinstance(queued, BoundedQueueHandler)
+    handlers = queued.listener.handlers
+    first.info('before')
+
+    logger = setup_logger(log_dir=str(tmp_path / 'second'), queued=False)
+    try:
+        # The old records were written, and the old file is no longer held open
+        assert 'before' in (tmp_path / 'first' / 'bot.log').read_text()
+        file_handler = next(h for h in handlers if isinstance(h, logging.FileHandler))
+        assert file_handler.stream is None
+        assert queued.listener is None
+        assert len(logger.handlers) == 2
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
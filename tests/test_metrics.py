@@ -0,0 +1,70 @@
+import math
+import numpy as np
+import pytest
+from src.utils.metrics import SUB_BUCKETS, LatencyHistogram, MetricsRegistry
+
+@pytest.mark.parametrize('micros', [1, 1.5, 3, 10, 17, 1000, 123456.7, 2.0 ** 30 - 1])
+def test_a_value_lands_in_the_bucket_that_covers_it(micros):
+    histogram = LatencyHistogram()
+    histogram.record(micros / 1e6)
+    index = histogram.counts.index(1)
+    upper = LatencyHistogram.upper_bound(index) * 1e6
+    lower = LatencyHistogram.upper_bound(index - 1) * 1e6 if index else 1.0
+    assert lower <= micros < upper
+    # Each bucket is at most 1/SUB_BUCKETS of its lower edge wide
+    assert upper - lower <= lower / SUB_BUCKETS * (1 + 1e-12)
+
+def test_edges_of_a_power_of_two():
+    histogram = LatencyHistogram()
+    for micros in (4, 4.24, 4.25, 7.99):
+        histogram.record(micros / 1e6)
+    # 4..8us is split into 16 buckets of 0.25us
+    assert [index for index, count in enumerate(histogram.counts) if count] == [32, 33, 47]
+    assert histogram.counts[32] == 2
+    # Below a microsecond and beyond the last bucket are clamped
+    histogram.record(1e-9)
+    histogram.record(1e9)
+    assert histogram.counts[0] == 1 and histogram.counts[-1] == 1
+
+def test_quantiles_are_within_one_bucket_above_the_exact_ones():
+    values = np.random.default_rng(0).lognormal(math.log(0.005), 1.5, 50_000)
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    ordered = np.sort(values)
+    for q in (0.01, 0.5, 0.9, 0.99, 0.999):
+        exact = ordered[math.ceil(q * len(values)) - 1]
+        assert exact <= histogram.quantile(q) <= exact * (1 + 1 / SUB_BUCKETS)
+    assert math.isnan(LatencyHistogram().quantile(0.5))
+    assert histogram.sum == pytest.approx(values.sum())
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry(prefix='bot')
+    registry.inc('orders', 3, side='buy')
+    registry.inc('orders', side='sell')
+    registry.histogram('signal').record(3e-6)
+    registry.histogram('signal').record(10e-6)
+
+    assert registry.to_prometheus().splitlines() == [
+        '# TYPE bot_orders_total counter',
+        'bot_orders_total{side="buy"} 3',
+        'bot_orders_total{side="sell"} 1',
+        '# TYPE bot_signal_seconds histogram',
+        'bot_signal_seconds_bucket{le="2e-06"} 0',
+        'bot_signal_seconds_bucket{le="4e-06"} 1',
+        'bot_signal_seconds_bucket{le="8e-06"} 1',
+        'bot_signal_seconds_bucket{le="1.6e-05"} 2',
+        'bot_signal_seconds_bucket{le="+Inf"} 2',
+        'bot_signal_seconds_sum 1.3e-05',
+        'bot_signal_seconds_count 2',
+    ]
+
+def test_snapshot_file_is_the_prometheus_text(tmp_path):
+    registry = MetricsRegistry()
+    with registry.timer('fetch', symbol='BTC'):
+        pass
+    path = tmp_path / 'metrics' / 'bot.prom'
+    registry.write(str(path))
+    assert path.read_text() == registry.to_prometheus()
+    assert 'hyperliquid_bot_fetch_seconds_count{symbol="BTC"} 1' in path.read_text()
@@ -0,0 +1,76 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+from src.backtester import AdvancedBacktester
+from src.monte_carlo import PERCENTILES, QuantileSketch, block_bootstrap, trade_equity_returns, trade_permutation
+from tests.strategies import SmaCross, make_ohlcv
+
+def test_sketch_quantiles_track_exact_ones():
+    values = np.random.default_rng(0).standard_t(3, 200_000)
+    sketch = QuantileSketch(seed=1)
+    for batch in np.array_split(values, 37):
+        sketch.update(batch)
+
+    assert sketch.count == len(values)
+    assert np.isclose(sketch.mean, values.mean())
+    assert np.isclose(sketch.describe()['std'], values.std(ddof=1))
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+    assert sum(len(level) for level in sketch.levels) < 10 * sketch.capacity
+    for q in (0.01, 0.05, 0.5, 0.95, 0.99):
+        # Within half a percent in rank
+        assert abs((values < sketch.quantile(q)).mean() - q) < 0.005
+
+def test_summary_matches_describe_of_the_rows():
+    returns = np.random.default_rng(2).normal(0.0005, 0.01, 2000)
+    rows = block_bootstrap(returns, 3000, seed=3, memory_budget=4 * 1024 * 1024, periods_per_year=8760)
+    summary = block_bootstrap(returns, 3000, seed=3, memory_budget=4 * 1024 * 1024, periods_per_year=8760,
+                              summary=True)
+
+    described = rows.describe(percentiles=PERCENTILES)
+    assert summary.attrs['summary']
+    assert list(summary.index) == list(described.index)
+    assert list(summary.columns) == list(described.columns)
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(summary.loc[exact], described.loc[exact])
+    # Fewer rows than the sketch capacity, so the quantiles are off by at most one rank
+    for label in ('5%', '50%', '95%'):
+        q = float(label[:-1]) / 100
+        for column in rows:
+            assert abs((rows[column] < summary.at[label, column]).mean() - q) < 1.5 / len(rows)
+
+def test_batches_follow_the_memory_budget():
+    returns = np.random.default_rng(4).normal(0, 0.01, 20_000)
+    budget = 8 * 1024 * 1024
+    tracemalloc.start()
+    block_bootstrap(returns, 2000, seed=5, memory_budget=budget, summary=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # A single 1000-simulation batch alone would take 20000 * 1000 * 8 bytes per array
+    assert peak < 2 * budget
+
+def test_results_do_not_depend_on_the_batching():
+    returns = np.random.default_rng(6).normal(0, 0.01, 500)
+    for replace in (False, True):
+        one = trade_permutation(returns, 400, seed=7, memory_budget=1 << 30, replace=replace)
+        many = trade_permutation(returns, 400, seed=7, memory_budget=64 * 500 * 50, replace=replace)
+        assert len(one) == len(many) == 400
+        # The same paths simulation for simulation, not just the same final return
+        pd.testing.assert_frame_equal(one, many)
+        assert one['Max. Drawdown [%]'].nunique() > 300
+        assert (one['Return [%]'].nunique() > 300) == replace
+
+def test_trade_returns_retrace_the_realized_equity():
+    data = make_ohlcv(3000, 4)
+    backtester = AdvancedBacktester(data, SmaCross, commission=0.002)
+    results = backtester.run(engine='vectorized', n_fast=5, n_slow=20)
+    trades, equity = results['_trades'], results['_equity_curve']['Equity']
+    assert len(trades) > 50
+
+    trade_returns = trade_equity_returns(trades, equity)
+    # In their own order the trades compound to the equity after every exit
+    np.testing.assert_allclose(equity.iloc[0] * np.cumprod(1 + trade_returns),
+                               equity.iloc[trades['ExitBar']], rtol=1e-12)
+    # and any order ends where the backtest did, risk-sized rather than all-in
+    table = backtester.run_monte_carlo(50, method='trades', results=results, seed=1)
+    np.testing.assert_allclose(table['Return [%]'], results['Return [%]'], rtol=1e-9)
+    assert not np.allclose(trade_returns, trades['ReturnPct'])
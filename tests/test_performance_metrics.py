@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils.performance_metrics import batch_performance_metrics, infer_periods_per_year, periods_per_year
+
+def curve_metrics(equity, periods):
+    # The per-curve pandas formulas the kernel replaced, annualized by periods
+    returns = equity.pct_change().dropna()
+    cagr = (equity.iloc[-1] / equity.iloc[0]) ** (periods / len(returns)) - 1
+    max_drawdown = (1 - equity / equity.cummax()).max()
+    return pd.Series({
+        'Total Return (%)': (equity.iloc[-1] / equity.iloc[0] - 1) * 100,
+        'CAGR (%)': cagr * 100,
+        'Volatility (%)': returns.std() * np.sqrt(periods) * 100,
+        'Sharpe Ratio': (returns.mean() * periods) / (returns.std() * np.sqrt(periods)),
+        'Sortino Ratio': (returns.mean() * periods) / (returns[returns < 0].std() * np.sqrt(periods)),
+        'Max Drawdown (%)': max_drawdown * 100,
+        'Calmar Ratio': cagr / max_drawdown,
+    })
+
+def test_batch_matches_per_curve_formulas():
+    rng = np.random.default_rng(0)
+    equity = 10000 * np.cumprod(1 + rng.normal(0.0002, 0.01, (25, 800)), axis=1)
+    periods = periods_per_year('1h')
+
+    batch = batch_performance_metrics(equity, periods)
+    expected = pd.DataFrame([curve_metrics(pd.Series(row), periods) for row in equity])
+
+    assert batch.shape == (25, 7)
+    pd.testing.assert_frame_equal(batch, expected, rtol=1e-9)
+
+@pytest.mark.parametrize('timeframe, freq, periods', [('1m', 'min', 525600), ('1h', 'h', 8760), ('1d', 'D', 365)])
+def test_periods_per_year(timeframe, freq, periods):
+    assert periods_per_year(timeframe) == periods
+    assert infer_periods_per_year(pd.date_range('2024-01-01', periods=500, freq=freq)) == periods
+
+def test_index_without_timestamps_falls_back_to_daily_convention():
+    assert infer_periods_per_year(pd.RangeIndex(500)) == 252.0
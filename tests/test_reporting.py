@@ -0,0 +1,35 @@
+import sys
+from src import backtester as backtester_module
+from src.backtester import AdvancedBacktester
+from src.reporting import equity_figure
+from tests.strategies import SmaCross, make_ohlcv
+
+def test_report_computes_metrics_once_and_writes_charts_without_a_display(tmp_path, monkeypatch):
+    monkeypatch.delenv('DISPLAY', raising=False)
+    calls = []
+    calculate = backtester_module.calculate_performance_metrics
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return calculate(*args, **kwargs)
+    monkeypatch.setattr(backtester_module, 'calculate_performance_metrics', counting)
+
+    backtester = AdvancedBacktester(make_ohlcv(1000), SmaCross, engine='vectorized', report_dir=str(tmp_path))
+    results = backtester.run()
+    first = backtester.generate_report(results)
+    second = backtester.generate_report(results)
+    paths = backtester.close()
+
+    assert len(calls) == 1
+    assert results.attrs['performance_metrics'] is not None
+    assert first == second
+    assert sorted(paths) == [str(tmp_path / 'backtest_drawdown.png'), str(tmp_path / 'backtest_equity.png')]
+    for path in paths:
+        with open(path, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+    assert backtester.wait_for_reports() == []
+
+def test_figures_are_drawn_on_the_agg_canvas_without_pyplot():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    results = AdvancedBacktester(make_ohlcv(500), SmaCross, engine='vectorized').run()
+    assert isinstance(equity_figure(results).canvas, FigureCanvasAgg)
+    assert 'matplotlib.pyplot' not in sys.modules
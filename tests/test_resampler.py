@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.feature_engineering import FeatureEngineer
+from src.resampler import Resampler, align_positions, align_values, index_timestamps
+from tests.strategies import make_ohlcv
+
+AGGREGATION = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+@pytest.fixture
+def minutes():
+    data = make_ohlcv(5000, freq='min')
+    # A few missing candles, the buckets still follow the clock
+    return data.drop(data.index[[7, 8, 130, 2000]])
+
+@pytest.mark.parametrize('timeframe, rule', [('5m', '5min'), ('15m', '15min'), ('1h', 'h'), ('1d', 'D')])
+def test_resampled_bars_match_pandas(minutes, timeframe, rule):
+    expected = minutes.resample(rule).agg(AGGREGATION).dropna()
+    frame = Resampler.from_frame(minutes, '1m').get(timeframe)
+    np.testing.assert_array_equal(frame.index.values.astype('datetime64[ms]'),
+                                  expected.index.values.astype('datetime64[ms]'))
+    np.testing.assert_allclose(frame.to_numpy(), expected.to_numpy())
+
+def test_incremental_updates_match_a_rebuild(minutes):
+    resampler = Resampler.from_frame(minutes.iloc[:1000], '1m')
+    resampler.get('15m')
+    for start in range(1000, len(minutes), 333):
+        chunk = minutes.iloc[start:start + 333]
+        resampler.update(index_timestamps(chunk.index), chunk.to_numpy())
+    pd.testing.assert_frame_equal(resampler.get('15m'), Resampler.from_frame(minutes, '1m').get('15m'))
+
+@pytest.mark.parametrize('timeframe', ['1w', '2w', '1M'])
+def test_weeks_and_months_are_not_derived(minutes, timeframe):
+    with pytest.raises(ValueError, match='not epoch-aligned'):
+        Resampler.from_frame(minutes, '1m').get(timeframe)
+
+def test_minute_bars_see_the_hour_bar_closed_by_their_close():
+    hour, minute = 3600_000, 60_000
+    hours = index_timestamps(pd.DatetimeIndex(['2024-01-01 09:00', '2024-01-01 10:00']))
+    minutes = index_timestamps(pd.DatetimeIndex(['2024-01-01 09:59', '2024-01-01 10:58', '2024-01-01 10:59']))
+    # The 10:59 bar closes at 11:00 with the 10:00 hour bar, the 10:58 bar only sees 09:00,
+    # and the 09:59 bar the 09:00 one
+    positions = align_positions(hours, hour, minutes, minute)
+    np.testing.assert_array_equal(positions, [0, 0, 1])
+    np.testing.assert_array_equal(align_positions(hours, hour, minutes - hour, minute), [-1, -1, 0])
+    np.testing.assert_array_equal(align_values([1.0, 2.0], np.array([-1, 0, 1])), [np.nan, 1.0, 2.0])
+
+@pytest.mark.parametrize('name', ['sma_fast', 'rsi', 'supertrend'])
+def test_higher_timeframe_features_are_the_aligned_hourly_ones(minutes, name):
+    if name == 'supertrend':
+        pytest.importorskip('pandas_ta')
+    hours = minutes.resample('h').agg(AGGREGATION).dropna()
+    expected = FeatureEngineer(workers=1).calculate_feature_matrix(hours, [name])[name]
+    positions = align_positions(index_timestamps(hours.index), 3600_000, index_timestamps(minutes.index), 60_000)
+
+    matrix = FeatureEngineer(workers=1).calculate_feature_matrix(minutes, [f'{name}@1h', 'price_change'])
+    np.testing.assert_array_equal(matrix[f'{name}@1h'], align_values(expected, positions).astype(np.float32))
+    # The last minute of every hour is the first to see that hour's bar
+    last_minutes, before = minutes.index.minute == 59, minutes.index.minute == 58
+    assert np.isnan(matrix[f'{name}@1h'][:59]).all()
+    np.testing.assert_array_equal(positions[last_minutes], hours.index.get_indexer(minutes.index[last_minutes].floor('h')))
+    np.testing.assert_array_equal(positions[before], hours.index.get_indexer(minutes.index[before].floor('h')) - 1)
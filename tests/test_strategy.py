@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from src import feature_engineering
+from src.backtester import AdvancedBacktester
+from src.feature_engineering import FeatureEngineer, default_features, resolve_features
+from src.strategy import BreakoutStrategy
+from tests.strategies import make_ohlcv
+
+def test_breakout_strategy_runs_on_its_own_features():
+    # Only the declared FEATURES are computed, so a column the strategy reads
+    # without declaring it fails here
+    data = FeatureEngineer(workers=1).calculate_features(make_ohlcv(), features=BreakoutStrategy.FEATURES).dropna()
+    assert list(data.columns) == ['open', 'high', 'low', 'close', 'volume', *BreakoutStrategy.FEATURES]
+
+    results = AdvancedBacktester(data, BreakoutStrategy).run()
+    assert len(results['_equity_curve']) == len(data)
+    strategy = results['_strategy']
+    for name in ('sma_fast', 'sma_slow', 'rsi', 'atr'):
+        np.testing.assert_array_equal(np.asarray(getattr(strategy, name)), data[name].to_numpy())
+    # Support and resistance include the current bar, so its close never breaks
+    # out of them and the strategy stays flat
+    assert (data['close'] <= data['resistance']).all() and (data['close'] >= data['support']).all()
+    assert results['# Trades'] == 0
+    assert (results['_equity_curve']['Equity'] == 10000).all()
+
+def test_dependencies_come_in_earlier_levels():
+    levels = resolve_features(['is_weekend', 'market_regime', 'rsi'])
+    names = [sorted(output for node in level for output in node.outputs) for level in levels]
+    assert names == [['day_of_week', 'rsi', 'sma_fast', 'sma_slow'], ['is_weekend', 'market_regime']]
+    # A node with several outputs is one node, asked for by any of them
+    assert [len(level) for level in resolve_features(['macd', 'macd_signal'])] == [1]
+    assert resolve_features([]) == []
+
+def test_cycles_and_unknown_names_are_rejected(monkeypatch):
+    monkeypatch.setattr(feature_engineering, '_FEATURES', dict(feature_engineering._FEATURES))
+    feature_engineering.feature('first', deps=('second',))(lambda inputs: inputs['second'])
+    feature_engineering.feature('second', deps=('first',))(lambda inputs: inputs['first'])
+
+    with pytest.raises(ValueError, match='first -> second -> first'):
+        resolve_features(['first'])
+    with pytest.raises(KeyError, match='no_such_feature'):
+        resolve_features(['rsi', 'no_such_feature'])
+
+def test_float32_matrix_matches_the_full_float64_features():
+    data = make_ohlcv(1000)
+    features = default_features()
+    full = np.empty((len(data), len(features)))
+    FeatureEngineer(workers=1)._compute(data, features, full, range(len(features)))
+
+    subset = list(BreakoutStrategy.FEATURES) + ['market_regime', 'is_weekend']
+    matrix = FeatureEngineer(workers=4).calculate_feature_matrix(data, subset)
+    assert matrix.values.dtype == np.float32
+    for name in subset:
+        expected = full[:, features.index(name)]
+        # Rounded once to float32, whether computed alone or with everything else
+        np.testing.assert_array_equal(matrix[name], expected.astype(np.float32))
+        np.testing.assert_allclose(matrix[name], expected, rtol=2 ** -23)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from src.backtester import AdvancedBacktester, expand_grid
+from src.successive_halving import fidelity_schedule, halving_cost, successive_halving
+from tests.strategies import SmaCross, make_ohlcv
+
+PARAM_SETS = expand_grid({'n_fast': list(range(3, 15)), 'n_slow': list(range(20, 60, 5)), 'stop_multiplier': [2, 3]})
+
+@pytest.fixture(scope='module')
+def backtester():
+    return AdvancedBacktester(make_ohlcv(3000), SmaCross, engine='vectorized')
+
+def test_schedule_ends_with_the_full_history():
+    assert fidelity_schedule(3000, min_fraction=0.1, eta=3) == [333, 1000, 3000]
+    assert halving_cost(27, [333, 1000, 3000], 3) == 27 * 333 + 9 * 1000 + 3 * 3000
+
+def test_budget_caps_the_bar_evaluations(backtester):
+    budget = 60_000
+    search = successive_halving(backtester, PARAM_SETS, budget=budget)
+    assert search['bar_evaluations'] <= budget
+    # The pool is the largest one that fits, one more candidate would not
+    started = search['history']['candidate'][search['history']['rung'] == 0].nunique()
+    assert halving_cost(started + 1, search['schedule'], 3) > budget
+    assert search['full_bar_evaluations'] == started * 3000
+
+    with pytest.raises(ValueError):
+        successive_halving(backtester, PARAM_SETS, budget=100)
+
+def test_losers_past_max_drawdown_are_dropped_early(backtester):
+    drawdowns = successive_halving(backtester, PARAM_SETS)['history'].query('rung == 0')['drawdown']
+    max_drawdown = -drawdowns.median()
+    history = successive_halving(backtester, PARAM_SETS, max_drawdown=max_drawdown)['history']
+
+    first = history[history['rung'] == 0]
+    too_deep = first['drawdown'] < -max_drawdown
+    assert too_deep.any()
+    assert not first['promoted'][too_deep].any()
+    later = history[history['rung'] > 0]
+    assert not set(later['candidate']) & set(first['candidate'][too_deep])
+
+def test_full_fidelity_winner_is_promoted(backtester):
+    search = successive_halving(backtester, PARAM_SETS)
+    history = search['history']
+    final = history[history['rung'] == history['rung'].max()]
+    assert final['bars'].eq(3000).all()
+    # Every later rung only scores candidates promoted from the one before
+    for rung in range(1, history['rung'].max() + 1):
+        promoted = history[(history['rung'] == rung - 1) & history['promoted']]['candidate']
+        assert set(history[history['rung'] == rung]['candidate']) == set(promoted)
+
+    winner = final.loc[final['score'].idxmax()]
+    assert search['best'] == PARAM_SETS[winner['candidate']]
+    assert search['best_score'] == winner['score']
+    assert np.isclose(backtester.run(**search['best'])['Return [%]'], search['best_score'])
+    assert search['bar_evaluations'] < search['full_bar_evaluations']
+    assert search['estimated_time_saved'] == search['estimated_full_elapsed'] - search['elapsed']
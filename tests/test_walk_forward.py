@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.indicators.cache import get_indicator_cache, history_window, set_history
+from src.walk_forward import walk_forward_windows
+
+def make_ohlcv(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({'open': np.r_[close[0], close[:-1]], 'high': close * 1.005, 'low': close * 0.995,
+                         'close': close, 'volume': rng.lognormal(0, 0.6, n)},
+                        index=pd.date_range('2024-01-01', periods=n, freq='h'))
+
+@pytest.fixture
+def history():
+    data = make_ohlcv()
+    set_history(data)
+    yield data
+    set_history(None)
+
+def test_windows_roll_and_anchor():
+    assert walk_forward_windows(10, 4, 2) == [(0, 4, 4, 6), (2, 6, 6, 8), (4, 8, 8, 10)]
+    assert walk_forward_windows(10, 4, 2, anchored=True) == [(0, 4, 4, 6), (0, 6, 6, 8), (0, 8, 8, 10)]
+
+def test_history_window_locates_fold_slices(history):
+    source, window = history_window(history.iloc[500:1700])
+    assert source is history and window == slice(500, 1700)
+
+    # Same timestamps with other prices (e.g. a resampled path) are not a window of it
+    other = history.iloc[500:1700].assign(close=lambda frame: frame['close'] * 1.01)
+    source, window = history_window(other)
+    assert source is other and window == slice(None)
+
+    set_history(None)
+    frame = history.iloc[:10]
+    assert history_window(frame) == (frame, slice(None))
+
+def test_folds_slice_indicators_of_the_full_history(history):
+    pytest.importorskip('pandas_ta')
+    from src.strategies.advanced_breakout_strategy import AdvancedBreakoutStrategy
+
+    cache = get_indicator_cache()
+    cache.clear()
+    full = AdvancedBreakoutStrategy.vectorized_signals(history, n_atr=10)
+    misses = cache.stats()['misses']
+    for start, end in [(0, 1000), (500, 1500), (2000, 3000)]:
+        fold = AdvancedBreakoutStrategy.vectorized_signals(history.iloc[start:end], n_atr=10)
+        for name in ('long_entry', 'short_entry', 'long_exit', 'short_exit', 'stop_distance'):
+            np.testing.assert_array_equal(fold[name], full[name][start:end])
+    # Every fold was served from the entries of the full-history run
+    assert cache.stats()['misses'] == misses